@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, Iterable
+
+import numpy as np
+
+from .detections import DetectionBatch
+
+
+# Column name -> dtype; one raw little-endian file per column, rows in frame order
+COLUMNS: dict[str, str] = {
+    "frame": "<i4",
+    "ts_ms": "<i8",
+    "class_id": "<i4",
+    "conf": "<f4",
+    "x": "<i4",
+    "y": "<i4",
+    "w": "<i4",
+    "h": "<i4",
+    "risk": "<i1",  # Index into RISK_LEVELS
+    "track_id": "<i8",  # -1 when tracking is off
+}
+
+MANIFEST = "columns.json"
+
+
+class DetectionStoreWriter:
+    """Streams every rendered detection of a job into per-column files.
+
+    `add` is called once per output frame in frame order; `close` writes the
+    manifest (row count, dtypes, class names) that makes the store readable.
+    """
+
+    def __init__(self, store_dir: Path) -> None:
+        self._dir = store_dir
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._files = {name: open(self._dir / f"{name}.bin", "wb") for name in COLUMNS}
+        self._rows = 0
+        self._names: dict[int, str] = {}
+
+    def add(self, frame_index: int, ts_ms: int, dets: DetectionBatch, risks: np.ndarray) -> None:
+        n = len(dets)
+        if n == 0:
+            return
+        self._names.update({int(k): v for k, v in dets.names.items()})
+        cols = {
+            "frame": np.full(n, frame_index),
+            "ts_ms": np.full(n, ts_ms),
+            "class_id": dets.class_id,
+            "conf": dets.confidence,
+            "x": dets.boxes[:, 0],
+            "y": dets.boxes[:, 1],
+            "w": dets.boxes[:, 2],
+            "h": dets.boxes[:, 3],
+            "risk": risks,
+            "track_id": dets.track_id if dets.track_id is not None else np.full(n, -1),
+        }
+        for name, dtype in COLUMNS.items():
+            self._files[name].write(np.ascontiguousarray(cols[name], dtype=dtype).tobytes())
+        self._rows += n
+
+    def extend_store(self, store: DetectionStore, track_offset: int = 0) -> None:
+        """Append all rows of another (earlier-closed) store, shifting its track IDs."""
+        self._names.update(store.names)
+        for name, dtype in COLUMNS.items():
+            col = np.asarray(store.column(name))
+            if name == "track_id" and track_offset:
+                col = np.where(col >= 0, col + track_offset, col)
+            self._files[name].write(np.ascontiguousarray(col, dtype=dtype).tobytes())
+        self._rows += len(store)
+
+    def close(self) -> None:
+        if not self._files:
+            return
+        for fh in self._files.values():
+            fh.close()
+        self._files = {}
+        manifest = {"rows": self._rows, "columns": COLUMNS, "names": {str(k): v for k, v in self._names.items()}}
+        (self._dir / MANIFEST).write_text(json.dumps(manifest), encoding="utf-8")
+
+    def __enter__(self) -> DetectionStoreWriter:
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+class DetectionStore:
+    """Read side: columns are memory-mapped, so queries touch only the pages they slice."""
+
+    def __init__(self, store_dir: Path) -> None:
+        manifest = json.loads((store_dir / MANIFEST).read_text(encoding="utf-8"))
+        self._rows = int(manifest["rows"])
+        self.names = {int(k): v for k, v in manifest.get("names", {}).items()}
+        self._cols: dict[str, np.ndarray] = {}
+        for name, dtype in manifest["columns"].items():
+            if self._rows == 0:
+                self._cols[name] = np.zeros(0, dtype=dtype)
+            else:
+                self._cols[name] = np.memmap(store_dir / f"{name}.bin", dtype=dtype, mode="r", shape=(self._rows,))
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def column(self, name: str) -> np.ndarray:
+        return self._cols[name]
+
+    def query(
+        self,
+        from_frame: int | None = None,
+        to_frame: int | None = None,
+        from_ms: int | None = None,
+        to_ms: int | None = None,
+        class_ids: Iterable[int] | None = None,
+        track_id: int | None = None,
+        limit: int | None = None,
+    ) -> dict[str, np.ndarray]:
+        """Rows with from <= frame/ts < to, optionally filtered by class and track.
+
+        Frame and time bounds are binary searches on the sorted columns; the
+        filters then run only over that slice.
+        """
+        lo, hi = 0, self._rows
+        frame, ts = self._cols["frame"], self._cols["ts_ms"]
+        if from_frame is not None:
+            lo = max(lo, int(np.searchsorted(frame, from_frame, side="left")))
+        if to_frame is not None:
+            hi = min(hi, int(np.searchsorted(frame, to_frame, side="left")))
+        if from_ms is not None:
+            lo = max(lo, int(np.searchsorted(ts, from_ms, side="left")))
+        if to_ms is not None:
+            hi = min(hi, int(np.searchsorted(ts, to_ms, side="left")))
+        hi = max(lo, hi)
+
+        out = {name: np.asarray(col[lo:hi]) for name, col in self._cols.items()}
+        mask = None
+        if class_ids is not None:
+            mask = np.isin(out["class_id"], np.asarray(list(class_ids), dtype=np.int64))
+        if track_id is not None:
+            tmask = out["track_id"] == int(track_id)
+            mask = tmask if mask is None else mask & tmask
+        if mask is not None:
+            out = {name: col[mask] for name, col in out.items()}
+        if limit is not None:
+            out = {name: col[: max(0, int(limit))] for name, col in out.items()}
+        return out
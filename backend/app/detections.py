@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, List, Mapping
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from .vision import AnalyzeConfig
+
+
+RISK_LEVELS = ("info", "warning", "danger")
+RISK_REASONS = (None, "enter_roi", "near_bottom")
+RISK_INFO, RISK_WARNING, RISK_DANGER = 0, 1, 2
+
+
+@dataclass
+class DetectionBatch:
+    """Array-backed detections of one frame.
+
+    Post-processing (class/confidence masks, lane ROI, risk levels) works on
+    these arrays in bulk; `to_dicts` builds the per-detection dicts only at
+    the API edge.
+    """
+
+    boxes: np.ndarray  # (N, 4) int32: x, y, w, h
+    confidence: np.ndarray  # (N,) float32
+    class_id: np.ndarray  # (N,) int32
+    area: np.ndarray  # (N,) int64
+    names: Mapping[int, str]  # class_id -> class_name
+    track_id: np.ndarray | None = None  # (N,) int64 when tracking
+
+    @classmethod
+    def empty(cls, names: Mapping[int, str] | None = None) -> DetectionBatch:
+        return cls(
+            boxes=np.zeros((0, 4), dtype=np.int32),
+            confidence=np.zeros(0, dtype=np.float32),
+            class_id=np.zeros(0, dtype=np.int32),
+            area=np.zeros(0, dtype=np.int64),
+            names=names or {},
+        )
+
+    @classmethod
+    def from_xyxy(
+        cls, xyxy: np.ndarray, confidence: np.ndarray, class_id: np.ndarray, names: Mapping[int, str]
+    ) -> DetectionBatch:
+        """Build from float corner boxes; coordinates are truncated like `int()`."""
+        xyxy = np.asarray(xyxy).reshape(-1, 4).astype(np.int32)
+        boxes = np.empty_like(xyxy)
+        boxes[:, :2] = xyxy[:, :2]
+        boxes[:, 2:] = xyxy[:, 2:] - xyxy[:, :2]
+        return cls(
+            boxes=boxes,
+            confidence=np.asarray(confidence, dtype=np.float32).reshape(-1),
+            class_id=np.asarray(class_id).astype(np.int32).reshape(-1),
+            area=boxes[:, 2].astype(np.int64) * boxes[:, 3],
+            names=names,
+        )
+
+    @classmethod
+    def from_dicts(cls, dets: List[Dict[str, Any]]) -> DetectionBatch:
+        if not dets:
+            return cls.empty()
+        names = {int(d["class_id"]): str(d["class_name"]) for d in dets}
+        batch = cls(
+            boxes=np.array([[d["x"], d["y"], d["w"], d["h"]] for d in dets], dtype=np.int32),
+            confidence=np.array([d["confidence"] for d in dets], dtype=np.float32),
+            class_id=np.array([d["class_id"] for d in dets], dtype=np.int32),
+            area=np.array([d.get("area", d["w"] * d["h"]) for d in dets], dtype=np.int64),
+            names=names,
+        )
+        if all("track_id" in d for d in dets):
+            batch.track_id = np.array([d["track_id"] for d in dets], dtype=np.int64)
+        return batch
+
+    def __len__(self) -> int:
+        return int(self.boxes.shape[0])
+
+    def select(self, index: np.ndarray) -> DetectionBatch:
+        """Subset by boolean mask or integer index array."""
+        return DetectionBatch(
+            boxes=self.boxes[index],
+            confidence=self.confidence[index],
+            class_id=self.class_id[index],
+            area=self.area[index],
+            names=self.names,
+            track_id=self.track_id[index] if self.track_id is not None else None,
+        )
+
+    def translate(self, dx: int, dy: int) -> DetectionBatch:
+        """Shift boxes by (dx, dy), e.g. from crop to full-frame coordinates."""
+        if dx == 0 and dy == 0:
+            return self
+        boxes = self.boxes.copy()
+        boxes[:, 0] += dx
+        boxes[:, 1] += dy
+        return DetectionBatch(
+            boxes=boxes,
+            confidence=self.confidence,
+            class_id=self.class_id,
+            area=self.area,
+            names=self.names,
+            track_id=self.track_id,
+        )
+
+    def class_names(self) -> list[str]:
+        return [self.names.get(int(c), str(int(c))) for c in self.class_id]
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        out = []
+        names = self.class_names()
+        boxes = self.boxes.tolist()
+        confs = self.confidence.tolist()
+        cls_ids = self.class_id.tolist()
+        areas = self.area.tolist()
+        track_ids = self.track_id.tolist() if self.track_id is not None else None
+        for i in range(len(boxes)):
+            x, y, w, h = boxes[i]
+            det = {
+                "x": x,
+                "y": y,
+                "w": w,
+                "h": h,
+                "class_id": cls_ids[i],
+                "class_name": names[i],
+                "confidence": confs[i],
+                "area": areas[i],
+            }
+            if track_ids is not None:
+                det["track_id"] = track_ids[i]
+            out.append(det)
+        return out
+
+
+def class_mask(class_id: np.ndarray, cfg: AnalyzeConfig) -> np.ndarray:
+    """True for detections whose class is in `cfg.obstacle_classes`."""
+    return np.isin(class_id, np.asarray(cfg.obstacle_classes, dtype=np.int64))
+
+
+def lane_roi_mask(batch: DetectionBatch, poly: np.ndarray | None) -> np.ndarray:
+    """True for boxes whose bottom-center lies inside (or on) the lane polygon.
+
+    Vectorized equivalent of `cv2.pointPolygonTest(poly, pt, False) >= 0`
+    for the convex lane trapezoid.
+    """
+    n = len(batch)
+    if poly is None:
+        return np.ones(n, dtype=bool)
+    if n == 0:
+        return np.zeros(0, dtype=bool)
+    b = batch.boxes.astype(np.float64)
+    px = b[:, 0] + b[:, 2] / 2.0
+    py = b[:, 1] + b[:, 3]
+    p = poly.astype(np.float64)
+    q = np.roll(p, -1, axis=0)
+    # Cross product of each edge with the vector to the point: (edges, N)
+    cross = (q[:, 0:1] - p[:, 0:1]) * (py[None, :] - p[:, 1:2]) - (q[:, 1:2] - p[:, 1:2]) * (px[None, :] - p[:, 0:1])
+    return np.all(cross >= 0, axis=0) | np.all(cross <= 0, axis=0)
+
+
+def risk_codes(batch: DetectionBatch, frame_h: int, cfg: AnalyzeConfig) -> np.ndarray:
+    """Risk level per detection as indices into RISK_LEVELS / RISK_REASONS."""
+    n = len(batch)
+    codes = np.zeros(n, dtype=np.int8)
+    if frame_h <= 0 or n == 0:
+        return codes
+    bottom_ratio = (batch.boxes[:, 1] + batch.boxes[:, 3]) / frame_h
+    codes[bottom_ratio >= cfg.roi_warning_y_ratio] = RISK_WARNING
+    codes[bottom_ratio >= cfg.roi_danger_y_ratio] = RISK_DANGER
+    return codes
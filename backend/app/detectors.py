@@ -0,0 +1,447 @@
+from __future__ import annotations
+
+import ast
+import hashlib
+import importlib.util
+import os
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, List
+
+import cv2
+import numpy as np
+
+from .detections import DetectionBatch, class_mask
+
+if TYPE_CHECKING:
+    from .vision import AnalyzeConfig
+
+
+# Heavy runtimes are only imported when a backend that needs them is used,
+# so nodes running the exported-graph or basic backends never load torch.
+YOLO_AVAILABLE = importlib.util.find_spec("ultralytics") is not None
+ONNXRUNTIME_AVAILABLE = importlib.util.find_spec("onnxruntime") is not None
+OPENVINO_AVAILABLE = importlib.util.find_spec("openvino") is not None
+
+BACKENDS = ("auto", "yolo", "onnx", "openvino", "basic")
+
+DEFAULT_MODEL_PATHS = {
+    "yolo": "yolov8n.pt",  # Nano model - fast and lightweight
+    "onnx": "yolov8n.onnx",
+    "openvino": "yolov8n_openvino_model",
+}
+
+COCO_CLASS_NAMES = (
+    "person", "bicycle", "car", "motorcycle", "airplane", "bus", "train", "truck", "boat",
+    "traffic light", "fire hydrant", "stop sign", "parking meter", "bench", "bird", "cat", "dog",
+    "horse", "sheep", "cow", "elephant", "bear", "zebra", "giraffe", "backpack", "umbrella",
+    "handbag", "tie", "suitcase", "frisbee", "skis", "snowboard", "sports ball", "kite",
+    "baseball bat", "baseball glove", "skateboard", "surfboard", "tennis racket", "bottle",
+    "wine glass", "cup", "fork", "knife", "spoon", "bowl", "banana", "apple", "sandwich",
+    "orange", "broccoli", "carrot", "hot dog", "pizza", "donut", "cake", "chair", "couch",
+    "potted plant", "bed", "dining table", "toilet", "tv", "laptop", "mouse", "remote",
+    "keyboard", "cell phone", "microwave", "oven", "toaster", "sink", "refrigerator", "book",
+    "clock", "vase", "scissors", "teddy bear", "hair drier", "toothbrush",
+)
+
+
+# Global model instance (loaded once)
+_yolo_model = None
+_model_lock = threading.RLock()
+# Ultralytics keeps per-call state on its predictor: one inference at a time per model
+_yolo_infer_lock = threading.Lock()
+_shared_detectors: dict[tuple[str, str], "Detector"] = {}
+
+
+def get_yolo_model():
+    """Load the default Ultralytics YOLO model (singleton); returns None if unavailable."""
+    global _yolo_model
+    if _yolo_model is None and YOLO_AVAILABLE:
+        with _model_lock:
+            if _yolo_model is None:
+                try:
+                    from ultralytics import YOLO
+                except ImportError:
+                    return None
+                _yolo_model = YOLO(DEFAULT_MODEL_PATHS["yolo"])
+    return _yolo_model
+
+
+def yolo_result_to_batch(result, model, cfg: AnalyzeConfig) -> DetectionBatch:
+    boxes = result.boxes.cpu().numpy()
+    cls_ids = boxes.cls.astype(np.int32)
+
+    # Only include specified obstacle classes
+    keep = class_mask(cls_ids, cfg)
+    return DetectionBatch.from_xyxy(boxes.xyxy[keep], boxes.conf[keep], cls_ids[keep], model.names)
+
+
+# Frames the basic detector's MOG2 model averages over
+BACKSUB_HISTORY = 500
+
+
+def create_backsub():
+    return cv2.createBackgroundSubtractorMOG2(history=BACKSUB_HISTORY, varThreshold=16, detectShadows=True)
+
+
+BASIC_CLASS_NAMES = {-1: "obstacle"}
+
+
+def detect_basic(frame: np.ndarray, cfg: AnalyzeConfig, backsub) -> DetectionBatch:
+    """Fallback detection using background subtraction (less accurate)"""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    gray = cv2.GaussianBlur(gray, (5, 5), 0)
+
+    fgmask = backsub.apply(gray)
+    fgmask = cv2.medianBlur(fgmask, 5)
+    _, fgmask = cv2.threshold(fgmask, 200, 255, cv2.THRESH_BINARY)
+
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5))
+    fgmask = cv2.morphologyEx(fgmask, cv2.MORPH_CLOSE, kernel, iterations=2)
+
+    contours, _ = cv2.findContours(fgmask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return DetectionBatch.empty(BASIC_CLASS_NAMES)
+
+    areas = np.array([int(cv2.contourArea(c)) for c in contours], dtype=np.int64)
+    keep = np.flatnonzero(areas >= cfg.min_contour_area)
+    n = len(keep)
+    return DetectionBatch(
+        boxes=np.array([cv2.boundingRect(contours[i]) for i in keep], dtype=np.int32).reshape(n, 4),
+        confidence=np.full(n, 0.5, dtype=np.float32),
+        class_id=np.full(n, -1, dtype=np.int32),
+        area=areas[keep],
+        names=BASIC_CLASS_NAMES,
+    )
+
+
+class Detector:
+    """Detection backend interface.
+
+    `detect` returns an array-backed `DetectionBatch` already filtered to
+    `cfg.obstacle_classes`. Stateful backends (`stateful = True`) must get a
+    fresh instance per video stream.
+    """
+
+    name = "base"
+    stateful = False
+
+    def detect(self, frame: np.ndarray, cfg: AnalyzeConfig) -> DetectionBatch:
+        raise NotImplementedError
+
+    def detect_batch(self, frames: List[np.ndarray], cfg: AnalyzeConfig) -> List[DetectionBatch]:
+        return [self.detect(f, cfg) for f in frames]
+
+
+class UltralyticsDetector(Detector):
+    """PyTorch eager-mode YOLOv8 through the `ultralytics` package."""
+
+    name = "yolo"
+
+    def __init__(self, weights: str | None = None) -> None:
+        if weights is None or weights == DEFAULT_MODEL_PATHS["yolo"]:
+            self.model = get_yolo_model()
+            # The default model is shared with every other instance wrapping it
+            self._lock = _yolo_infer_lock
+        elif YOLO_AVAILABLE:
+            from ultralytics import YOLO
+
+            self.model = YOLO(weights)
+            self._lock = threading.Lock()
+        else:
+            self.model = None
+        if self.model is None:
+            raise RuntimeError("ultralytics is not installed")
+
+    def detect(self, frame: np.ndarray, cfg: AnalyzeConfig) -> DetectionBatch:
+        with self._lock:
+            results = self.model(frame, verbose=False, conf=cfg.confidence_threshold)
+        return yolo_result_to_batch(results[0], self.model, cfg)
+
+    def detect_batch(self, frames: List[np.ndarray], cfg: AnalyzeConfig) -> List[DetectionBatch]:
+        if not frames:
+            return []
+        if len(frames) == 1:
+            return [self.detect(frames[0], cfg)]
+        with self._lock:
+            results = self.model(list(frames), verbose=False, conf=cfg.confidence_threshold)
+        return [yolo_result_to_batch(result, self.model, cfg) for result in results]
+
+
+class ExportedGraphDetector(Detector):
+    """YOLOv8 exported graph (ONNX Runtime or OpenVINO) with its own pre/post-processing.
+
+    Expects the standard Ultralytics export layout: one `(N, 4 + num_classes, anchors)`
+    output of center-xywh boxes followed by per-class scores.
+    """
+
+    iou_threshold = 0.7
+    max_detections = 300
+
+    def __init__(self, engine: str, model_path: str | None = None) -> None:
+        self.name = engine
+        path = Path(model_path or DEFAULT_MODEL_PATHS[engine])
+        if engine == "onnx":
+            self._load_onnx(path)
+        elif engine == "openvino":
+            self._load_openvino(path)
+        else:
+            raise ValueError(f"Unknown exported-graph engine: {engine}")
+
+    def _load_onnx(self, path: Path) -> None:
+        import onnxruntime as ort
+
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self._session = ort.InferenceSession(str(path), sess_options=opts, providers=["CPUExecutionProvider"])
+        inp = self._session.get_inputs()[0]
+        self._input_name = inp.name
+        self._set_input_shape(inp.shape)
+        meta = self._session.get_modelmeta().custom_metadata_map or {}
+        self.names = _parse_names(meta.get("names"))
+        self._run = lambda blob: self._session.run(None, {self._input_name: blob})[0]
+
+    def _load_openvino(self, path: Path) -> None:
+        import openvino as ov
+
+        if path.is_dir():
+            xmls = sorted(path.glob("*.xml"))
+            if not xmls:
+                raise FileNotFoundError(f"No OpenVINO .xml model in {path}")
+            path = xmls[0]
+        core = ov.Core()
+        compiled = core.compile_model(str(path), "CPU")
+        inp = compiled.input(0)
+        shape = [d.get_length() if d.is_static else -1 for d in inp.get_partial_shape()]
+        self._set_input_shape(shape)
+        self.names = _parse_names(_read_openvino_names(path))
+        out = compiled.output(0)
+        # Calling a CompiledModel reuses one internal InferRequest, so calls must not overlap
+        # (ONNX Runtime's InferenceSession.run is thread-safe and needs no lock)
+        lock = threading.Lock()
+
+        def run(blob: np.ndarray) -> np.ndarray:
+            with lock:
+                return np.array(compiled([blob])[out])
+
+        self._run = run
+
+    def _set_input_shape(self, shape) -> None:
+        def static(v) -> int | None:
+            return int(v) if isinstance(v, (int, np.integer)) and int(v) > 0 else None
+
+        self._batch = static(shape[0])
+        self._in_h = static(shape[2]) or 640
+        self._in_w = static(shape[3]) or 640
+
+    def _preprocess(self, frame: np.ndarray) -> tuple[np.ndarray, float, float, float]:
+        h, w = frame.shape[:2]
+        gain = min(self._in_h / h, self._in_w / w)
+        new_w, new_h = int(round(w * gain)), int(round(h * gain))
+        pad_x = (self._in_w - new_w) / 2.0
+        pad_y = (self._in_h - new_h) / 2.0
+        resized = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR) if (new_w, new_h) != (w, h) else frame
+        top, left = int(round(pad_y - 0.1)), int(round(pad_x - 0.1))
+        bottom, right = self._in_h - new_h - top, self._in_w - new_w - left
+        boxed = cv2.copyMakeBorder(resized, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(114, 114, 114))
+        blob = cv2.dnn.blobFromImage(boxed, scalefactor=1.0 / 255.0, swapRB=True)
+        return blob, gain, float(left), float(top)
+
+    def _postprocess(
+        self, pred: np.ndarray, frame_shape: tuple[int, ...], gain: float, pad_x: float, pad_y: float, cfg: AnalyzeConfig
+    ) -> DetectionBatch:
+        pred = pred.T  # (anchors, 4 + num_classes)
+        scores = pred[:, 4:]
+        cls_ids = scores.argmax(axis=1)
+        confs = scores[np.arange(len(scores)), cls_ids]
+        keep = confs >= cfg.confidence_threshold
+        if not np.any(keep):
+            return DetectionBatch.empty(self.names)
+        pred, cls_ids, confs = pred[keep], cls_ids[keep], confs[keep]
+
+        xywh = pred[:, :4].copy()
+        xywh[:, 0] -= xywh[:, 2] / 2.0
+        xywh[:, 1] -= xywh[:, 3] / 2.0
+        idx = cv2.dnn.NMSBoxesBatched(
+            xywh.tolist(), confs.tolist(), cls_ids.tolist(), cfg.confidence_threshold, self.iou_threshold
+        )
+        idx = np.asarray(idx, dtype=np.int64).reshape(-1)[: self.max_detections]
+        idx = idx[class_mask(cls_ids[idx], cfg)]
+
+        fh, fw = frame_shape[:2]
+        xyxy = xywh[idx].astype(np.float64)
+        xyxy[:, 2:] += xyxy[:, :2]
+        xyxy[:, [0, 2]] = np.clip((xyxy[:, [0, 2]] - pad_x) / gain, 0.0, fw)
+        xyxy[:, [1, 3]] = np.clip((xyxy[:, [1, 3]] - pad_y) / gain, 0.0, fh)
+        return DetectionBatch.from_xyxy(xyxy, confs[idx], cls_ids[idx], self.names)
+
+    def detect(self, frame: np.ndarray, cfg: AnalyzeConfig) -> DetectionBatch:
+        blob, gain, pad_x, pad_y = self._preprocess(frame)
+        pred = self._run(blob)
+        return self._postprocess(pred[0], frame.shape, gain, pad_x, pad_y, cfg)
+
+    def detect_batch(self, frames: List[np.ndarray], cfg: AnalyzeConfig) -> List[DetectionBatch]:
+        if self._batch is not None or len(frames) <= 1:
+            # Static batch dimension: run frame by frame
+            return [self.detect(f, cfg) for f in frames]
+        prepped = [self._preprocess(f) for f in frames]
+        pred = self._run(np.concatenate([p[0] for p in prepped], axis=0))
+        return [
+            self._postprocess(pred[i], f.shape, gain, pad_x, pad_y, cfg)
+            for i, (f, (_, gain, pad_x, pad_y)) in enumerate(zip(frames, prepped))
+        ]
+
+
+class BasicDetector(Detector):
+    """Background-subtraction detector; keeps its own MOG2 model, so one instance per stream."""
+
+    name = "basic"
+    stateful = True
+
+    def __init__(self) -> None:
+        self.backsub = create_backsub()
+
+    def detect(self, frame: np.ndarray, cfg: AnalyzeConfig) -> DetectionBatch:
+        return detect_basic(frame, cfg, self.backsub)
+
+
+def _parse_names(raw: Any) -> dict[int, str]:
+    if isinstance(raw, str):
+        try:
+            raw = ast.literal_eval(raw)
+        except (ValueError, SyntaxError):
+            raw = None
+    if isinstance(raw, dict) and raw:
+        return {int(k): str(v) for k, v in raw.items()}
+    if isinstance(raw, (list, tuple)) and raw:
+        return dict(enumerate(str(n) for n in raw))
+    return dict(enumerate(COCO_CLASS_NAMES))
+
+
+def _read_openvino_names(xml_path: Path) -> Any:
+    # Ultralytics writes a metadata.yaml next to the exported model
+    meta = xml_path.parent / "metadata.yaml"
+    if not meta.exists():
+        return None
+    names: dict[int, str] = {}
+    in_names = False
+    for line in meta.read_text(encoding="utf-8").splitlines():
+        if line.startswith("names:"):
+            in_names = True
+            continue
+        if in_names:
+            if not line.startswith(" "):
+                break
+            k, _, v = line.strip().partition(":")
+            if k.isdigit():
+                names[int(k)] = v.strip().strip("'\"")
+    return names or None
+
+
+def _backend_for_path(model_path: str) -> str:
+    suffix = Path(model_path).suffix.lower()
+    if suffix == ".onnx":
+        return "onnx"
+    if suffix == ".xml" or os.path.isdir(model_path):
+        return "openvino"
+    return "yolo"
+
+
+def _backend_usable(backend: str, model_path: str | None) -> bool:
+    if backend == "yolo":
+        return YOLO_AVAILABLE
+    available = ONNXRUNTIME_AVAILABLE if backend == "onnx" else OPENVINO_AVAILABLE
+    return available and os.path.exists(model_path or DEFAULT_MODEL_PATHS[backend])
+
+
+def resolve_backend(cfg: AnalyzeConfig) -> str:
+    """Map `cfg.detector_backend` ("auto" included) to a concrete backend name."""
+    backend = (cfg.detector_backend or "auto").lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown detector backend: {cfg.detector_backend}")
+    if backend != "auto":
+        return backend
+    if cfg.model_path:
+        candidates = [_backend_for_path(cfg.model_path)]
+    else:
+        # Exported graphs are much faster than eager torch on CPU, so prefer them when present
+        candidates = ["openvino", "onnx", "yolo"]
+    for candidate in candidates:
+        if _backend_usable(candidate, cfg.model_path):
+            return candidate
+    return "basic"
+
+
+# (backend, ((path, size, mtime_ns), ...)) -> version string
+_model_versions: dict[tuple, str] = {}
+
+
+def model_version(cfg: AnalyzeConfig) -> str:
+    """Identify the model `cfg` runs with: its backend plus a content hash of the weights.
+
+    Hashes are memoized per file size and mtime, so only the first call per
+    model file reads it.
+    """
+    backend = resolve_backend(cfg)
+    if backend == "basic":
+        return "basic"
+    path = Path(cfg.model_path or DEFAULT_MODEL_PATHS[backend])
+    if path.is_dir():
+        files = sorted(p for p in path.rglob("*") if p.is_file())
+    else:
+        files = [path] if path.is_file() else []
+    if not files:
+        # Not on disk (Ultralytics fetches weights by name): the name is all we know
+        return f"{backend}:{path.name}"
+
+    key = (backend, tuple((str(p), p.stat().st_size, p.stat().st_mtime_ns) for p in files))
+    version = _model_versions.get(key)
+    if version is None:
+        h = hashlib.sha256()
+        for p in files:
+            h.update(p.name.encode("utf-8"))
+            with open(p, "rb") as fh:
+                for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+                    h.update(chunk)
+        version = _model_versions[key] = f"{backend}:{h.hexdigest()[:16]}"
+    return version
+
+
+def create_detector(cfg: AnalyzeConfig) -> Detector:
+    """Return a detector for one video stream.
+
+    Model-backed detectors keep no per-stream state and one instance per model
+    is shared across streams and threads (backends whose inference is not
+    thread-safe serialize it internally); the basic detector is created fresh. With backend "auto", a model that fails to load
+    falls back to the basic detector; an explicitly requested one raises.
+    """
+    backend = resolve_backend(cfg)
+    if backend == "basic":
+        return BasicDetector()
+
+    key = (backend, cfg.model_path or DEFAULT_MODEL_PATHS[backend])
+    with _model_lock:
+        det = _shared_detectors.get(key)
+        if det is None:
+            try:
+                if backend == "yolo":
+                    det = UltralyticsDetector(cfg.model_path)
+                else:
+                    det = ExportedGraphDetector(backend, cfg.model_path)
+            except Exception:
+                if (cfg.detector_backend or "auto").lower() != "auto":
+                    raise
+                return BasicDetector()
+            _shared_detectors[key] = det
+    return det
+
+
+def warmup(cfg: AnalyzeConfig, frame_shape: tuple[int, int, int] = (360, 640, 3)) -> Detector:
+    """Load the detector selected by `cfg` and run one dummy inference.
+
+    The dummy pass triggers lazy weight loading and kernel selection so the
+    first real request does not pay for them.
+    """
+    det = create_detector(cfg)
+    det.detect(np.zeros(frame_shape, dtype=np.uint8), cfg)
+    return det
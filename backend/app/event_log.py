@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import bisect
+import json
+from pathlib import Path
+from typing import Any, Iterable
+
+from .detections import RISK_LEVELS
+
+
+# One index entry per this many events
+INDEX_STRIDE = 256
+
+
+class EventLogWriter:
+    """Appends events to an NDJSON log while a job runs.
+
+    Quacks like the `events_out` list taken by `annotate_video` (`append`,
+    `extend`, `len`). Events must arrive in timestamp order. `close` writes
+    the sidecar index: every `INDEX_STRIDE`-th event's (timestamp_ms,
+    frame_index, byte offset) plus per-risk-level counts.
+    """
+
+    def __init__(self, log_path: Path, index_path: Path) -> None:
+        self._log_path = log_path
+        self._index_path = index_path
+        self._fh = open(log_path, "wb")
+        self._offset = 0
+        self._count = 0
+        self._counts = {level: 0 for level in RISK_LEVELS}
+        self._entries: list[list[int]] = []
+
+    def append(self, event: dict[str, Any]) -> None:
+        if self._count % INDEX_STRIDE == 0:
+            self._entries.append([int(event.get("timestamp_ms", 0)), int(event.get("frame_index", 0)), self._offset])
+        line = (json.dumps(event, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        self._fh.write(line)
+        self._offset += len(line)
+        self._count += 1
+        level = event.get("risk_level")
+        if level in self._counts:
+            self._counts[level] += 1
+
+    def extend(self, events: Iterable[dict[str, Any]]) -> None:
+        for event in events:
+            self.append(event)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def close(self) -> None:
+        if self._fh.closed:
+            return
+        self._fh.close()
+        index = {"count": self._count, "counts": self._counts, "stride": INDEX_STRIDE, "entries": self._entries}
+        self._index_path.write_text(json.dumps(index), encoding="utf-8")
+
+    def __enter__(self) -> EventLogWriter:
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def query_event_log(
+    log_path: Path,
+    index_path: Path,
+    from_ms: int | None = None,
+    to_ms: int | None = None,
+    risk_levels: set[str] | None = None,
+    limit: int = 1000,
+    cursor: int | None = None,
+) -> dict[str, Any]:
+    """Read one page of events with from_ms <= timestamp_ms < to_ms.
+
+    The index locates the first candidate line, so only the requested slice
+    is read. `cursor` is the byte offset returned as `next_cursor` by the
+    previous page (None once the range is exhausted).
+    """
+    index = json.loads(index_path.read_text(encoding="utf-8")) if index_path.exists() else {}
+    entries = index.get("entries", [])
+
+    start = 0
+    if from_ms is not None and entries:
+        # Last indexed event strictly before from_ms; everything at/after from_ms follows it
+        i = bisect.bisect_left([e[0] for e in entries], int(from_ms)) - 1
+        if i >= 0:
+            start = entries[i][2]
+    if cursor is not None:
+        start = max(start, int(cursor))
+
+    events: list[dict[str, Any]] = []
+    next_cursor: int | None = None
+    with open(log_path, "rb") as fh:
+        fh.seek(start)
+        offset = start
+        while True:
+            line = fh.readline()
+            if not line:
+                break
+            line_offset = offset
+            offset += len(line)
+            event = json.loads(line)
+            ts = int(event.get("timestamp_ms", 0))
+            if from_ms is not None and ts < from_ms:
+                continue
+            if to_ms is not None and ts >= to_ms:
+                break
+            if risk_levels is not None and event.get("risk_level") not in risk_levels:
+                continue
+            if len(events) >= limit:
+                next_cursor = line_offset
+                break
+            events.append(event)
+
+    return {
+        "events": events,
+        "next_cursor": next_cursor,
+        "total": index.get("count"),
+        "counts": index.get("counts"),
+    }
+
+
+def query_event_list(
+    events: list[dict[str, Any]],
+    from_ms: int | None = None,
+    to_ms: int | None = None,
+    risk_levels: set[str] | None = None,
+    limit: int = 1000,
+    cursor: int | None = None,
+) -> dict[str, Any]:
+    """`query_event_log` over an in-memory list (legacy `events.json` results); `cursor` is a list index."""
+    counts = {level: 0 for level in RISK_LEVELS}
+    for event in events:
+        if event.get("risk_level") in counts:
+            counts[event["risk_level"]] += 1
+
+    out: list[dict[str, Any]] = []
+    next_cursor: int | None = None
+    for i in range(max(0, int(cursor or 0)), len(events)):
+        event = events[i]
+        ts = int(event.get("timestamp_ms", 0))
+        if from_ms is not None and ts < from_ms:
+            continue
+        if to_ms is not None and ts >= to_ms:
+            break
+        if risk_levels is not None and event.get("risk_level") not in risk_levels:
+            continue
+        if len(out) >= limit:
+            next_cursor = i
+            break
+        out.append(event)
+    return {"events": out, "next_cursor": next_cursor, "total": len(events), "counts": counts}
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+from typing import TYPE_CHECKING, Any
+
+import cv2
+import numpy as np
+
+if TYPE_CHECKING:
+    from .vision import AnalyzeConfig
+
+
+DECISIONS = ("first", "motion", "max_skip", "static")
+
+
+@dataclass
+class GateStats:
+    evaluated_frames: int = 0
+    skipped_frames: int = 0
+    forced_frames: int = 0  # Ran only because max_skip was reached
+    last_decision: str | None = None  # One of DECISIONS
+    last_motion_ratio: float | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+class MotionGate:
+    """Skips detection on static scenes.
+
+    Runs a MOG2 background model on a small grayscale copy of each frame due
+    for detection. Detection runs when the changed-pixel fraction reaches
+    `threshold`, or when `max_skip` frames have passed since the last run;
+    otherwise the caller reuses the previous detections.
+    """
+
+    history = 200  # Frames the background model averages over
+
+    def __init__(self, threshold: float = 0.002, max_skip: int = 30, scale_width: int = 160) -> None:
+        self.threshold = max(0.0, float(threshold))
+        self.max_skip = max(1, int(max_skip))
+        self.scale_width = max(16, int(scale_width))
+        self._backsub = cv2.createBackgroundSubtractorMOG2(history=self.history, varThreshold=16, detectShadows=False)
+        self._last_run_frame: int | None = None
+        self.stats = GateStats()
+
+    def motion_ratio(self, frame: np.ndarray) -> float:
+        h, w = frame.shape[:2]
+        if w > self.scale_width:
+            small = cv2.resize(frame, (self.scale_width, max(1, int(h * self.scale_width / w))), interpolation=cv2.INTER_AREA)
+        else:
+            small = frame
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        fg = self._backsub.apply(gray)
+        return float(np.count_nonzero(fg)) / float(fg.size or 1)
+
+    def should_run(self, frame_index: int, frame: np.ndarray) -> bool:
+        ratio = self.motion_ratio(frame)
+        st = self.stats
+        st.evaluated_frames += 1
+        st.last_motion_ratio = round(ratio, 5)
+
+        if self._last_run_frame is None:
+            decision = "first"
+        elif ratio >= self.threshold:
+            decision = "motion"
+        elif frame_index - self._last_run_frame >= self.max_skip:
+            decision = "max_skip"
+            st.forced_frames += 1
+        else:
+            decision = "static"
+
+        st.last_decision = decision
+        if decision == "static":
+            st.skipped_frames += 1
+            return False
+        self._last_run_frame = frame_index
+        return True
+
+
+def create_motion_gate(cfg: AnalyzeConfig) -> MotionGate | None:
+    """Return a gate for one stream when `cfg.motion_gate_enabled`, else None."""
+    if not cfg.motion_gate_enabled:
+        return None
+    return MotionGate(threshold=cfg.motion_gate_threshold, max_skip=cfg.motion_gate_max_skip)
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+
+
+class JobSubscription:
+    """One asyncio subscriber to a job's changes.
+
+    Notifications only set a flag, so any number of changes between two
+    `wait` calls collapse into one wake-up; the subscriber then reads the
+    latest job state itself.
+    """
+
+    def __init__(self, job_id: str, loop: asyncio.AbstractEventLoop) -> None:
+        self.job_id = job_id
+        self._loop = loop
+        self._event = asyncio.Event()
+
+    def notify(self) -> None:
+        """Thread-safe wake-up."""
+        try:
+            self._loop.call_soon_threadsafe(self._event.set)
+        except RuntimeError:
+            # Event loop already closed
+            pass
+
+    async def wait(self, timeout: float | None = None) -> bool:
+        """Wait for a change; returns False on timeout."""
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        self._event.clear()
+        return True
+
+
+class JobEvents:
+    """In-process pub/sub of job state changes.
+
+    `publish` may be called from any thread (job workers); subscriptions are
+    created on the event loop that consumes them.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._subs: dict[str, set[JobSubscription]] = {}
+
+    def subscribe(self, job_id: str) -> JobSubscription:
+        sub = JobSubscription(job_id, asyncio.get_running_loop())
+        with self._lock:
+            self._subs.setdefault(job_id, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: JobSubscription) -> None:
+        with self._lock:
+            subs = self._subs.get(sub.job_id)
+            if subs is None:
+                return
+            subs.discard(sub)
+            if not subs:
+                del self._subs[sub.job_id]
+
+    def publish(self, job_id: str) -> None:
+        with self._lock:
+            subs = list(self._subs.get(job_id, ()))
+        for sub in subs:
+            sub.notify()
@@ -1,12 +1,13 @@
 from __future__ import annotations
 
 import json
+import sqlite3
 import threading
 import time
 import uuid
-from dataclasses import asdict, dataclass
+from dataclasses import asdict, dataclass, fields
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable
 
 
 @dataclass
@@ -21,14 +22,85 @@ class JobRecord:
     error: str | None
     created_at: float
     updated_at: float
+    filename: str | None = None
+    input_path: str | None = None
+    config: dict[str, Any] | None = None
+    cache_key: str | None = None  # Result-cache key to record the finished result under
+
+
+_COLUMNS = [f.name for f in fields(JobRecord)]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL,
+    processed_frames INTEGER NOT NULL,
+    total_frames INTEGER,
+    message TEXT,
+    result_id TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    filename TEXT,
+    input_path TEXT,
+    config TEXT,
+    cache_key TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+CREATE INDEX IF NOT EXISTS jobs_created ON jobs (created_at);
+"""
+
+
+def _row_values(rec: JobRecord) -> tuple:
+    data = asdict(rec)
+    if data["config"] is not None:
+        data["config"] = json.dumps(data["config"], ensure_ascii=False)
+    return tuple(data[c] for c in _COLUMNS)
+
+
+def _record_from_row(row: sqlite3.Row) -> JobRecord:
+    data = {c: row[c] for c in _COLUMNS}
+    if data["config"] is not None:
+        data["config"] = json.loads(data["config"])
+    return JobRecord(**data)
 
 
 class JobStore:
-    def __init__(self, jobs_dir: Path):
+    """Job records in a SQLite database (WAL mode) under `jobs_dir`.
+
+    Records are cached in memory. State changes go through `update` and are
+    written immediately; per-frame progress goes through `update_progress`,
+    which only touches memory and checkpoints to disk every
+    `checkpoint_interval_s` seconds. `on_change(job_id)` is called after
+    every state change and, for progress, when the message changes or at
+    most once per `notify_interval_s` (outside the store lock).
+    """
+
+    def __init__(
+        self,
+        jobs_dir: Path,
+        checkpoint_interval_s: float = 5.0,
+        on_change: Callable[[str], None] | None = None,
+        notify_interval_s: float = 0.1,
+    ):
         self._jobs_dir = jobs_dir
         self._jobs_dir.mkdir(parents=True, exist_ok=True)
+        self._checkpoint_interval_s = float(checkpoint_interval_s)
+        self._on_change = on_change
+        self._notify_interval_s = float(notify_interval_s)
         self._lock = threading.Lock()
         self._cache: dict[str, JobRecord] = {}
+        self._checkpointed_at: dict[str, float] = {}
+        self._notified_at: dict[str, float] = {}
+
+        self._db = sqlite3.connect(str(jobs_dir / "jobs.sqlite3"), check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._migrate_columns()
+        self._migrate_json_records()
 
     def create_job(self) -> JobRecord:
         now = time.time()
@@ -52,28 +124,51 @@ class JobStore:
 
     def get(self, job_id: str) -> JobRecord | None:
         with self._lock:
-            rec = self._cache.get(job_id)
-            if rec is not None:
-                return rec
-
-            path = self._jobs_dir / f"{job_id}.json"
-            if not path.exists():
-                return None
-            data = json.loads(path.read_text(encoding="utf-8"))
-            rec = JobRecord(**data)
-            self._cache[job_id] = rec
-            return rec
+            return self._get_locked(job_id)
+
+    def list_jobs(
+        self,
+        status: str | None = None,
+        created_after: float | None = None,
+        created_before: float | None = None,
+        limit: int | None = None,
+    ) -> list[JobRecord]:
+        """Jobs ordered by creation time, optionally filtered by status and creation time range."""
+        where: list[str] = []
+        params: list[Any] = []
+        if status is not None:
+            where.append("status = ?")
+            params.append(status)
+        if created_after is not None:
+            where.append("created_at >= ?")
+            params.append(float(created_after))
+        if created_before is not None:
+            where.append("created_at < ?")
+            params.append(float(created_before))
+        sql = "SELECT * FROM jobs"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY created_at"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(max(0, int(limit)))
+
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+            # Cached records carry progress that may not be checkpointed yet
+            return [self._cache.get(row["job_id"]) or _record_from_row(row) for row in rows]
+
+    def count_by_status(self) -> dict[str, int]:
+        """Number of jobs per status; statuses without jobs are left out."""
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {row[0]: row[1] for row in rows}
 
     def update(self, job_id: str, **fields: Any) -> JobRecord:
         with self._lock:
-            rec = self._cache.get(job_id)
+            rec = self._get_locked(job_id)
             if rec is None:
-                path = self._jobs_dir / f"{job_id}.json"
-                if not path.exists():
-                    raise KeyError(job_id)
-                data = json.loads(path.read_text(encoding="utf-8"))
-                rec = JobRecord(**data)
-                self._cache[job_id] = rec
+                raise KeyError(job_id)
 
             for k, v in fields.items():
                 if not hasattr(rec, k):
@@ -81,8 +176,80 @@ class JobStore:
                 setattr(rec, k, v)
             rec.updated_at = time.time()
             self._persist_locked(rec)
+        if self._on_change is not None:
+            self._on_change(job_id)
+        return rec
+
+    def notify(self, job_id: str) -> None:
+        """Call `on_change` for state kept outside the store (the scheduler's queue positions)."""
+        if self._on_change is not None:
+            self._on_change(job_id)
+
+    def delete(self, job_id: str) -> bool:
+        """Remove a job record; False if there was none."""
+        with self._lock:
+            self._cache.pop(job_id, None)
+            self._checkpointed_at.pop(job_id, None)
+            self._notified_at.pop(job_id, None)
+            cur = self._db.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+        return cur.rowcount > 0
+
+    def update_progress(self, job_id: str, processed: int, total: int | None, message: str | None) -> None:
+        """Record frame progress in memory; written to disk only at checkpoints."""
+        with self._lock:
+            rec = self._cache.get(job_id)
+            if rec is None:
+                return
+            now = time.time()
+            # Subscribers only need a wake-up per visible step, not one per frame
+            notify = message != rec.message or now - self._notified_at.get(job_id, 0.0) >= self._notify_interval_s
+            rec.processed_frames = processed
+            rec.total_frames = total
+            rec.progress = min(1.0, processed / total) if total and total > 0 else 0.0
+            rec.message = message
+            rec.updated_at = now
+            if now - self._checkpointed_at.get(job_id, 0.0) >= self._checkpoint_interval_s:
+                self._persist_locked(rec)
+            if notify:
+                self._notified_at[job_id] = now
+        if notify and self._on_change is not None:
+            self._on_change(job_id)
+
+    def _get_locked(self, job_id: str) -> JobRecord | None:
+        rec = self._cache.get(job_id)
+        if rec is not None:
             return rec
+        row = self._db.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        rec = _record_from_row(row)
+        self._cache[job_id] = rec
+        return rec
 
     def _persist_locked(self, rec: JobRecord) -> None:
-        path = self._jobs_dir / f"{rec.job_id}.json"
-        path.write_text(json.dumps(asdict(rec), ensure_ascii=False, indent=2), encoding="utf-8")
+        placeholders = ", ".join("?" for _ in _COLUMNS)
+        self._db.execute(
+            f"INSERT OR REPLACE INTO jobs ({', '.join(_COLUMNS)}) VALUES ({placeholders})",
+            _row_values(rec),
+        )
+        self._checkpointed_at[rec.job_id] = time.time()
+
+    def _migrate_columns(self) -> None:
+        """Add columns introduced after a database was created."""
+        existing = {row["name"] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        if "cache_key" not in existing:
+            self._db.execute("ALTER TABLE jobs ADD COLUMN cache_key TEXT")
+
+    def _migrate_json_records(self) -> None:
+        """Import job records left as `job_*.json` files by older versions, then remove the files."""
+        known = set(_COLUMNS)
+        for path in sorted(self._jobs_dir.glob("job_*.json")):
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+                rec = JobRecord(**{k: v for k, v in data.items() if k in known})
+            except Exception:
+                continue
+            with self._lock:
+                if self._db.execute("SELECT 1 FROM jobs WHERE job_id = ?", (rec.job_id,)).fetchone() is None:
+                    self._persist_locked(rec)
+            path.unlink(missing_ok=True)
@@ -1,21 +1,119 @@
 from __future__ import annotations
 
 import asyncio
+import hashlib
+import logging
 import os
+import re
+import threading
 import time
+from contextlib import asynccontextmanager
+from dataclasses import asdict
 from pathlib import Path
+from typing import Any
 
-from fastapi import FastAPI, File, Form, HTTPException, UploadFile, WebSocket, WebSocketDisconnect
+from fastapi import Depends, FastAPI, File, Form, Header, HTTPException, Query, Request, UploadFile, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
-
-from .job_store import JobStore
-from .processor import start_job
-from .realtime import RealtimeService
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
+
+from .detection_store import DetectionStore
+from .detections import RISK_LEVELS
+from .detectors import BACKENDS, model_version, warmup
+from .event_log import query_event_list, query_event_log
+from .job_events import JobEvents
+from .job_store import JobRecord, JobStore
+from .metrics import REGISTRY, Registry
+from .processor import JobScheduler
+from .realtime import JPEG_TIERS, RealtimeSessionManager
+from .result_cache import ResultCache, cache_key
 from .storage import Storage
+from .uploads import ChunkChecksumError, UploadConflict, UploadRecord, UploadStore
 from .vision import AnalyzeConfig
 
-app = FastAPI(title="Obstacle Detection API")
+
+_LOG = logging.getLogger(__name__)
+
+_BACKEND_DIR = Path(__file__).resolve().parents[1]
+# Default for jobs and realtime sessions, and the detector loaded by the warm-up
+_DEFAULT_BACKEND = os.environ.get("OBSTACLE_DETECTOR_BACKEND", "auto")
+_STORAGE = Storage(_BACKEND_DIR / "storage")
+_JOB_EVENTS = JobEvents()
+_JOB_STORE = JobStore(_STORAGE.jobs_dir, on_change=_JOB_EVENTS.publish)
+_RESULT_CACHE = ResultCache(_STORAGE.results_dir / "cache.sqlite3")
+_SCHEDULER = JobScheduler(
+    job_store=_JOB_STORE,
+    storage=_STORAGE,
+    max_workers=int(os.environ.get("OBSTACLE_MAX_CONCURRENT_JOBS", "1")),
+    result_cache=_RESULT_CACHE,
+)
+_REALTIME = RealtimeSessionManager()
+_UPLOADS = UploadStore(_STORAGE.jobs_dir / "uploads")
+# Unfinished uploads older than this are removed, checked every `_UPLOAD_EXPIRE_INTERVAL_S`
+_UPLOAD_MAX_AGE_S = float(os.environ.get("OBSTACLE_UPLOAD_MAX_AGE_HOURS", "24")) * 3600
+_UPLOAD_EXPIRE_INTERVAL_S = 600.0
+
+
+def _collect_gauges(registry: Registry) -> None:
+    counts = _JOB_STORE.count_by_status()
+    for status in ("queued", "running"):
+        registry.gauge("jobs", "Jobs per status", status=status).set(counts.get(status, 0))
+    sessions = _REALTIME.sessions()
+    registry.gauge("realtime_sessions", "Active realtime sources").set(len(sessions))
+    registry.gauge("realtime_viewers", "Connected realtime viewers").set(sum(s["viewers"] for s in sessions))
+
+
+REGISTRY.add_collector(_collect_gauges)
+
+# Filled in by the warm-up thread; /ready reports it
+_WARMUP: dict = {"ready": False, "detection_mode": None, "warmup_s": None, "error": None, "attempts": 0}
+_WARMUP_MAX_DELAY_S = 60.0
+
+
+def _warm_up() -> None:
+    """Load and warm the default detector, retrying with backoff until it succeeds."""
+    delay = 1.0
+    while True:
+        started = time.time()
+        _WARMUP["attempts"] += 1
+        try:
+            det = warmup(AnalyzeConfig(detector_backend=_DEFAULT_BACKEND))
+            # Also hashes the weights for the result cache, so the first upload doesn't
+            model_version(AnalyzeConfig(detector_backend=_DEFAULT_BACKEND))
+        except Exception as e:
+            _WARMUP["error"] = str(e)
+            _LOG.warning("Detector warm-up (%s) failed, retrying in %.0fs: %s", _DEFAULT_BACKEND, delay, e)
+            time.sleep(delay)
+            delay = min(delay * 2, _WARMUP_MAX_DELAY_S)
+            continue
+        _WARMUP["detection_mode"] = det.name
+        _WARMUP["warmup_s"] = round(time.time() - started, 3)
+        _WARMUP["error"] = None
+        _WARMUP["ready"] = True
+        return
+
+
+async def _expire_uploads() -> None:
+    while True:
+        await asyncio.to_thread(_UPLOADS.expire, _UPLOAD_MAX_AGE_S)
+        await asyncio.sleep(_UPLOAD_EXPIRE_INTERVAL_S)
+
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    # Model loading runs off the event loop so /health answers immediately
+    threading.Thread(target=_warm_up, name="model_warmup", daemon=True).start()
+    _SCHEDULER.start()
+    _SCHEDULER.recover()
+    expirer = asyncio.create_task(_expire_uploads())
+    try:
+        yield
+    finally:
+        expirer.cancel()
+        # A job still running after this is picked up again by recover() on the next start
+        _SCHEDULER.stop(timeout=5.0)
+
+
+app = FastAPI(title="Obstacle Detection API", lifespan=_lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -26,20 +124,26 @@ app.add_middleware(
 )
 
 
-_BACKEND_DIR = Path(__file__).resolve().parents[1]
-_STORAGE = Storage(_BACKEND_DIR / "storage")
-_JOB_STORE = JobStore(_STORAGE.jobs_dir)
-_REALTIME = RealtimeService()
-
-
 @app.get("/health")
 def health() -> dict:
     return {"ok": True}
 
 
-@app.post("/api/jobs")
-async def create_job(
-    file: UploadFile = File(...),
+@app.get("/ready")
+def ready() -> JSONResponse:
+    return JSONResponse(dict(_WARMUP), status_code=200 if _WARMUP["ready"] else 503)
+
+
+@app.get("/metrics")
+def metrics() -> PlainTextResponse:
+    # Prometheus text exposition format
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+_VIDEO_SUFFIXES = {".mp4", ".avi", ".mov", ".mkv"}
+
+
+def _form_config(
     sampled_every_n_frames: int = Form(1),
     confidence_threshold: float = Form(0.5),
     roi_warning_y_ratio: float = Form(0.65),
@@ -50,72 +154,341 @@ async def create_job(
     lane_roi_bottom_y_ratio: float = Form(0.98),
     lane_roi_top_width_ratio: float = Form(0.25),
     lane_roi_bottom_width_ratio: float = Form(0.90),
+    roi_crop_enabled: bool = Form(False),
+    roi_crop_margin_ratio: float = Form(0.05),
+    inference_batch_size: int = Form(8),
+    detector_backend: str = Form(_DEFAULT_BACKEND),
+    tracking_enabled: bool = Form(False),
+    tracking_optical_flow: bool = Form(False),
+    motion_gate_enabled: bool = Form(False),
+    motion_gate_threshold: float = Form(0.002),
+    motion_gate_max_skip: int = Form(30),
+    segment_workers: int = Form(1),
+    snapshot_max_width: int = Form(0),
+    snapshot_jpeg_quality: int = Form(95),
+    snapshot_min_interval_ms: int = Form(0),
+    preview_segment_seconds: float = Form(0.0),
+) -> AnalyzeConfig:
+    """Analysis settings from the form fields shared by `POST /api/jobs` and upload finalize."""
+    if detector_backend not in BACKENDS:
+        raise HTTPException(status_code=400, detail="Unsupported detector backend")
+    if segment_workers > 1 and preview_segment_seconds > 0:
+        raise HTTPException(status_code=400, detail="Preview segments are not supported with segment_workers > 1")
+    return AnalyzeConfig(
+        sampled_every_n_frames=max(1, int(sampled_every_n_frames)),
+        confidence_threshold=float(confidence_threshold),
+        roi_warning_y_ratio=float(roi_warning_y_ratio),
+        roi_danger_y_ratio=float(roi_danger_y_ratio),
+        lane_roi_enabled=bool(lane_roi_enabled),
+        lane_roi_center_x_ratio=float(lane_roi_center_x_ratio),
+        lane_roi_top_y_ratio=float(lane_roi_top_y_ratio),
+        lane_roi_bottom_y_ratio=float(lane_roi_bottom_y_ratio),
+        lane_roi_top_width_ratio=float(lane_roi_top_width_ratio),
+        lane_roi_bottom_width_ratio=float(lane_roi_bottom_width_ratio),
+        roi_crop_enabled=bool(roi_crop_enabled),
+        roi_crop_margin_ratio=float(roi_crop_margin_ratio),
+        inference_batch_size=max(1, int(inference_batch_size)),
+        detector_backend=detector_backend,
+        tracking_enabled=bool(tracking_enabled),
+        tracking_optical_flow=bool(tracking_optical_flow),
+        motion_gate_enabled=bool(motion_gate_enabled),
+        motion_gate_threshold=float(motion_gate_threshold),
+        motion_gate_max_skip=max(1, int(motion_gate_max_skip)),
+        segment_workers=max(1, int(segment_workers)),
+        snapshot_max_width=int(snapshot_max_width) if snapshot_max_width > 0 else None,
+        snapshot_jpeg_quality=max(1, min(100, int(snapshot_jpeg_quality))),
+        snapshot_min_interval_ms=max(0, int(snapshot_min_interval_ms)),
+        preview_segment_seconds=max(0.0, float(preview_segment_seconds)),
+    )
+
+
+def _video_suffix(filename: str) -> str:
+    suffix = Path(filename).suffix.lower()
+    if suffix not in _VIDEO_SUFFIXES:
+        raise HTTPException(status_code=400, detail="Unsupported video format")
+    return suffix
+
+
+def _start_job(job_id: str, input_path: Path, filename: str, cfg: AnalyzeConfig, input_sha256: str) -> JSONResponse:
+    """Finish a job whose input is on disk from the result cache, or queue it."""
+    key = cache_key(input_sha256, cfg)
+    result_id = _RESULT_CACHE.claim(key)
+    if result_id is not None and not (_STORAGE.results_dir / result_id / "meta.json").exists():
+        # Deleted behind the cache's back
+        _RESULT_CACHE.release(result_id)
+        _RESULT_CACHE.forget(key)
+        result_id = None
+    if result_id is not None:
+        # Same bytes, settings and model as an earlier job: reuse its result
+        input_path.unlink(missing_ok=True)
+        _JOB_STORE.update(
+            job_id,
+            status="done",
+            progress=1.0,
+            message="Done (cached result)",
+            result_id=result_id,
+            filename=filename,
+            config=asdict(cfg),
+        )
+        return JSONResponse(
+            {"job_id": job_id, "status": "done", "queue_position": None, "result_id": result_id, "cached": True}
+        )
+
+    position = _SCHEDULER.submit(
+        job_id=job_id,
+        input_path=input_path,
+        filename=filename,
+        cfg=cfg,
+        cache_key=key,
+    )
+    return JSONResponse({"job_id": job_id, "status": "queued", "queue_position": position})
+
+
+@app.post("/api/jobs")
+async def create_job(
+    file: UploadFile = File(...),
+    cfg: AnalyzeConfig = Depends(_form_config),
 ) -> JSONResponse:
     if not file.filename:
         raise HTTPException(status_code=400, detail="Missing filename")
-
-    suffix = Path(file.filename).suffix.lower()
-    if suffix not in {".mp4", ".avi", ".mov", ".mkv"}:
-        raise HTTPException(status_code=400, detail="Unsupported video format")
+    suffix = _video_suffix(file.filename)
 
     job = _JOB_STORE.create_job()
     input_path = _STORAGE.job_input_path(job.job_id, suffix)
 
     try:
+        # Hashed while streaming to disk, for the result cache
+        digest = hashlib.sha256()
         with input_path.open("wb") as f:
             while True:
                 chunk = await file.read(1024 * 1024)
                 if not chunk:
                     break
+                digest.update(chunk)
                 f.write(chunk)
 
-        cfg = AnalyzeConfig(
-            sampled_every_n_frames=max(1, int(sampled_every_n_frames)),
-            confidence_threshold=float(confidence_threshold),
-            roi_warning_y_ratio=float(roi_warning_y_ratio),
-            roi_danger_y_ratio=float(roi_danger_y_ratio),
-            lane_roi_enabled=bool(lane_roi_enabled),
-            lane_roi_center_x_ratio=float(lane_roi_center_x_ratio),
-            lane_roi_top_y_ratio=float(lane_roi_top_y_ratio),
-            lane_roi_bottom_y_ratio=float(lane_roi_bottom_y_ratio),
-            lane_roi_top_width_ratio=float(lane_roi_top_width_ratio),
-            lane_roi_bottom_width_ratio=float(lane_roi_bottom_width_ratio),
-        )
+        # The first lookup per model hashes its weights; keep that off the event loop
+        return await asyncio.to_thread(_start_job, job.job_id, input_path, file.filename, cfg, digest.hexdigest())
+    except Exception as e:
+        _JOB_STORE.update(job.job_id, status="error", error=str(e), message="Error")
+        raise HTTPException(status_code=500, detail=str(e)) from e
+
+
+_CONTENT_RANGE = re.compile(r"bytes (\d+)-(\d+)/(\d+|\*)")
+
+
+def _upload_to_dict(rec: UploadRecord) -> dict[str, Any]:
+    return {
+        "upload_id": rec.upload_id,
+        "filename": rec.filename,
+        "size": rec.size,
+        "offset": rec.offset,
+        "complete": rec.size is not None and rec.offset == rec.size,
+    }
+
+
+@app.post("/api/uploads")
+def create_upload(filename: str = Form(...), size: int | None = Form(None)) -> JSONResponse:
+    """Start a resumable upload; send the bytes with `PUT /api/uploads/{upload_id}`."""
+    _video_suffix(filename)
+    if size is not None and size <= 0:
+        raise HTTPException(status_code=400, detail="Invalid size")
+    rec = _UPLOADS.create(filename, size)
+    return JSONResponse(_upload_to_dict(rec), status_code=201)
+
 
-        start_job(
-            job_store=_JOB_STORE,
-            storage=_STORAGE,
-            job_id=job.job_id,
-            input_path=input_path,
-            filename=file.filename,
-            cfg=cfg,
+@app.get("/api/uploads/{upload_id}")
+def get_upload(upload_id: str) -> JSONResponse:
+    """Upload state; `offset` is where a resumed upload continues."""
+    rec = _UPLOADS.get(upload_id)
+    if rec is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return JSONResponse(_upload_to_dict(rec), headers={"Upload-Offset": str(rec.offset)})
+
+
+@app.put("/api/uploads/{upload_id}")
+async def put_upload_chunk(
+    upload_id: str,
+    request: Request,
+    content_range: str = Header(...),
+    x_chunk_sha256: str | None = Header(None),
+) -> JSONResponse:
+    """Append one chunk, `Content-Range: bytes <start>-<end>/<total or *>`.
+
+    The chunk must start at the current offset (409 with the offset
+    otherwise). With `X-Chunk-SHA256` (hex) a corrupted chunk is rejected
+    with 422 and nothing of it is kept.
+    """
+    m = _CONTENT_RANGE.fullmatch(content_range.strip())
+    if not m:
+        raise HTTPException(status_code=400, detail="Invalid Content-Range")
+    start, end = int(m.group(1)), int(m.group(2))
+    if end < start:
+        raise HTTPException(status_code=400, detail="Invalid Content-Range")
+    rec = _UPLOADS.get(upload_id)
+    if rec is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    if m.group(3) != "*" and rec.size is not None and int(m.group(3)) != rec.size:
+        raise HTTPException(status_code=400, detail="Content-Range total does not match the upload size")
+
+    try:
+        offset = await _UPLOADS.append(upload_id, start, request.stream(), end - start + 1, x_chunk_sha256)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail="Upload not found") from e
+    except UploadConflict as e:
+        return JSONResponse(
+            {"detail": "Chunk does not start at the upload offset", "offset": e.offset},
+            status_code=409,
+            headers={"Upload-Offset": str(e.offset)},
         )
+    except ChunkChecksumError as e:
+        raise HTTPException(status_code=422, detail=str(e)) from e
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    return JSONResponse({"upload_id": upload_id, "offset": offset}, headers={"Upload-Offset": str(offset)})
+
 
-        return JSONResponse({"job_id": job.job_id, "status": "queued"})
+@app.post("/api/uploads/{upload_id}/finalize")
+def finalize_upload(upload_id: str, cfg: AnalyzeConfig = Depends(_form_config)) -> JSONResponse:
+    """Turn a complete upload into a job; takes the same settings as `POST /api/jobs`."""
+    rec = _UPLOADS.get(upload_id)
+    if rec is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    if rec.offset == 0:
+        raise HTTPException(status_code=400, detail="Upload is empty")
+
+    job = _JOB_STORE.create_job()
+    input_path = _STORAGE.job_input_path(job.job_id, _video_suffix(rec.filename))
+    try:
+        # The part file is renamed into place, not copied
+        digest = _UPLOADS.finish(upload_id, input_path)
+    except KeyError as e:
+        _JOB_STORE.delete(job.job_id)
+        raise HTTPException(status_code=404, detail="Upload not found") from e
+    except (UploadConflict, ValueError) as e:
+        # Still receiving, or fewer bytes than the declared size
+        _JOB_STORE.delete(job.job_id)
+        raise HTTPException(status_code=409, detail=str(e)) from e
+
+    try:
+        return _start_job(job.job_id, input_path, rec.filename, cfg, digest)
     except Exception as e:
         _JOB_STORE.update(job.job_id, status="error", error=str(e), message="Error")
         raise HTTPException(status_code=500, detail=str(e)) from e
 
 
+@app.delete("/api/uploads/{upload_id}")
+def delete_upload(upload_id: str) -> JSONResponse:
+    if not _UPLOADS.delete(upload_id):
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return JSONResponse({"upload_id": upload_id, "deleted": True})
+
+
+def _job_to_dict(rec: JobRecord, queue_position: int | None = None) -> dict[str, Any]:
+    return {
+        "job_id": rec.job_id,
+        "status": rec.status,
+        "progress": rec.progress,
+        "processed_frames": rec.processed_frames,
+        "total_frames": rec.total_frames,
+        "message": rec.message,
+        "result_id": rec.result_id,
+        "error": rec.error,
+        "created_at": rec.created_at,
+        "updated_at": rec.updated_at,
+        "queue_position": queue_position,
+    }
+
+
+@app.get("/api/jobs")
+def list_jobs(
+    status: str | None = None,
+    created_after: float | None = None,
+    created_before: float | None = None,
+    limit: int = 100,
+) -> JSONResponse:
+    recs = _JOB_STORE.list_jobs(
+        status=status,
+        created_after=created_after,
+        created_before=created_before,
+        limit=max(1, min(int(limit), 1000)),
+    )
+    positions = _SCHEDULER.queue_positions()
+    return JSONResponse({"jobs": [_job_to_dict(r, positions.get(r.job_id)) for r in recs]})
+
+
 @app.get("/api/jobs/{job_id}")
 def get_job(job_id: str) -> JSONResponse:
     rec = _JOB_STORE.get(job_id)
     if rec is None:
         raise HTTPException(status_code=404, detail="Job not found")
-    return JSONResponse(
-        {
-            "job_id": rec.job_id,
-            "status": rec.status,
-            "progress": rec.progress,
-            "processed_frames": rec.processed_frames,
-            "total_frames": rec.total_frames,
-            "message": rec.message,
-            "result_id": rec.result_id,
-            "error": rec.error,
-            "created_at": rec.created_at,
-            "updated_at": rec.updated_at,
-        }
-    )
+    return JSONResponse(_job_to_dict(rec, _SCHEDULER.queue_position(job_id)))
+
+
+@app.delete("/api/jobs/{job_id}")
+def delete_job(job_id: str) -> JSONResponse:
+    """Remove a finished job; its result goes too once no other job shares it."""
+    rec = _JOB_STORE.get(job_id)
+    if rec is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if rec.status in ("queued", "running"):
+        raise HTTPException(status_code=409, detail="Job is still queued or running")
+
+    result_deleted = False
+    if rec.result_id:
+        # Failed jobs never took a reference on their partial result
+        if rec.status != "done" or _RESULT_CACHE.release(rec.result_id):
+            _STORAGE.delete_result(rec.result_id)
+            result_deleted = True
+    _JOB_STORE.delete(job_id)
+    return JSONResponse({"job_id": job_id, "deleted": True, "result_id": rec.result_id, "result_deleted": result_deleted})
+
+
+@app.websocket("/ws/jobs/{job_id}")
+async def ws_job(websocket: WebSocket, job_id: str, max_rate_hz: float = 4.0):
+    """Push job state on every change, at most `max_rate_hz` messages per second.
+
+    The last message has `final: true` (job done or failed); the server then
+    closes the socket.
+    """
+    await websocket.accept()
+    if _JOB_STORE.get(job_id) is None:
+        await websocket.close(code=1008, reason="Job not found")
+        return
+
+    sub = _JOB_EVENTS.subscribe(job_id)
+    min_interval = 1.0 / max(0.1, min(float(max_rate_hz), 30.0))
+    # Clients never send anything; reading notices a disconnect without waiting for the next send
+    receiver = asyncio.create_task(websocket.receive())
+    try:
+        while True:
+            rec = _JOB_STORE.get(job_id)
+            final = rec is None or rec.status in {"done", "error"}
+            if rec is not None:
+                payload = _job_to_dict(rec, _SCHEDULER.queue_position(job_id))
+            else:
+                payload = {"job_id": job_id, "status": "error"}
+            payload["final"] = final
+            await websocket.send_json(payload)
+            if final:
+                await websocket.close()
+                return
+            # Changes during the pause coalesce into the next message
+            await asyncio.wait({receiver}, timeout=min_interval)
+            if not receiver.done():
+                # Re-send the current state as a keepalive when nothing changes for a while
+                waiter = asyncio.create_task(sub.wait(timeout=15.0))
+                await asyncio.wait({receiver, waiter}, return_when=asyncio.FIRST_COMPLETED)
+                waiter.cancel()
+            if receiver.done():
+                if receiver.exception() is not None or receiver.result()["type"] == "websocket.disconnect":
+                    return
+                receiver = asyncio.create_task(websocket.receive())
+    except WebSocketDisconnect:
+        return
+    finally:
+        receiver.cancel()
+        _JOB_EVENTS.unsubscribe(sub)
 
 
 @app.get("/api/results/{result_id}/meta")
@@ -126,12 +499,88 @@ def get_result_meta(result_id: str) -> JSONResponse:
     return JSONResponse(_STORAGE.read_json(meta_path))
 
 
+def _require_finished(result_dir: Path) -> None:
+    # The result ID is public while the job runs; events and detections are only complete once meta.json exists
+    if result_dir.is_dir() and not (result_dir / "meta.json").exists():
+        raise HTTPException(status_code=409, detail="Result is not finished yet")
+
+
 @app.get("/api/results/{result_id}/events")
-def get_result_events(result_id: str) -> JSONResponse:
-    events_path = _STORAGE.results_dir / result_id / "events.json"
+def get_result_events(
+    result_id: str,
+    from_ms: int | None = None,
+    to_ms: int | None = None,
+    risk_level: str | None = None,
+    limit: int = 1000,
+    cursor: int | None = None,
+) -> JSONResponse:
+    """One page of events; pass the returned `next_cursor` back as `cursor` for the next page.
+
+    `risk_level` takes one level or a comma-separated list.
+    """
+    result_dir = _STORAGE.results_dir / result_id
+    _require_finished(result_dir)
+    risk_levels = {r.strip() for r in risk_level.split(",") if r.strip()} if risk_level else None
+    limit = max(1, min(int(limit), 10000))
+
+    log_path = result_dir / "events.ndjson"
+    if log_path.exists():
+        page = query_event_log(
+            log_path, result_dir / "events.idx.json", from_ms, to_ms, risk_levels, limit, cursor
+        )
+        return JSONResponse({"result_id": result_id, **page})
+
+    events_path = result_dir / "events.json"
     if not events_path.exists():
         raise HTTPException(status_code=404, detail="Result not found")
-    return JSONResponse(_STORAGE.read_json(events_path))
+    legacy = _STORAGE.read_json(events_path)
+    page = query_event_list(legacy.get("events", []), from_ms, to_ms, risk_levels, limit, cursor)
+    return JSONResponse({"result_id": result_id, **page})
+
+
+@app.get("/api/results/{result_id}/detections")
+def get_result_detections(
+    result_id: str,
+    from_frame: int | None = None,
+    to_frame: int | None = None,
+    from_ms: int | None = None,
+    to_ms: int | None = None,
+    class_id: str | None = None,
+    track_id: int | None = None,
+    limit: int = 10000,
+) -> JSONResponse:
+    """Every drawn detection in a frame/time range (end exclusive), as parallel column arrays.
+
+    `class_id` takes one ID or a comma-separated list.
+    """
+    store_dir = _STORAGE.results_dir / result_id / "detections"
+    if not (store_dir / "columns.json").exists():
+        raise HTTPException(status_code=404, detail="Detections not found")
+    _require_finished(store_dir.parent)
+    try:
+        class_ids = [int(c) for c in class_id.split(",") if c.strip()] if class_id else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail="Invalid class_id") from e
+
+    store = DetectionStore(store_dir)
+    cols = store.query(
+        from_frame=from_frame,
+        to_frame=to_frame,
+        from_ms=from_ms,
+        to_ms=to_ms,
+        class_ids=class_ids,
+        track_id=track_id,
+        limit=max(1, min(int(limit), 100000)),
+    )
+    return JSONResponse(
+        {
+            "result_id": result_id,
+            "count": int(len(cols["frame"])),
+            "names": {str(k): v for k, v in store.names.items()},
+            "risk_levels": list(RISK_LEVELS),
+            "columns": {name: col.tolist() for name, col in cols.items()},
+        }
+    )
 
 
 @app.get("/api/results/{result_id}/video")
@@ -146,6 +595,25 @@ def get_result_video(result_id: str) -> FileResponse:
     )
 
 
+@app.get("/api/results/{result_id}/segments")
+def get_result_segments(result_id: str) -> JSONResponse:
+    """Preview segments finished so far; available while the job is still running."""
+    index_path = _STORAGE.results_dir / result_id / "preview" / "index.json"
+    if not index_path.exists():
+        raise HTTPException(status_code=404, detail="No preview segments")
+    return JSONResponse({"result_id": result_id, **_STORAGE.read_json(index_path)})
+
+
+@app.get("/api/results/{result_id}/segments/{name}")
+def get_result_segment(result_id: str, name: str) -> FileResponse:
+    if not re.fullmatch(r"\d{5}\.mp4", name):
+        raise HTTPException(status_code=404, detail="Segment not found")
+    seg_path = _STORAGE.results_dir / result_id / "preview" / name
+    if not seg_path.exists():
+        raise HTTPException(status_code=404, detail="Segment not found")
+    return FileResponse(str(seg_path), media_type="video/mp4")
+
+
 @app.get("/api/results/{result_id}/snapshots/{name}")
 def get_result_snapshot(result_id: str, name: str) -> FileResponse:
     safe_name = Path(name).name
@@ -155,6 +623,11 @@ def get_result_snapshot(result_id: str, name: str) -> FileResponse:
     return FileResponse(str(snap_path), media_type="image/jpeg")
 
 
+@app.get("/api/realtime/sessions")
+def list_realtime_sessions() -> JSONResponse:
+    return JSONResponse({"sessions": _REALTIME.sessions()})
+
+
 @app.get("/api/realtime/stream")
 def realtime_stream(
     src: str = "0",
@@ -168,7 +641,20 @@ def realtime_stream(
     lane_roi_bottom_y_ratio: float = 0.98,
     lane_roi_top_width_ratio: float = 0.25,
     lane_roi_bottom_width_ratio: float = 0.90,
+    roi_crop_enabled: bool = False,
+    roi_crop_margin_ratio: float = 0.05,
+    detector_backend: str = _DEFAULT_BACKEND,
+    tracking_enabled: bool = False,
+    tracking_optical_flow: bool = False,
+    motion_gate_enabled: bool = False,
+    motion_gate_threshold: float = 0.002,
+    motion_gate_max_skip: int = 30,
+    tier: str = "high",
 ) -> StreamingResponse:
+    if detector_backend not in BACKENDS:
+        raise HTTPException(status_code=400, detail="Unsupported detector backend")
+    if tier not in JPEG_TIERS:
+        raise HTTPException(status_code=400, detail="Unsupported tier")
     cfg = AnalyzeConfig(
         sampled_every_n_frames=max(1, int(sampled_every_n_frames)),
         confidence_threshold=float(confidence_threshold),
@@ -180,27 +666,37 @@ def realtime_stream(
         lane_roi_bottom_y_ratio=float(lane_roi_bottom_y_ratio),
         lane_roi_top_width_ratio=float(lane_roi_top_width_ratio),
         lane_roi_bottom_width_ratio=float(lane_roi_bottom_width_ratio),
+        roi_crop_enabled=bool(roi_crop_enabled),
+        roi_crop_margin_ratio=float(roi_crop_margin_ratio),
+        detector_backend=detector_backend,
+        tracking_enabled=bool(tracking_enabled),
+        tracking_optical_flow=bool(tracking_optical_flow),
+        motion_gate_enabled=bool(motion_gate_enabled),
+        motion_gate_threshold=float(motion_gate_threshold),
+        motion_gate_max_skip=max(1, int(motion_gate_max_skip)),
     )
-    _REALTIME.configure(src=src, cfg=cfg)
-    _REALTIME.acquire()
+    session = _REALTIME.acquire(src=src, cfg=cfg)
 
     boundary = "frame"
 
     def gen():
+        last_id = 0
         try:
             while True:
-                st = _REALTIME.snapshot()
-                if st.jpeg is None:
-                    time.sleep(0.02)
+                # Sleeps until a new frame; a slow client just gets the latest one next
+                if session.wait_frame(last_id, timeout=1.0) == last_id:
+                    continue
+                last_id, jpeg = session.jpeg(tier)
+                if jpeg is None:
                     continue
 
                 yield (
                     f"--{boundary}\r\n"
                     "Content-Type: image/jpeg\r\n"
-                    f"Content-Length: {len(st.jpeg)}\r\n\r\n"
-                ).encode("utf-8") + st.jpeg + b"\r\n"
+                    f"Content-Length: {len(jpeg)}\r\n\r\n"
+                ).encode("utf-8") + jpeg + b"\r\n"
         finally:
-            _REALTIME.release()
+            _REALTIME.release(session)
 
     return StreamingResponse(
         gen(),
@@ -222,8 +718,24 @@ async def ws_realtime(
     lane_roi_bottom_y_ratio: float = 0.98,
     lane_roi_top_width_ratio: float = 0.25,
     lane_roi_bottom_width_ratio: float = 0.90,
+    roi_crop_enabled: bool = False,
+    roi_crop_margin_ratio: float = 0.05,
+    detector_backend: str = _DEFAULT_BACKEND,
+    tracking_enabled: bool = False,
+    tracking_optical_flow: bool = False,
+    motion_gate_enabled: bool = False,
+    motion_gate_threshold: float = 0.002,
+    motion_gate_max_skip: int = 30,
+    fmt: str = Query("json", alias="format"),
+    delta: bool = False,
 ):
     await websocket.accept()
+    if detector_backend not in BACKENDS:
+        await websocket.close(code=1008, reason="Unsupported detector backend")
+        return
+    if fmt not in ("json", "binary"):
+        await websocket.close(code=1008, reason="format must be json or binary")
+        return
 
     cfg = AnalyzeConfig(
         sampled_every_n_frames=max(1, int(sampled_every_n_frames)),
@@ -236,31 +748,37 @@ async def ws_realtime(
         lane_roi_bottom_y_ratio=float(lane_roi_bottom_y_ratio),
         lane_roi_top_width_ratio=float(lane_roi_top_width_ratio),
         lane_roi_bottom_width_ratio=float(lane_roi_bottom_width_ratio),
+        roi_crop_enabled=bool(roi_crop_enabled),
+        roi_crop_margin_ratio=float(roi_crop_margin_ratio),
+        detector_backend=detector_backend,
+        tracking_enabled=bool(tracking_enabled),
+        tracking_optical_flow=bool(tracking_optical_flow),
+        motion_gate_enabled=bool(motion_gate_enabled),
+        motion_gate_threshold=float(motion_gate_threshold),
+        motion_gate_max_skip=max(1, int(motion_gate_max_skip)),
     )
 
-    _REALTIME.configure(src=src, cfg=cfg)
-    _REALTIME.acquire()
+    # May wait for the previous worker on this source to let go of the device
+    session = await asyncio.to_thread(_REALTIME.acquire, src=src, cfg=cfg)
 
-    last_sent_frame_id = -1
+    last_sent_frame_id = 0
+    schema_sent = -1
     try:
         while True:
-            st = _REALTIME.snapshot()
-            if st.frame_id == last_sent_frame_id:
-                await asyncio.sleep(0.03)
+            if await session.wait_frame_async(last_sent_frame_id, timeout=1.0) == last_sent_frame_id:
                 continue
+            # Shared with every other client of this source; encoded once per frame
+            st, message = session.message(fmt, since=last_sent_frame_id if delta else 0)
             last_sent_frame_id = st.frame_id
 
-            await websocket.send_json(
-                {
-                    "frame_id": st.frame_id,
-                    "frame_width": st.frame_width,
-                    "frame_height": st.frame_height,
-                    "detections": st.detections or [],
-                    "detection_mode": st.detection_mode,
-                    "fps": st.fps,
-                }
-            )
+            if isinstance(message, bytes):
+                if st.schema_version != schema_sent:
+                    await websocket.send_text(session.schema(st))
+                    schema_sent = st.schema_version
+                await websocket.send_bytes(message)
+            else:
+                await websocket.send_text(message)
     except WebSocketDisconnect:
         return
     finally:
-        _REALTIME.release()
+        _REALTIME.release(session)
@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+
+# Histogram upper bounds in seconds (+Inf is implicit)
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PREFIX = "obstacle_"
+
+
+class Histogram:
+    """Bucketed durations in seconds.
+
+    Quantiles interpolate linearly inside the bucket holding the rank, like
+    Prometheus' `histogram_quantile`, so they are estimates.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float) -> None:
+        i = bisect.bisect_left(BUCKETS, seconds)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.sum += seconds
+
+    def merge(self, counts: list[int], total_s: float) -> None:
+        with self._lock:
+            for i, c in enumerate(counts):
+                self.counts[i] += int(c)
+            self.count += sum(int(c) for c in counts)
+            self.sum += float(total_s)
+
+    def quantile(self, q: float) -> float | None:
+        with self._lock:
+            counts = list(self.counts)
+            count = self.count
+        if count == 0:
+            return None
+        rank = q * count
+        seen = 0
+        for i, c in enumerate(counts):
+            if c and seen + c >= rank:
+                if i == len(BUCKETS):
+                    return BUCKETS[-1]
+                lo = BUCKETS[i - 1] if i > 0 else 0.0
+                return lo + (BUCKETS[i] - lo) * (rank - seen) / c
+            seen += c
+        return BUCKETS[-1]
+
+    def summary(self) -> dict[str, Any]:
+        """Count, total and p50/p95/p99 in ms, plus the raw bucket counts (mergeable, see `StageTimings.merge`)."""
+
+        def ms(v: float | None) -> float | None:
+            return None if v is None else round(v * 1000.0, 3)
+
+        return {
+            "count": self.count,
+            "total_ms": ms(self.sum),
+            "mean_ms": ms(self.sum / self.count) if self.count else None,
+            "p50_ms": ms(self.quantile(0.50)),
+            "p95_ms": ms(self.quantile(0.95)),
+            "p99_ms": ms(self.quantile(0.99)),
+            "buckets": list(self.counts),
+        }
+
+
+class Counter:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, n: int = 1) -> None:
+        with self._lock:
+            self.value += n
+
+
+class Gauge:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        self.value = float(value)
+
+    def inc(self, n: float = 1) -> None:
+        with self._lock:
+            self.value += n
+
+    def dec(self, n: float = 1) -> None:
+        self.inc(-n)
+
+
+_KINDS = {"histogram": Histogram, "counter": Counter, "gauge": Gauge}
+
+
+class Registry:
+    """Process-wide metric families, rendered in the Prometheus text format.
+
+    Metrics are created on first use, one per (name, labels). Collectors
+    registered with `add_collector` run before each render, to set gauges
+    whose value is cheaper to read than to track (e.g. jobs per status).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # name -> (kind, help, {label items: metric})
+        self._families: dict[str, tuple[str, str, dict[tuple, Any]]] = {}
+        self._collectors: list[Callable[[Registry], None]] = []
+
+    def histogram(self, name: str, help: str = "", **labels: str) -> Histogram:
+        return self._get("histogram", name, help, labels)
+
+    def counter(self, name: str, help: str = "", **labels: str) -> Counter:
+        return self._get("counter", name, help, labels)
+
+    def gauge(self, name: str, help: str = "", **labels: str) -> Gauge:
+        return self._get("gauge", name, help, labels)
+
+    def add_collector(self, fn: Callable[[Registry], None]) -> None:
+        with self._lock:
+            self._collectors.append(fn)
+
+    def _get(self, kind: str, name: str, help: str, labels: dict[str, str]) -> Any:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = self._families[name] = (kind, help, {})
+            elif family[0] != kind:
+                raise ValueError(f"Metric {name} is a {family[0]}, not a {kind}")
+            metric = family[2].get(key)
+            if metric is None:
+                metric = family[2][key] = _KINDS[kind]()
+            return metric
+
+    def render(self) -> str:
+        with self._lock:
+            collectors = list(self._collectors)
+        for fn in collectors:
+            fn(self)
+        with self._lock:
+            families = [(name, kind, help, dict(metrics)) for name, (kind, help, metrics) in sorted(self._families.items())]
+
+        lines: list[str] = []
+        for name, kind, help, metrics in families:
+            full = PREFIX + name
+            if help:
+                lines.append(f"# HELP {full} {help}")
+            lines.append(f"# TYPE {full} {kind}")
+            for key, metric in sorted(metrics.items()):
+                if kind == "histogram":
+                    cumulative = 0
+                    for bound, c in zip(BUCKETS + (None,), list(metric.counts)):
+                        cumulative += c
+                        le = "+Inf" if bound is None else repr(bound)
+                        lines.append(f"{full}_bucket{_labels(key + (('le', le),))} {cumulative}")
+                    lines.append(f"{full}_sum{_labels(key)} {metric.sum!r}")
+                    lines.append(f"{full}_count{_labels(key)} {metric.count}")
+                else:
+                    lines.append(f"{full}{_labels(key)} {metric.value!r}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(items: tuple) -> str:
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+REGISTRY = Registry()
+
+
+class StageTimings:
+    """Stage durations and counters of one run (a job, or a realtime session).
+
+    Every observation also goes into the process-wide `stage_seconds`
+    histogram / `<name>_total` counters, labelled with `pipeline`, which
+    `/metrics` exposes. `to_dict` gives the run's own breakdown.
+    """
+
+    def __init__(self, pipeline: str, registry: Registry = REGISTRY) -> None:
+        self.pipeline = pipeline
+        self._registry = registry
+        self._lock = threading.Lock()
+        self._stages: dict[str, tuple[Histogram, Histogram]] = {}
+        self._counters: dict[str, tuple[Counter, Counter]] = {}
+
+    def observe(self, stage: str, seconds: float) -> None:
+        for h in self._stage(stage):
+            h.observe(seconds)
+
+    @contextmanager
+    def time(self, stage: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - t0)
+
+    def count(self, name: str, n: int = 1) -> None:
+        if n:
+            for c in self._counter(name):
+                c.inc(n)
+
+    def merge(self, data: dict[str, Any]) -> None:
+        """Add a `to_dict` of another run (e.g. a segment worker process)."""
+        for stage, s in data.get("stages", {}).items():
+            for h in self._stage(stage):
+                h.merge(s["buckets"], (s["total_ms"] or 0.0) / 1000.0)
+        for name, n in data.get("counters", {}).items():
+            self.count(name, int(n))
+
+    def to_dict(self) -> dict[str, Any]:
+        with self._lock:
+            stages = dict(self._stages)
+            counters = dict(self._counters)
+        return {
+            "stages": {stage: local.summary() for stage, (local, _) in stages.items()},
+            "counters": {name: local.value for name, (local, _) in counters.items()},
+        }
+
+    def _stage(self, stage: str) -> tuple[Histogram, Histogram]:
+        pair = self._stages.get(stage)
+        if pair is None:
+            with self._lock:
+                pair = self._stages.get(stage)
+                if pair is None:
+                    shared = self._registry.histogram(
+                        "stage_seconds", "Duration of one pipeline stage call", pipeline=self.pipeline, stage=stage
+                    )
+                    pair = self._stages[stage] = (Histogram(), shared)
+        return pair
+
+    def _counter(self, name: str) -> tuple[Counter, Counter]:
+        pair = self._counters.get(name)
+        if pair is None:
+            with self._lock:
+                pair = self._counters.get(name)
+                if pair is None:
+                    shared = self._registry.counter(f"{name}_total", pipeline=self.pipeline)
+                    pair = self._counters[name] = (Counter(), shared)
+        return pair
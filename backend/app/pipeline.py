@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import queue
+import threading
+from typing import Any, Callable, Iterable, Iterator
+
+
+# Sentinel marking the end of a stage's output
+END = object()
+
+
+class StageThread(threading.Thread):
+    """Daemon thread for one pipeline stage.
+
+    Any exception is captured (and the shared stop event set) so the
+    coordinating thread can re-raise it after joining.
+    """
+
+    def __init__(self, name: str, target: Callable[[], None], stop: threading.Event) -> None:
+        super().__init__(name=name, daemon=True)
+        self._fn = target
+        self._stop_event = stop
+        self.error: BaseException | None = None
+
+    def run(self) -> None:
+        try:
+            self._fn()
+        except BaseException as e:
+            self.error = e
+            self._stop_event.set()
+
+
+def put(q: queue.Queue, item: Any, stop: threading.Event) -> bool:
+    """Blocking put that gives up once `stop` is set. Returns False if it gave up."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def drain(q: queue.Queue, stop: threading.Event) -> Iterator[Any]:
+    """Yield items from `q` in order until END is received or `stop` is set."""
+    while not stop.is_set():
+        try:
+            item = q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        if item is END:
+            return
+        yield item
+
+
+def feed(items: Iterable[Any], q: queue.Queue, stop: threading.Event) -> None:
+    """Push every item into `q` followed by END (stage body for producers)."""
+    for item in items:
+        if not put(q, item, stop):
+            return
+    put(q, END, stop)
+
+
+def join_stages(stages: list[StageThread]) -> None:
+    """Join all stages and re-raise the first error raised by any of them."""
+    for t in stages:
+        t.join()
+    for t in stages:
+        if t.error is not None:
+            raise t.error
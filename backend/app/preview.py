@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+import cv2
+import numpy as np
+
+
+MANIFEST = "index.json"
+
+
+class PreviewSegmentWriter:
+    """Writes the annotated video a second time as short, self-contained MP4 segments.
+
+    Each segment is finalized (playable) as soon as the next one starts, and
+    `index.json` lists the finished segments, so a running job can be
+    reviewed from the beginning. OpenCV's writer cannot emit fragmented MP4
+    or HLS; closed MP4 segments are the closest it gets.
+    """
+
+    def __init__(self, directory: Path, fps: float, segment_seconds: float) -> None:
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.fps = float(fps) if fps and fps > 0 else 25.0
+        self.segment_frames = max(1, int(round(float(segment_seconds) * self.fps)))
+        self._writer: cv2.VideoWriter | None = None
+        self._current: dict[str, Any] | None = None
+        self._segments: list[dict[str, Any]] = []
+        self._write_manifest(done=False)
+
+    def write(self, frame: np.ndarray, frame_index: int) -> None:
+        if self._current is not None and self._current["frame_count"] >= self.segment_frames:
+            self._finish_segment()
+        if self._writer is None:
+            name = f"{len(self._segments):05d}.mp4"
+            h, w = frame.shape[:2]
+            self._writer = cv2.VideoWriter(str(self.directory / name), cv2.VideoWriter_fourcc(*"mp4v"), self.fps, (w, h))
+            if not self._writer.isOpened():
+                raise RuntimeError("Cannot open preview segment writer")
+            self._current = {
+                "name": name,
+                "start_frame": frame_index,
+                "start_ms": int((frame_index / self.fps) * 1000),
+                "frame_count": 0,
+            }
+        self._writer.write(frame)
+        self._current["frame_count"] += 1
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._finish_segment()
+        self._write_manifest(done=True)
+
+    def _finish_segment(self) -> None:
+        self._writer.release()
+        self._writer = None
+        seg = self._current
+        seg["duration_ms"] = int((seg["frame_count"] / self.fps) * 1000)
+        self._segments.append(seg)
+        self._current = None
+        self._write_manifest(done=False)
+
+    def _write_manifest(self, done: bool) -> None:
+        data = {"fps": self.fps, "segment_frames": self.segment_frames, "done": done, "segments": self._segments}
+        tmp = self.directory / (MANIFEST + ".tmp")
+        tmp.write_text(json.dumps(data), encoding="utf-8")
+        # Atomic swap so readers never see a partial manifest
+        os.replace(tmp, self.directory / MANIFEST)
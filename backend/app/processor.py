@@ -1,13 +1,20 @@
 from __future__ import annotations
 
+import threading
 import time
 import uuid
-from dataclasses import asdict
+from collections import deque
+from dataclasses import asdict, dataclass, fields
 from pathlib import Path
 from threading import Thread
 from typing import Any, Callable
 
+from .detection_store import DetectionStoreWriter
+from .detectors import resolve_backend
+from .event_log import EventLogWriter
 from .job_store import JobStore
+from .result_cache import ResultCache
+from .segments import annotate_video_segmented
 from .storage import ResultMeta, Storage
 from .vision import AnalyzeConfig, annotate_video
 
@@ -15,7 +22,164 @@ from .vision import AnalyzeConfig, annotate_video
 ProgressCb = Callable[[int, int | None, str | None], None]
 
 
-def start_job(
+@dataclass
+class _QueuedJob:
+    job_id: str
+    input_path: Path
+    filename: str
+    cfg: AnalyzeConfig
+    cache_key: str | None = None
+
+
+class JobScheduler:
+    """Fixed-size worker pool draining a FIFO queue of video jobs.
+
+    Queued jobs are persisted in the job store (input path, filename and
+    config), so `recover()` can re-enqueue them after a restart. Queue
+    positions are kept in memory only (`queue_position`).
+    """
+
+    def __init__(
+        self,
+        *,
+        job_store: JobStore,
+        storage: Storage,
+        max_workers: int = 1,
+        result_cache: ResultCache | None = None,
+    ) -> None:
+        self._job_store = job_store
+        self._storage = storage
+        self._result_cache = result_cache
+        self._max_workers = max(1, int(max_workers))
+        self._cond = threading.Condition()
+        self._queue: deque[_QueuedJob] = deque()
+        self._workers: list[Thread] = []
+        # Bumped by start() and stop(); a worker exits once it no longer matches
+        self._generation = 0
+
+    @property
+    def max_workers(self) -> int:
+        return self._max_workers
+
+    def start(self) -> None:
+        with self._cond:
+            if self._workers:
+                return
+            self._generation += 1
+            for i in range(self._max_workers):
+                t = Thread(target=self._worker, args=(self._generation,), name=f"job_worker_{i}", daemon=True)
+                self._workers.append(t)
+                t.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        """Stop the workers; each finishes its current job first.
+
+        Waits up to `timeout` seconds per worker (forever when None). Queued
+        jobs stay queued for the next `start()`.
+        """
+        with self._cond:
+            self._generation += 1
+            workers, self._workers = self._workers, []
+            self._cond.notify_all()
+        for t in workers:
+            if t is not threading.current_thread():
+                t.join(timeout)
+
+    def submit(
+        self, *, job_id: str, input_path: Path, filename: str, cfg: AnalyzeConfig, cache_key: str | None = None
+    ) -> int:
+        """Enqueue a job and return its 1-based queue position.
+
+        With `cache_key`, the finished result is recorded in the result cache
+        under that key.
+        """
+        self._job_store.update(
+            job_id,
+            status="queued",
+            message="Queued",
+            filename=filename,
+            input_path=str(input_path),
+            config=asdict(cfg),
+            cache_key=cache_key,
+        )
+        with self._cond:
+            self._queue.append(
+                _QueuedJob(job_id=job_id, input_path=input_path, filename=filename, cfg=cfg, cache_key=cache_key)
+            )
+            self._cond.notify()
+            return len(self._queue)
+
+    def recover(self) -> int:
+        """Re-enqueue jobs left queued (or interrupted while running) by a previous process."""
+        pending = [r for r in self._job_store.list_jobs() if r.status in {"queued", "running"}]
+        recovered = 0
+        for rec in pending:
+            input_path = Path(rec.input_path) if rec.input_path else None
+            if input_path is None or not input_path.exists() or rec.config is None:
+                self._job_store.update(
+                    rec.job_id,
+                    status="error",
+                    message="Error",
+                    error="Job input lost across restart",
+                )
+                continue
+            if rec.status == "running" and rec.result_id:
+                # Partial output of the interrupted run; the rerun writes a fresh result
+                self._storage.delete_result(rec.result_id)
+                self._job_store.update(rec.job_id, result_id=None)
+            self.submit(
+                job_id=rec.job_id,
+                input_path=input_path,
+                filename=rec.filename or input_path.name,
+                cfg=_config_from_dict(rec.config),
+                cache_key=rec.cache_key,
+            )
+            recovered += 1
+        return recovered
+
+    def queue_position(self, job_id: str) -> int | None:
+        """1-based FIFO position of a queued job; None once it has been picked up."""
+        with self._cond:
+            for pos, item in enumerate(self._queue, start=1):
+                if item.job_id == job_id:
+                    return pos
+        return None
+
+    def queue_positions(self) -> dict[str, int]:
+        with self._cond:
+            return {item.job_id: pos for pos, item in enumerate(self._queue, start=1)}
+
+    def _worker(self, generation: int) -> None:
+        while True:
+            with self._cond:
+                while not self._queue and generation == self._generation:
+                    self._cond.wait()
+                if generation != self._generation:
+                    return
+                item = self._queue.popleft()
+                moved = [q.job_id for q in self._queue]
+            # Everyone behind moved up one place; nothing to write, only subscribers to wake
+            for job_id in moved:
+                self._job_store.notify(job_id)
+
+            _run_job(
+                job_store=self._job_store,
+                storage=self._storage,
+                job_id=item.job_id,
+                input_path=item.input_path,
+                filename=item.filename,
+                cfg=item.cfg,
+                result_cache=self._result_cache,
+                cache_key=item.cache_key,
+            )
+
+
+def _config_from_dict(data: dict[str, Any]) -> AnalyzeConfig:
+    known = {f.name for f in fields(AnalyzeConfig)}
+    return AnalyzeConfig(**{k: v for k, v in data.items() if k in known})
+
+
+def _run_job(
     *,
     job_store: JobStore,
     storage: Storage,
@@ -23,60 +187,41 @@ def start_job(
     input_path: Path,
     filename: str,
     cfg: AnalyzeConfig,
+    result_cache: ResultCache | None = None,
+    cache_key: str | None = None,
 ) -> None:
-    t = Thread(
-        target=_run_job,
-        kwargs={
-            "job_store": job_store,
-            "storage": storage,
-            "job_id": job_id,
-            "input_path": input_path,
-            "filename": filename,
-            "cfg": cfg,
-        },
-        daemon=True,
-    )
-    t.start()
-
-
-def _run_job(*, job_store: JobStore, storage: Storage, job_id: str, input_path: Path, filename: str, cfg: AnalyzeConfig) -> None:
     started = time.time()
 
     def progress_cb(processed: int, total: int | None, message: str | None) -> None:
-        # Throttle updates to avoid excessive disk writes
-        now = time.time()
-        rec = job_store.get(job_id)
-        if rec is None:
-            return
-        last = rec.updated_at
-        if processed == 0 or (now - last) >= 0.25 or (total is not None and processed >= total):
-            progress = 0.0
-            if total and total > 0:
-                progress = min(1.0, processed / total)
-            job_store.update(
-                job_id,
-                status="running",
-                progress=progress,
-                processed_frames=processed,
-                total_frames=total,
-                message=message,
-            )
+        # In-memory only; the job store checkpoints progress to disk periodically
+        job_store.update_progress(job_id, processed, total, message)
 
     try:
-        job_store.update(job_id, status="running", message="Starting")
-
         result_id = f"res_{uuid.uuid4().hex}"
         paths = storage.create_result_paths(result_id)
+        # The result ID is known up front so preview segments can be fetched while running
+        job_store.update(job_id, status="running", message="Starting", result_id=result_id)
 
-        events: list[dict[str, Any]] = []
-        stats = annotate_video(
-            input_path=str(input_path),
-            output_path=str(paths.video_path),
-            cfg=cfg,
-            progress_cb=progress_cb,
-            events_out=events,
-            snapshots_dir=str(paths.snapshots_dir),
-        )
+        if cfg.segment_workers > 1:
+            run = annotate_video_segmented
+            extra: dict[str, Any] = {}
+        else:
+            run = annotate_video
+            extra = {"preview_dir": str(paths.preview_dir)}
+        # Events and detections stream to disk as they are produced
+        with EventLogWriter(paths.events_log_path, paths.events_index_path) as events, DetectionStoreWriter(
+            paths.detections_dir
+        ) as detections:
+            stats = run(
+                input_path=str(input_path),
+                output_path=str(paths.video_path),
+                cfg=cfg,
+                progress_cb=progress_cb,
+                events_out=events,
+                snapshots_dir=str(paths.snapshots_dir),
+                detections_out=detections,
+                **extra,
+            )
 
         meta = ResultMeta(
             result_id=result_id,
@@ -87,9 +232,16 @@ def _run_job(*, job_store: JobStore, storage: Storage, job_id: str, input_path:
             frame_count=stats.get("frame_count"),
             detection_mode=stats.get("detection_mode", "unknown"),
             config=asdict(cfg),
+            stats={k: v for k, v in stats.items() if k not in {"fps", "frame_count", "detection_mode"}},
         )
         storage.write_json(paths.meta_path, meta.to_dict())
-        storage.write_json(paths.events_path, {"result_id": result_id, "events": events})
+
+        if result_cache is not None:
+            # This job's own reference
+            result_cache.acquire(result_id)
+            # Not cached when "auto" fell back to another detector than the key was made for
+            if cache_key is not None and meta.detection_mode == resolve_backend(cfg):
+                result_cache.insert(cache_key, result_id)
 
         job_store.update(
             job_id,
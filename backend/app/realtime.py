@@ -1,48 +1,189 @@
 from __future__ import annotations
 
+import asyncio
+import os
 import threading
 import time
 from dataclasses import dataclass
-from typing import Any, Optional
+from typing import Any, Callable, Mapping, Optional
 
 import cv2
-
+import numpy as np
+
+from .detectors import BasicDetector, Detector, create_detector
+from .gating import MotionGate, create_motion_gate
+from .metrics import StageTimings
+from .tracking import IouTracker, create_tracker
+from .detections import RISK_LEVELS, RISK_REASONS, DetectionBatch, risk_codes
+from .realtime_codec import encode_binary, encode_json, encode_schema
 from .vision import (
     AnalyzeConfig,
-    YOLO_AVAILABLE,
-    _detect_obstacles_basic,
-    _detect_obstacles_yolo,
-    _get_yolo_model,
-    _is_bbox_in_lane_roi,
+    _detect_batch,
+    _filter_lane_roi,
     _resize_keep_aspect,
-    _risk_level_for_bbox,
 )
 
 
-@dataclass
+# MJPEG quality tiers: name -> (max width, None for the capture size; JPEG quality)
+JPEG_TIERS: dict[str, tuple[int | None, int]] = {
+    'high': (None, 80),
+    'medium': (480, 70),
+    'low': (320, 60),
+}
+
+
+@dataclass(frozen=True)
 class RealtimeState:
-    jpeg: Optional[bytes] = None
+    frame: Optional[np.ndarray] = None  # Latest published frame; never modified after publishing
     frame_id: int = 0
     frame_width: int = 0
     frame_height: int = 0
     detections: list[dict[str, Any]] | None = None
     detection_mode: str = 'unknown'
     fps: float | None = None
+    gate_skipped_frames: int = 0
+    gate_decision: str | None = None
+    latency_ms: float | None = None  # Capture of this frame -> its detections published
+    class_names: Mapping[int, str] | None = None
+    schema_version: int = 0  # Bumped when detection_mode or class_names change
 
 
-class RealtimeService:
+class _LatestFrame:
+    """Single-slot buffer between the capture and inference threads.
+
+    `put` overwrites whatever the inference thread has not taken yet, so
+    inference always starts on the freshest frame and stale frames never
+    queue up.
+    """
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._item: tuple[np.ndarray, float] | None = None
+
+    def put(self, frame: np.ndarray, captured_at: float) -> bool:
+        """Store `frame`; True if that dropped a frame inference never took."""
+        with self._cond:
+            dropped = self._item is not None
+            self._item = (frame, captured_at)
+            self._cond.notify()
+            return dropped
+
+    def take(self, timeout: float) -> tuple[np.ndarray, float] | None:
+        """The newest frame not taken yet (and its capture time), or None after `timeout`."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._item is not None, timeout):
+                return None
+            item, self._item = self._item, None
+            return item
+
+
+class FrameBroadcaster:
+    """Wakes subscribers when a new frame is published.
+
+    Subscribers only ever learn the latest frame ID, never a backlog: a
+    client slower than the source skips the frames it missed instead of
+    queueing them. Works for threads (`wait`) and asyncio tasks (`wait_async`).
+    """
+
     def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._frame_id = 0
+        self._waiters: set[tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+
+    def publish(self, frame_id: int) -> None:
+        with self._cond:
+            self._frame_id = frame_id
+            self._cond.notify_all()
+            waiters = list(self._waiters)
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # Event loop already closed
+                pass
+
+    def wait(self, last_id: int, timeout: float | None = None) -> int:
+        """Block until a frame newer than `last_id` exists; returns the latest ID (== last_id on timeout)."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._frame_id != last_id, timeout)
+            return self._frame_id
+
+    async def wait_async(self, last_id: int, timeout: float | None = None) -> int:
+        event = asyncio.Event()
+        entry = (asyncio.get_running_loop(), event)
+        with self._cond:
+            if self._frame_id != last_id:
+                return self._frame_id
+            self._waiters.add(entry)
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._cond:
+                self._waiters.discard(entry)
+        return self._frame_id
+
+
+def _enrich_detections(raw: DetectionBatch, fw: int, fh: int, cfg: AnalyzeConfig) -> list[dict[str, Any]]:
+    if cfg.lane_roi_enabled:
+        raw = _filter_lane_roi(raw, fw, fh, cfg)
+    risks = risk_codes(raw, fh, cfg).tolist()
+    names = raw.class_names()
+    boxes = raw.boxes.tolist()
+    cls_ids = raw.class_id.tolist()
+    confs = raw.confidence.tolist()
+    track_ids = raw.track_id.tolist() if raw.track_id is not None else None
+
+    enriched = []
+    for i, (x, y, w, h) in enumerate(boxes):
+        item = {
+            'class_name': names[i],
+            'class_id': cls_ids[i],
+            'confidence': confs[i],
+            'bbox': {'x': x, 'y': y, 'w': w, 'h': h},
+            'risk_level': RISK_LEVELS[risks[i]],
+            'reason': RISK_REASONS[risks[i]],
+        }
+        if track_ids is not None:
+            item['track_id'] = track_ids[i]
+        enriched.append(item)
+    return enriched
+
+
+class RealtimeService:
+    """Capture + inference worker for a single source, shared by all of its viewers."""
+
+    def __init__(
+        self,
+        src: str | int = 0,
+        cfg: AnalyzeConfig | None = None,
+        on_stopped: Callable[[RealtimeService], None] | None = None,
+    ) -> None:
         self._lock = threading.Lock()
-        self._state = RealtimeState(detections=[])
+        # Called from the worker thread once it has exited after a stop
+        self._on_stopped = on_stopped
+        # (previous, latest) published states; replaced (never mutated) once per frame, so readers need no copy
+        self._states: tuple[RealtimeState | None, RealtimeState] = (None, RealtimeState(detections=[]))
+        self._frames = FrameBroadcaster()
         self._thread: threading.Thread | None = None
         self._stop = threading.Event()
         self._ref_count = 0
 
-        self._cfg = AnalyzeConfig()
-        self._src: str | int = 0
+        self._cfg = cfg or AnalyzeConfig()
+        self._src: str | int = src
 
         self._last_infer_t = 0.0
         self._infer_fps = 0.0
+        self._timings = StageTimings('realtime')
+
+        # JPEGs are encoded on demand by MJPEG viewers, once per frame and tier
+        self._jpeg_cache: dict[str, tuple[int, bytes]] = {}
+        self._jpeg_locks = {tier: threading.Lock() for tier in JPEG_TIERS}
+        # WebSocket messages likewise, encoded once per frame and shared by every client
+        self._message_cache: dict[str, tuple[int, str | bytes]] = {}
+        self._message_locks = {kind: threading.Lock() for kind in ('json', 'binary', 'delta')}
+        self._schema_cache: tuple[int, str] | None = None
 
     def configure(self, src: str | int, cfg: AnalyzeConfig) -> None:
         with self._lock:
@@ -60,25 +201,102 @@ class RealtimeService:
         if should_start:
             self._start()
 
-    def release(self) -> None:
+    def release(self) -> bool:
+        """Drop one viewer; returns True when that stopped the capture thread."""
         with self._lock:
             self._ref_count = max(0, self._ref_count - 1)
             should_stop = self._ref_count == 0
         if should_stop:
             self._stop.set()
+        return should_stop
 
-    def snapshot(self) -> RealtimeState:
+    @property
+    def src(self) -> str | int:
+        return self._src
+
+    @property
+    def ref_count(self) -> int:
         with self._lock:
-            st = self._state
-            return RealtimeState(
-                jpeg=st.jpeg,
-                frame_id=st.frame_id,
-                frame_width=st.frame_width,
-                frame_height=st.frame_height,
-                detections=list(st.detections or []),
-                detection_mode=st.detection_mode,
-                fps=st.fps,
-            )
+            return self._ref_count
+
+    def join(self, timeout: float | None = None) -> None:
+        with self._lock:
+            t = self._thread
+        if t is not None and t.is_alive():
+            t.join(timeout=timeout)
+
+    def snapshot(self) -> RealtimeState:
+        return self._states[1]
+
+    def timings(self) -> dict[str, Any]:
+        """Stage breakdown since this session started (see metrics.StageTimings)."""
+        return self._timings.to_dict()
+
+    def wait_frame(self, last_id: int, timeout: float | None = None) -> int:
+        return self._frames.wait(last_id, timeout)
+
+    async def wait_frame_async(self, last_id: int, timeout: float | None = None) -> int:
+        return await self._frames.wait_async(last_id, timeout)
+
+    def jpeg(self, tier: str = 'high') -> tuple[int, bytes | None]:
+        """(frame_id, JPEG) of the latest frame at `tier`.
+
+        The first viewer asking for a frame at a tier encodes it; the others
+        of that tier get the cached bytes. Without MJPEG viewers nothing is
+        encoded.
+        """
+        st = self._states[1]
+        frame_id = st.frame_id
+        frame = st.frame
+        if frame is None:
+            return frame_id, None
+
+        with self._jpeg_locks[tier]:
+            cached = self._jpeg_cache.get(tier)
+            if cached is not None and cached[0] == frame_id:
+                return cached
+            max_width, quality = JPEG_TIERS[tier]
+            if max_width is not None and frame.shape[1] > max_width:
+                frame = _resize_keep_aspect(frame, max_width)
+            with self._timings.time('jpeg_encode'):
+                ok, buf = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+            if not ok:
+                return frame_id, None
+            self._jpeg_cache[tier] = (frame_id, buf.tobytes())
+            return self._jpeg_cache[tier]
+
+    def message(self, fmt: str = 'json', since: int = 0) -> tuple[RealtimeState, str | bytes]:
+        """The latest frame and its WebSocket message in `fmt` ('json' or 'binary').
+
+        A binary message is a delta when `since` is the frame published right
+        before it (the client has that frame), else a keyframe. Each message
+        is encoded once per frame, by the first client asking for it.
+        """
+        prev, st = self._states
+        kind = fmt
+        if fmt == 'binary' and since and prev is not None and prev.frame_id == since:
+            kind = 'delta'
+
+        with self._message_locks[kind]:
+            cached = self._message_cache.get(kind)
+            if cached is not None and cached[0] == st.frame_id:
+                return st, cached[1]
+            with self._timings.time('ws_encode'):
+                if kind == 'json':
+                    data: str | bytes = encode_json(st)
+                else:
+                    data = encode_binary(st, prev if kind == 'delta' else None)
+            self._message_cache[kind] = (st.frame_id, data)
+            return st, data
+
+    def schema(self, st: RealtimeState) -> str:
+        """Enum tables for binary messages of `st` (see realtime_codec)."""
+        cached = self._schema_cache
+        if cached is not None and cached[0] == st.schema_version:
+            return cached[1]
+        text = encode_schema(st.detection_mode, st.class_names or {})
+        self._schema_cache = (st.schema_version, text)
+        return text
 
     def _restart(self) -> None:
         self._stop.set()
@@ -94,76 +312,124 @@ class RealtimeService:
 
     def _start(self) -> None:
         self._stop.clear()
-        t = threading.Thread(target=self._run, name='realtime_capture', daemon=True)
+        t = threading.Thread(target=self._run, name=f'realtime_infer_{self._src}', daemon=True)
         with self._lock:
             self._thread = t
         t.start()
 
-    def _run(self) -> None:
-        cap: cv2.VideoCapture | None = None
-        backsub = cv2.createBackgroundSubtractorMOG2(history=500, varThreshold=16, detectShadows=True)
-
-        def open_cap() -> cv2.VideoCapture:
-            src = self._src
-            if isinstance(src, str) and src.isdigit():
-                src = int(src)
-            return cv2.VideoCapture(src)
-
-        cap = open_cap()
-        time.sleep(0.05)
-
-        frame_index = -1
-        last_detections: list[dict[str, Any]] = []
-        last_w = 0
-        last_h = 0
+    def _capture(self, slot: _LatestFrame) -> None:
+        """Reads the source as fast as it delivers frames and hands each one to `slot`."""
+        src = self._src
+        if isinstance(src, str) and src.isdigit():
+            src = int(src)
+        # Cameras and streams deliver in real time; a file would be read as fast as it decodes
+        pace = isinstance(src, str) and os.path.isfile(src)
 
+        cap: cv2.VideoCapture | None = None
+        next_due = 0.0
+        interval = 0.0
         while not self._stop.is_set():
             if cap is None or not cap.isOpened():
                 try:
-                    cap = open_cap()
+                    cap = cv2.VideoCapture(src)
                 except Exception:
                     time.sleep(0.25)
                     continue
+                fps = cap.get(cv2.CAP_PROP_FPS) if pace else 0.0
+                interval = 1.0 / fps if fps and fps > 0 else 0.0
 
+            t0 = time.perf_counter()
             ok, frame = cap.read()
             if not ok or frame is None:
                 time.sleep(0.02)
                 continue
+            self._timings.observe('capture', time.perf_counter() - t0)
+
+            if interval:
+                delay = next_due - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                next_due = max(next_due, time.monotonic()) + interval
+            if slot.put(frame, time.monotonic()):
+                self._timings.count('dropped_frames')
+
+        if cap is not None:
+            try:
+                cap.release()
+            except Exception:
+                pass
+
+    def _run(self) -> None:
+        """Inference loop; owns the capture thread for the lifetime of this run."""
+        slot = _LatestFrame()
+        capture = threading.Thread(target=self._capture, args=(slot,), name=f'realtime_capture_{self._src}', daemon=True)
+        capture.start()
+        try:
+            self._infer(slot)
+        finally:
+            capture.join(timeout=1.0)
+            if self._on_stopped is not None:
+                self._on_stopped(self)
+
+    def _infer(self, slot: _LatestFrame) -> None:
+        detector: Detector | None = None
+        detector_key: tuple[str, str | None] | None = None
+        tracker: IouTracker | None = None
+        last_tracker_key: tuple | None = None
+        gate: MotionGate | None = None
+        last_gate_key: tuple | None = None
+
+        frame_index = -1
+        last_detections: list[dict[str, Any]] = []
+        class_names: Mapping[int, str] = {}
+        schema_key: tuple | None = None
+        schema_version = self._states[1].schema_version
+
+        while not self._stop.is_set():
+            item = slot.take(timeout=0.25)
+            if item is None:
+                continue
+            frame, captured_at = item
 
             frame_index += 1
             cfg = self._cfg
-            frame = _resize_keep_aspect(frame, cfg.resize_width)
+            timings = self._timings
+            with timings.time('resize'):
+                frame = _resize_keep_aspect(frame, cfg.resize_width)
 
             run_detection = True
             if cfg.sampled_every_n_frames > 1:
                 run_detection = frame_index % cfg.sampled_every_n_frames == 0
 
-            use_yolo = YOLO_AVAILABLE and _get_yolo_model() is not None
+            # The backend is chosen per session and may change on reconfigure
+            key = (cfg.detector_backend, cfg.model_path)
+            if detector is None or key != detector_key:
+                try:
+                    detector = create_detector(cfg)
+                except Exception:
+                    # No error channel for viewers; keep streaming with the basic detector
+                    detector = BasicDetector()
+                detector_key = key
+            tracker_key = (cfg.tracking_enabled, cfg.tracking_optical_flow, cfg.tracking_iou_threshold, cfg.tracking_max_misses)
+            if tracker_key != last_tracker_key:
+                tracker = create_tracker(cfg)
+                last_tracker_key = tracker_key
+
+            gate_key = (cfg.motion_gate_enabled, cfg.motion_gate_threshold, cfg.motion_gate_max_skip)
+            if gate_key != last_gate_key:
+                gate = create_motion_gate(cfg)
+                last_gate_key = gate_key
+            if run_detection and gate is not None:
+                with timings.time('motion_gate'):
+                    run_detection = gate.should_run(frame_index, frame)
+
+            raw: DetectionBatch | None = None
             if run_detection:
-                if use_yolo:
-                    raw = _detect_obstacles_yolo(frame, cfg)
-                else:
-                    raw = _detect_obstacles_basic(frame, cfg, backsub)
-
-                fh = int(frame.shape[0])
-                fw = int(frame.shape[1])
-                enriched = []
-                for det in raw:
-                    x, y, w, h = det['x'], det['y'], det['w'], det['h']
-                    if cfg.lane_roi_enabled and not _is_bbox_in_lane_roi(int(x), int(y), int(w), int(h), int(fw), int(fh), cfg):
-                        continue
-                    risk_level, reason = _risk_level_for_bbox(x, y, w, h, fh, cfg)
-                    enriched.append(
-                        {
-                            'class_name': det.get('class_name'),
-                            'class_id': det.get('class_id'),
-                            'confidence': det.get('confidence'),
-                            'bbox': {'x': x, 'y': y, 'w': w, 'h': h},
-                            'risk_level': risk_level,
-                            'reason': reason,
-                        }
-                    )
-                last_detections = enriched
+                with timings.time('inference'):
+                    raw = _detect_batch([frame], cfg, detector)[0]
+                if tracker is not None:
+                    with timings.time('tracking'):
+                        raw = tracker.update(raw, frame_index, frame)
 
                 now = time.time()
                 if self._last_infer_t > 0:
@@ -172,28 +438,111 @@ class RealtimeService:
                         inst = 1.0 / dt
                         self._infer_fps = 0.8 * self._infer_fps + 0.2 * inst
                 self._last_infer_t = now
+            elif tracker is not None:
+                with timings.time('tracking'):
+                    raw = tracker.predict(frame_index, frame)
+
+            if raw is not None:
+                class_names = raw.names
+                last_detections = _enrich_detections(raw, int(frame.shape[1]), int(frame.shape[0]), cfg)
+
+            if schema_key is None or schema_key[0] != detector.name or (
+                schema_key[1] is not class_names and schema_key[1] != class_names
+            ):
+                schema_key = (detector.name, class_names)
+                schema_version += 1
 
             h, w = frame.shape[:2]
-            if w != last_w or h != last_h:
-                last_w, last_h = w, h
+            latency_s = time.monotonic() - captured_at
+            timings.observe('end_to_end', latency_s)
+            timings.count('frames')
+            timings.count('detections', len(last_detections))
+            prev = self._states[1]
+            st = RealtimeState(
+                frame=frame,
+                frame_id=prev.frame_id + 1,
+                frame_width=int(w),
+                frame_height=int(h),
+                detections=last_detections,
+                detection_mode=detector.name,
+                fps=float(self._infer_fps) if self._infer_fps > 0 else None,
+                gate_skipped_frames=gate.stats.skipped_frames if gate is not None else 0,
+                gate_decision=gate.stats.last_decision if gate is not None else None,
+                latency_ms=latency_s * 1000.0,
+                class_names=class_names,
+                schema_version=schema_version,
+            )
+            self._states = (prev, st)
+            self._frames.publish(st.frame_id)
 
-            ok_jpg, buf = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), 80])
-            if not ok_jpg:
-                time.sleep(0.01)
-                continue
 
-            with self._lock:
-                self._state.jpeg = buf.tobytes()
-                self._state.frame_id += 1
-                self._state.frame_width = int(w)
-                self._state.frame_height = int(h)
-                self._state.detections = list(last_detections)
-                self._state.detection_mode = 'yolo' if use_yolo else 'basic'
-                self._state.fps = float(self._infer_fps) if self._infer_fps > 0 else None
+def _normalize_src(src: str | int) -> str | int:
+    if isinstance(src, str):
+        src = src.strip()
+        if src.isdigit():
+            return int(src)
+    return src
 
-            time.sleep(0.001)
 
-        try:
-            cap.release()
-        except Exception:
-            pass
+class RealtimeSessionManager:
+    """Keeps one reference-counted `RealtimeService` per distinct source.
+
+    Viewers of the same source share its capture and inference pass (and
+    its config: the latest viewer's settings win); different sources run
+    independently.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._sessions: dict[str | int, RealtimeService] = {}
+        self._stopping: dict[str | int, RealtimeService] = {}
+
+    def acquire(self, src: str | int, cfg: AnalyzeConfig) -> RealtimeService:
+        key = _normalize_src(src)
+        with self._lock:
+            old = self._stopping.pop(key, None)
+        if old is not None:
+            # Let the previous worker release the device before reopening it
+            old.join(timeout=1.0)
+
+        with self._lock:
+            service = self._sessions.get(key)
+            if service is None:
+                service = RealtimeService(src=key, cfg=cfg, on_stopped=self._forget_stopped)
+                self._sessions[key] = service
+            else:
+                service.configure(src=key, cfg=cfg)
+            service.acquire()
+        return service
+
+    def release(self, service: RealtimeService) -> None:
+        with self._lock:
+            stopped = service.release()
+            if stopped and self._sessions.get(service.src) is service:
+                del self._sessions[service.src]
+                self._stopping[service.src] = service
+
+    def _forget_stopped(self, service: RealtimeService) -> None:
+        # Its worker has exited: nothing left to wait for when the source is reopened
+        with self._lock:
+            if self._stopping.get(service.src) is service:
+                del self._stopping[service.src]
+
+    def sessions(self) -> list[dict[str, Any]]:
+        with self._lock:
+            items = list(self._sessions.values())
+        out = []
+        for service in items:
+            st = service.snapshot()
+            out.append(
+                {
+                    'src': str(service.src),
+                    'viewers': service.ref_count,
+                    'frame_id': st.frame_id,
+                    'detection_mode': st.detection_mode,
+                    'fps': st.fps,
+                    'latency_ms': st.latency_ms,
+                    'timings': service.timings(),
+                }
+            )
+        return out
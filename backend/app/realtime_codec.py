@@ -0,0 +1,194 @@
+"""Wire formats of the `/ws/realtime` stream.
+
+`json` (default): one text message per frame, the dict built by `state_dict`.
+
+`binary`: a text message `{"type": "schema", ...}` with the enum tables
+(class names, risk levels/reasons, gate decisions, detection mode), sent
+first and again whenever they change, then one binary message per frame,
+little-endian:
+
+    HEADER              version, flags, frame_id, frame_width, frame_height,
+                        gate_skipped_frames, fps, latency_ms, gate_decision,
+                        detection count, removed count
+    u32 x removed       track IDs dropped since the previous frame (delta only)
+    DETECTION x count   class_id (i16), risk, confidence * 255, x, y, w, h, track_id
+
+`class_id` keys the schema's `class_names` (the basic detector's is -1).
+`fps`/`latency_ms` are NaN and `gate_decision` is 255 when unknown;
+`track_id` is 0xFFFFFFFF without tracking. A risk index selects both the
+risk level and its reason.
+
+A delta frame (`FLAG_DELTA`) is relative to the frame right before it: the
+receiver keeps that frame's tracked detections, drops the removed IDs and
+upserts the tracked detections it carries; untracked detections are always
+sent in full. Keyframes replace everything. `decode_binary` implements the
+receiving side.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import struct
+from typing import TYPE_CHECKING, Any, Mapping
+
+from .detections import RISK_LEVELS, RISK_REASONS
+from .gating import DECISIONS
+
+if TYPE_CHECKING:
+    from .realtime import RealtimeState
+
+
+VERSION = 2
+FLAG_DELTA = 1
+
+HEADER = struct.Struct("<BBIHHIffBHH")
+DETECTION = struct.Struct("<hBBHHHHI")
+NO_TRACK = 0xFFFFFFFF
+NO_DECISION = 255
+
+_RISK_INDEX = {level: i for i, level in enumerate(RISK_LEVELS)}
+_DECISION_INDEX = {d: i for i, d in enumerate(DECISIONS)}
+
+
+def state_dict(st: RealtimeState) -> dict[str, Any]:
+    return {
+        "frame_id": st.frame_id,
+        "frame_width": st.frame_width,
+        "frame_height": st.frame_height,
+        "detections": st.detections or [],
+        "detection_mode": st.detection_mode,
+        "fps": st.fps,
+        "gate_skipped_frames": st.gate_skipped_frames,
+        "gate_decision": st.gate_decision,
+        "latency_ms": st.latency_ms,
+    }
+
+
+def encode_json(st: RealtimeState) -> str:
+    # Same encoding as WebSocket.send_json
+    return json.dumps(state_dict(st), separators=(",", ":"), ensure_ascii=False)
+
+
+def encode_schema(detection_mode: str, class_names: Mapping[int, str]) -> str:
+    return json.dumps(
+        {
+            "type": "schema",
+            "version": VERSION,
+            "detection_mode": detection_mode,
+            "class_names": {str(k): v for k, v in class_names.items()},
+            "risk_levels": list(RISK_LEVELS),
+            "risk_reasons": list(RISK_REASONS),
+            "gate_decisions": list(DECISIONS),
+        },
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+
+
+def _u16(v: Any) -> int:
+    return min(0xFFFF, max(0, int(v)))
+
+
+def _i16(v: Any) -> int:
+    return min(0x7FFF, max(-0x8000, int(v)))
+
+
+def _records(st: RealtimeState) -> list[tuple[int | None, bytes]]:
+    """(track_id or None, packed record) per detection."""
+    out = []
+    for d in st.detections or []:
+        b = d["bbox"]
+        track_id = d.get("track_id")
+        out.append(
+            (
+                track_id,
+                DETECTION.pack(
+                    _i16(d["class_id"]),
+                    _RISK_INDEX.get(d["risk_level"], 0),
+                    min(255, max(0, round(float(d["confidence"]) * 255))),
+                    _u16(b["x"]),
+                    _u16(b["y"]),
+                    _u16(b["w"]),
+                    _u16(b["h"]),
+                    NO_TRACK if track_id is None else int(track_id) & 0xFFFFFFFF,
+                ),
+            )
+        )
+    return out
+
+
+def encode_binary(st: RealtimeState, prev: RealtimeState | None = None) -> bytes:
+    """One frame in the binary format; a delta against `prev` when given."""
+    records = _records(st)
+    removed: list[int] = []
+    flags = 0
+    if prev is not None:
+        flags |= FLAG_DELTA
+        before = {tid: rec for tid, rec in _records(prev) if tid is not None}
+        current = {tid for tid, _ in records if tid is not None}
+        removed = [tid for tid in before if tid not in current]
+        # Tracked detections identical to the previous frame are implied
+        records = [(tid, rec) for tid, rec in records if tid is None or before.get(tid) != rec]
+
+    header = HEADER.pack(
+        VERSION,
+        flags,
+        st.frame_id & 0xFFFFFFFF,
+        _u16(st.frame_width),
+        _u16(st.frame_height),
+        st.gate_skipped_frames & 0xFFFFFFFF,
+        math.nan if st.fps is None else st.fps,
+        math.nan if st.latency_ms is None else st.latency_ms,
+        _DECISION_INDEX.get(st.gate_decision, NO_DECISION),
+        len(records),
+        len(removed),
+    )
+    return b"".join([header, struct.pack(f"<{len(removed)}I", *(tid & 0xFFFFFFFF for tid in removed))] + [rec for _, rec in records])
+
+
+def decode_binary(data: bytes, prev: list[dict[str, Any]] | None = None) -> dict[str, Any]:
+    """Parse one binary frame; `prev` is the previous frame's `detections` (needed for deltas).
+
+    Detections come back as dicts of the packed fields (`risk` is the index
+    into the schema's `risk_levels`, `confidence` is quantized to 1/255 and
+    `track_id` is None without tracking).
+    """
+    (version, flags, frame_id, width, height, skipped, fps, latency_ms, decision, count, n_removed) = HEADER.unpack_from(data, 0)
+    if version != VERSION:
+        raise ValueError(f"Unsupported realtime format version {version}")
+    pos = HEADER.size
+    removed = set(struct.unpack_from(f"<{n_removed}I", data, pos))
+    pos += 4 * n_removed
+
+    carried: dict[int, dict[str, Any]] = {}
+    if flags & FLAG_DELTA:
+        if prev is None:
+            raise ValueError("Delta frame without a previous frame")
+        carried = {d["track_id"]: d for d in prev if d["track_id"] is not None and d["track_id"] not in removed}
+    untracked = []
+    for _ in range(count):
+        class_id, risk, conf, x, y, w, h, track_id = DETECTION.unpack_from(data, pos)
+        pos += DETECTION.size
+        d = {
+            "class_id": class_id,
+            "risk": risk,
+            "confidence": conf / 255.0,
+            "bbox": {"x": x, "y": y, "w": w, "h": h},
+            "track_id": None if track_id == NO_TRACK else track_id,
+        }
+        if d["track_id"] is None:
+            untracked.append(d)
+        else:
+            carried[d["track_id"]] = d
+    return {
+        "frame_id": frame_id,
+        "frame_width": width,
+        "frame_height": height,
+        "gate_skipped_frames": skipped,
+        "fps": None if math.isnan(fps) else fps,
+        "latency_ms": None if math.isnan(latency_ms) else latency_ms,
+        "gate_decision": None if decision == NO_DECISION else DECISIONS[decision],
+        "delta": bool(flags & FLAG_DELTA),
+        "detections": list(carried.values()) + untracked,
+    }
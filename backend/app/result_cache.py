@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import asdict
+from pathlib import Path
+
+from .detectors import model_version
+from .vision import AnalyzeConfig
+
+
+# Bump when a code change alters results for the same input, config and model
+CACHE_VERSION = 1
+
+# Config fields that only tune throughput and never change a result
+_RUNTIME_FIELDS = {"pipeline_queue_size", "snapshot_workers"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    cache_key TEXT PRIMARY KEY,
+    result_id TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_result ON entries (result_id);
+CREATE TABLE IF NOT EXISTS refs (
+    result_id TEXT PRIMARY KEY,
+    refcount INTEGER NOT NULL
+);
+"""
+
+
+def config_digest(cfg: AnalyzeConfig) -> str:
+    """sha256 of `cfg` as canonical JSON (sorted keys), without the runtime-only fields."""
+    data = {k: v for k, v in asdict(cfg).items() if k not in _RUNTIME_FIELDS}
+    text = json.dumps(data, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def cache_key(input_sha256: str, cfg: AnalyzeConfig) -> str:
+    """Key of the result of processing an input with the given content hash under `cfg`."""
+    parts = [str(CACHE_VERSION), input_sha256, config_digest(cfg), model_version(cfg)]
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Index of finished results by `cache_key`, plus a reference count per result.
+
+    Every job pointing at a result holds one reference; a result is only
+    deleted when `release` drops its last one. Results written before the
+    cache existed have no row and count as singly referenced.
+    """
+
+    def __init__(self, db_path: Path) -> None:
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(db_path), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+
+    def claim(self, key: str) -> str | None:
+        """The cached result for `key` with one reference taken on it, or None on a miss.
+
+        Lookup and reference happen in one transaction, so a concurrent
+        `release` cannot delete the result in between.
+        """
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute("SELECT result_id FROM entries WHERE cache_key = ?", (key,)).fetchone()
+                if row is not None:
+                    self._acquire_locked(row[0])
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return row[0] if row else None
+
+    def insert(self, key: str, result_id: str) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (cache_key, result_id, created_at) VALUES (?, ?, ?)",
+                (key, result_id, time.time()),
+            )
+
+    def forget(self, key: str) -> None:
+        """Drop an entry whose result has gone missing."""
+        with self._lock:
+            self._db.execute("DELETE FROM entries WHERE cache_key = ?", (key,))
+
+    def acquire(self, result_id: str) -> None:
+        with self._lock:
+            self._acquire_locked(result_id)
+
+    def _acquire_locked(self, result_id: str) -> None:
+        self._db.execute(
+            "INSERT INTO refs (result_id, refcount) VALUES (?, 1) "
+            "ON CONFLICT (result_id) DO UPDATE SET refcount = refcount + 1",
+            (result_id,),
+        )
+
+    def release(self, result_id: str) -> bool:
+        """Drop one reference; True when none are left and the result may be deleted.
+
+        The result's cache entries are removed in the same step, so no new
+        job can pick it up while it is being deleted.
+        """
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute("SELECT refcount FROM refs WHERE result_id = ?", (result_id,)).fetchone()
+                remaining = (row[0] if row else 1) - 1
+                if remaining > 0:
+                    self._db.execute("UPDATE refs SET refcount = ? WHERE result_id = ?", (remaining, result_id))
+                else:
+                    self._db.execute("DELETE FROM refs WHERE result_id = ?", (result_id,))
+                    self._db.execute("DELETE FROM entries WHERE result_id = ?", (result_id,))
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return remaining <= 0
+
+    def refcount(self, result_id: str) -> int:
+        with self._lock:
+            row = self._db.execute("SELECT refcount FROM refs WHERE result_id = ?", (result_id,)).fetchone()
+        return row[0] if row else 0
@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+import shutil
+import uuid
+from concurrent.futures import FIRST_EXCEPTION, ProcessPoolExecutor, wait
+from dataclasses import replace
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+import cv2
+
+from .detection_store import DetectionStore, DetectionStoreWriter
+from .detectors import resolve_backend
+from .metrics import StageTimings
+from .vision import AnalyzeConfig, _video_fourcc, annotate_video
+
+
+# Shorter segments are not worth a process start + model load
+MIN_SEGMENT_FRAMES = 250
+
+# Per-process shared counters of frames written, one slot per segment
+_progress = None
+# Per-process shared flag the parent sets to stop the remaining segments
+_cancel = None
+
+
+class SegmentCancelled(Exception):
+    pass
+
+
+def plan_segments(frame_count: int | None, workers: int, min_frames: int = MIN_SEGMENT_FRAMES) -> list[tuple[int, int | None]]:
+    """Split [0, frame_count) into up to `workers` contiguous (start, end) ranges.
+
+    The last range is open-ended (end None) so frames past an inaccurate
+    container frame count are still processed.
+    """
+    if not frame_count or workers <= 1:
+        return [(0, None)]
+    n = max(1, min(int(workers), frame_count // max(1, min_frames)))
+    bounds = [frame_count * i // n for i in range(n + 1)]
+    ranges: list[tuple[int, int | None]] = [(bounds[i], bounds[i + 1]) for i in range(n)]
+    ranges[-1] = (ranges[-1][0], None)
+    return ranges
+
+
+def _init_worker(progress, cancel, threads: int, uses_torch: bool) -> None:
+    global _progress, _cancel
+    _progress = progress
+    _cancel = cancel
+    # Each worker gets its share of the cores instead of a full-size pool of its own
+    cv2.setNumThreads(threads)
+    if uses_torch:
+        import torch
+
+        torch.set_num_threads(threads)
+
+
+def _run_segment(
+    index: int,
+    input_path: str,
+    output_path: str,
+    cfg: AnalyzeConfig,
+    snapshots_dir: str | None,
+    start_frame: int,
+    end_frame: int | None,
+    detections_dir: str | None = None,
+) -> tuple[dict[str, Any], list[dict[str, Any]]]:
+    events: list[dict[str, Any]] = []
+    detections_out = DetectionStoreWriter(Path(detections_dir)) if detections_dir is not None else None
+
+    def progress_cb(processed: int, _total: int | None, message: str | None) -> None:
+        if _cancel is not None and _cancel.value:
+            raise SegmentCancelled(f"Segment {index} cancelled")
+        if _progress is not None and message == "Processing":
+            _progress[index] = processed - start_frame
+
+    try:
+        stats = annotate_video(
+            input_path=input_path,
+            output_path=output_path,
+            cfg=cfg,
+            progress_cb=progress_cb,
+            events_out=events,
+            snapshots_dir=snapshots_dir,
+            detections_out=detections_out,
+            start_frame=start_frame,
+            end_frame=end_frame,
+            warmup_frames=cfg.segment_warmup_frames,
+        )
+    finally:
+        if detections_out is not None:
+            detections_out.close()
+    return stats, events
+
+
+def concat_videos(paths: list[str], output_path: str, fps: float) -> int:
+    """Re-encode the given videos back to back into `output_path`; returns frames written."""
+    writer: cv2.VideoWriter | None = None
+    written = 0
+    try:
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+            cap = cv2.VideoCapture(path)
+            try:
+                while True:
+                    ok, frame = cap.read()
+                    if not ok:
+                        break
+                    if writer is None:
+                        h, w = frame.shape[:2]
+                        fourcc = cv2.VideoWriter_fourcc(*_video_fourcc(output_path))
+                        writer = cv2.VideoWriter(output_path, fourcc, float(fps), (w, h))
+                        if not writer.isOpened():
+                            raise RuntimeError("Cannot open video writer")
+                    writer.write(frame)
+                    written += 1
+            finally:
+                cap.release()
+    finally:
+        if writer is not None:
+            writer.release()
+    return written
+
+
+def _track_offsets(stats: list[dict[str, Any]]) -> list[int]:
+    """Per-segment shift that keeps track IDs from different segments distinct."""
+    offsets = []
+    total = 0
+    for s in stats:
+        offsets.append(total)
+        total += int(s.get("track_count", 0))
+    return offsets
+
+
+def _merge_gate_stats(stats: list[dict[str, Any]]) -> dict[str, Any] | None:
+    gates = [s["motion_gate"] for s in stats if "motion_gate" in s]
+    if not gates:
+        return None
+    merged = dict(gates[-1])
+    for key in ("evaluated_frames", "skipped_frames", "forced_frames"):
+        merged[key] = sum(g[key] for g in gates)
+    return merged
+
+
+def annotate_video_segmented(
+    input_path: str,
+    output_path: str,
+    cfg: AnalyzeConfig,
+    progress_cb: Optional[Callable[[int, int | None, str | None], None]] = None,
+    events_out: Optional[list[dict[str, Any]]] = None,
+    snapshots_dir: str | None = None,
+    detections_out: DetectionStoreWriter | None = None,
+) -> dict[str, Any]:
+    """`annotate_video` split over `cfg.segment_workers` processes.
+
+    Each worker process annotates one frame range with its own detector and
+    writes a segment video; events are merged in frame order and snapshots
+    keep their global frame-index names. Falls back to a serial run when the
+    video is too short to split.
+    """
+    if not os.path.exists(input_path):
+        raise FileNotFoundError(input_path)
+
+    cap = cv2.VideoCapture(input_path)
+    if not cap.isOpened():
+        raise RuntimeError("Cannot open video")
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    if not fps or fps <= 0:
+        fps = 25.0
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0) or None
+    cap.release()
+
+    workers = min(max(1, int(cfg.segment_workers)), os.cpu_count() or 1)
+    ranges = plan_segments(frame_count, workers)
+    if len(ranges) == 1:
+        return annotate_video(input_path, output_path, cfg, progress_cb, events_out, snapshots_dir, detections_out)
+
+    work_dir = Path(output_path).parent / f".segments_{uuid.uuid4().hex}"
+    work_dir.mkdir(parents=True, exist_ok=True)
+    # Lossless intermediates, so stitching is the only lossy encode
+    seg_paths = [str(work_dir / f"{i:03d}.mkv") for i in range(len(ranges))]
+    det_dirs = [str(work_dir / f"{i:03d}_detections") if detections_out is not None else None for i in range(len(ranges))]
+
+    # Spawned (not forked) workers: the parent runs threads and holds OpenCV state
+    ctx = multiprocessing.get_context("spawn")
+    progress = ctx.Array("q", len(ranges), lock=False)
+    cancel = ctx.Value("b", 0, lock=False)
+    # Workers never submit jobs of their own
+    seg_cfg = replace(cfg, segment_workers=1)
+    timings = StageTimings("annotate")
+
+    try:
+        threads = max(1, (os.cpu_count() or 1) // len(ranges))
+        pool = ProcessPoolExecutor(
+            max_workers=len(ranges),
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(progress, cancel, threads, resolve_backend(cfg) == "yolo"),
+        )
+        try:
+            futures = [
+                pool.submit(_run_segment, i, input_path, seg_paths[i], seg_cfg, snapshots_dir, start, end, det_dirs[i])
+                for i, (start, end) in enumerate(ranges)
+            ]
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=0.5, return_when=FIRST_EXCEPTION)
+                failed = next((f for f in done if f.exception() is not None), None)
+                if failed is not None:
+                    raise failed.exception()
+                if progress_cb is not None:
+                    progress_cb(sum(progress), frame_count, "Processing")
+            results = [f.result() for f in futures]
+        except BaseException:
+            # Stop the other segments of a job that already failed, and wait for them
+            # to let go of the work dir before it is removed
+            cancel.value = 1
+            pool.shutdown(wait=True, cancel_futures=True)
+            raise
+        pool.shutdown()
+
+        if progress_cb is not None:
+            progress_cb(sum(progress), frame_count, "Stitching segments")
+        with timings.time("stitch"):
+            written = concat_videos(seg_paths, output_path, fps)
+
+        offsets = _track_offsets([s for s, _ in results])
+        if detections_out is not None:
+            for det_dir, offset in zip(det_dirs, offsets):
+                detections_out.extend_store(DetectionStore(Path(det_dir)), track_offset=offset)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if events_out is not None:
+        for (_, events), offset in zip(results, offsets):
+            for event in events:
+                if "track_id" in event:
+                    event["track_id"] += offset
+            events_out.extend(events)
+
+    if progress_cb is not None:
+        progress_cb(frame_count or written, frame_count, "Done")
+
+    seg_stats = [s for s, _ in results]
+    # Workers are other processes: fold their timings into this job and this process' metrics
+    for s in seg_stats:
+        timings.merge(s.get("timings", {}))
+    stats = {
+        "fps": float(fps),
+        "frame_count": frame_count,
+        "detection_mode": seg_stats[0].get("detection_mode", "unknown"),
+        "segments": len(ranges),
+    }
+    if cfg.tracking_enabled:
+        stats["track_count"] = sum(int(s.get("track_count", 0)) for s in seg_stats)
+    snaps = [s["snapshots"] for s in seg_stats if "snapshots" in s]
+    if snaps:
+        stats["snapshots"] = {k: sum(s[k] for s in snaps) for k in snaps[0]}
+    gate = _merge_gate_stats(seg_stats)
+    if gate is not None:
+        stats["motion_gate"] = gate
+    stats["timings"] = timings.to_dict()
+    return stats
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import os
+import queue
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any
+
+import cv2
+import numpy as np
+
+from .metrics import REGISTRY, StageTimings
+
+
+@dataclass
+class SnapshotStats:
+    written: int = 0
+    dropped: int = 0  # Queue was full
+    failed: int = 0  # Encode/write error
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+class SnapshotWriter:
+    """Encodes and writes event snapshots on a small thread pool.
+
+    `submit` never blocks the render loop: when `queue_size` snapshots are
+    already pending, the new one is dropped and `submit` returns False so
+    the caller can leave the event without a snapshot.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_width: int | None = None,
+        jpeg_quality: int = 95,
+        queue_size: int = 32,
+        workers: int = 2,
+        timings: StageTimings | None = None,
+    ) -> None:
+        self.directory = directory
+        self.max_width = int(max_width) if max_width else None
+        self.jpeg_quality = max(1, min(100, int(jpeg_quality)))
+        self.stats = SnapshotStats()
+        self._timings = timings
+        self._depth = REGISTRY.gauge("snapshot_queue_depth", "Snapshots waiting to be written, all jobs")
+        self._stats_lock = threading.Lock()
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, int(queue_size)))
+        self._threads = [
+            threading.Thread(target=self._work, name=f"snapshot_writer_{i}", daemon=True)
+            for i in range(max(1, int(workers)))
+        ]
+        for t in self._threads:
+            t.start()
+
+    def submit(self, name: str, frame: np.ndarray) -> bool:
+        """Queue a copy of `frame` to be written as `name`; False if it was dropped."""
+        try:
+            self._queue.put_nowait((name, frame.copy()))
+        except queue.Full:
+            with self._stats_lock:
+                self.stats.dropped += 1
+            if self._timings is not None:
+                self._timings.count("snapshots_dropped")
+            return False
+        self._depth.inc()
+        return True
+
+    def close(self) -> None:
+        """Write everything still queued, then stop the workers."""
+        for _ in self._threads:
+            self._queue.put(None)
+        for t in self._threads:
+            t.join()
+
+    def _work(self) -> None:
+        params = [int(cv2.IMWRITE_JPEG_QUALITY), self.jpeg_quality]
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            self._depth.dec()
+            name, frame = item
+            t0 = time.perf_counter()
+            try:
+                h, w = frame.shape[:2]
+                if self.max_width and w > self.max_width:
+                    frame = cv2.resize(frame, (self.max_width, max(1, int(h * self.max_width / w))), interpolation=cv2.INTER_AREA)
+                ok = cv2.imwrite(os.path.join(self.directory, name), frame, params)
+            except Exception:
+                ok = False
+            if self._timings is not None:
+                self._timings.observe("snapshot_write", time.perf_counter() - t0)
+            with self._stats_lock:
+                if ok:
+                    self.stats.written += 1
+                else:
+                    self.stats.failed += 1
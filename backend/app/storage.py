@@ -1,7 +1,8 @@
 from __future__ import annotations
 
 import json
-from dataclasses import asdict, dataclass
+import shutil
+from dataclasses import asdict, dataclass, field
 from pathlib import Path
 from typing import Any
 
@@ -10,9 +11,13 @@ from typing import Any
 class ResultPaths:
     result_dir: Path
     meta_path: Path
-    events_path: Path
+    events_path: Path  # Legacy single-file events (results written by older versions)
+    events_log_path: Path
+    events_index_path: Path
     video_path: Path
     snapshots_dir: Path
+    detections_dir: Path  # Columnar per-frame detections (see detection_store.py)
+    preview_dir: Path  # Segments playable while the job runs (see preview.py)
 
 
 class Storage:
@@ -35,10 +40,17 @@ class Storage:
             result_dir=result_dir,
             meta_path=result_dir / "meta.json",
             events_path=result_dir / "events.json",
+            events_log_path=result_dir / "events.ndjson",
+            events_index_path=result_dir / "events.idx.json",
             video_path=result_dir / "annotated.mp4",
             snapshots_dir=snapshots_dir,
+            detections_dir=result_dir / "detections",
+            preview_dir=result_dir / "preview",
         )
 
+    def delete_result(self, result_id: str) -> None:
+        shutil.rmtree(self.results_dir / result_id, ignore_errors=True)
+
     def write_json(self, path: Path, data: Any) -> None:
         path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
 
@@ -56,6 +68,7 @@ class ResultMeta:
     frame_count: int | None
     detection_mode: str
     config: dict[str, Any]
+    stats: dict[str, Any] = field(default_factory=dict)  # Extra run stats (e.g. motion_gate)
 
     def to_dict(self) -> dict[str, Any]:
         return asdict(self)
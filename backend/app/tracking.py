@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Mapping
+
+import cv2
+import numpy as np
+
+from .detections import DetectionBatch
+
+if TYPE_CHECKING:
+    from .vision import AnalyzeConfig
+
+
+@dataclass
+class Track:
+    track_id: int
+    box: np.ndarray  # x, y, w, h (float) at `frame`
+    velocity: np.ndarray  # dx, dy, dw, dh per frame
+    class_id: int
+    confidence: float
+    frame: int
+    last_detect_frame: int
+    hits: int = 1
+    misses: int = 0
+
+
+def _iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU between xywh boxes `a` (N, 4) and `b` (M, 4)."""
+    ax1, ay1 = a[:, 0:1], a[:, 1:2]
+    ax2, ay2 = ax1 + a[:, 2:3], ay1 + a[:, 3:4]
+    bx1, by1 = b[:, 0], b[:, 1]
+    bx2, by2 = bx1 + b[:, 2], by1 + b[:, 3]
+    iw = np.clip(np.minimum(ax2, bx2) - np.maximum(ax1, bx1), 0, None)
+    ih = np.clip(np.minimum(ay2, by2) - np.maximum(ay1, by1), 0, None)
+    inter = iw * ih
+    union = a[:, 2:3] * a[:, 3:4] + b[:, 2] * b[:, 3] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-9), 0.0)
+
+
+class IouTracker:
+    """Greedy IoU multi-object tracker with a constant-velocity (alpha-beta) motion model.
+
+    `update` is called on detection frames and assigns stable `track_id`s;
+    `predict` is called on the frames in between and moves each track along
+    its estimated velocity, optionally refined with sparse optical flow.
+    """
+
+    velocity_gain = 0.5
+
+    def __init__(self, iou_threshold: float = 0.3, max_misses: int = 2, use_optical_flow: bool = False) -> None:
+        self.iou_threshold = float(iou_threshold)
+        self.max_misses = max(0, int(max_misses))
+        self.use_optical_flow = bool(use_optical_flow)
+        self._tracks: list[Track] = []
+        self._next_id = 1
+        self._prev_gray: np.ndarray | None = None
+        self._names: Mapping[int, str] = {}
+
+    @property
+    def track_count(self) -> int:
+        """Number of track IDs handed out so far."""
+        return self._next_id - 1
+
+    def update(self, batch: DetectionBatch, frame_index: int, frame: np.ndarray | None = None) -> DetectionBatch:
+        """Associate fresh detections with tracks; returns the batch tagged with `track_id`."""
+        self._advance(frame_index, frame)
+        self._names = batch.names
+
+        n = len(batch)
+        boxes = batch.boxes.astype(np.float64)
+        matched_tracks: set[int] = set()
+        det_track: dict[int, Track] = {}
+
+        if self._tracks and n:
+            track_boxes = np.stack([t.box for t in self._tracks])
+            iou = _iou_matrix(track_boxes, boxes)
+            # Only associate detections of the same class
+            track_cls = np.array([t.class_id for t in self._tracks])
+            iou[track_cls[:, None] != batch.class_id[None, :]] = 0.0
+            for flat in np.argsort(iou, axis=None)[::-1]:
+                ti, di = np.unravel_index(flat, iou.shape)
+                if iou[ti, di] < self.iou_threshold:
+                    break
+                if ti in matched_tracks or di in det_track:
+                    continue
+                matched_tracks.add(int(ti))
+                det_track[int(di)] = self._tracks[ti]
+
+        track_ids = np.zeros(n, dtype=np.int64)
+        for di in range(n):
+            track = det_track.get(di)
+            z = boxes[di]
+            if track is None:
+                track = Track(
+                    track_id=self._next_id,
+                    box=z.copy(),
+                    velocity=np.zeros(4),
+                    class_id=int(batch.class_id[di]),
+                    confidence=float(batch.confidence[di]),
+                    frame=frame_index,
+                    last_detect_frame=frame_index,
+                )
+                self._next_id += 1
+                self._tracks.append(track)
+            else:
+                dt = max(1, frame_index - track.last_detect_frame)
+                residual = z - track.box
+                # The second observation gives the first real velocity estimate
+                gain = 1.0 if track.hits == 1 else self.velocity_gain
+                track.velocity = track.velocity + gain * residual / dt
+                track.hits += 1
+                track.box = z.copy()
+                track.confidence = float(batch.confidence[di])
+                track.last_detect_frame = frame_index
+                track.misses = 0
+            track_ids[di] = track.track_id
+
+        survivors = []
+        for track in self._tracks:
+            if track.last_detect_frame != frame_index:
+                track.misses += 1
+                if track.misses > self.max_misses:
+                    continue
+            survivors.append(track)
+        self._tracks = survivors
+
+        out = batch.select(np.arange(n))
+        out.track_id = track_ids
+        return out
+
+    def predict(self, frame_index: int, frame: np.ndarray | None = None) -> DetectionBatch:
+        """Extrapolate active tracks to `frame_index` (a frame without detections)."""
+        self._advance(frame_index, frame)
+
+        # Tracks unmatched at the last detection stay alive but are not drawn
+        live = [t for t in self._tracks if t.misses == 0]
+        if not live:
+            return DetectionBatch.empty(self._names)
+
+        boxes = np.stack([t.box for t in live])
+        if frame is not None:
+            fh, fw = frame.shape[:2]
+            boxes[:, 0] = np.clip(boxes[:, 0], 0.0, fw - 1.0)
+            boxes[:, 1] = np.clip(boxes[:, 1], 0.0, fh - 1.0)
+            boxes[:, 2] = np.minimum(np.maximum(boxes[:, 2], 1.0), fw - boxes[:, 0])
+            boxes[:, 3] = np.minimum(np.maximum(boxes[:, 3], 1.0), fh - boxes[:, 1])
+        boxes = boxes.astype(np.int32)
+        return DetectionBatch(
+            boxes=boxes,
+            confidence=np.array([t.confidence for t in live], dtype=np.float32),
+            class_id=np.array([t.class_id for t in live], dtype=np.int32),
+            area=boxes[:, 2].astype(np.int64) * boxes[:, 3],
+            names=self._names,
+            track_id=np.array([t.track_id for t in live], dtype=np.int64),
+        )
+
+    def _advance(self, frame_index: int, frame: np.ndarray | None) -> None:
+        gray = None
+        if self.use_optical_flow and frame is not None:
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+        flow_shift = self._flow_shifts(gray) if gray is not None and self._prev_gray is not None else {}
+        for track in self._tracks:
+            dt = frame_index - track.frame
+            if dt <= 0:
+                continue
+            # Flow is measured between consecutive frames only
+            shift = flow_shift.get(track.track_id) if dt == 1 else None
+            if shift is not None:
+                track.box[:2] += shift
+                track.box[2:] += track.velocity[2:] * dt
+            else:
+                track.box += track.velocity * dt
+            track.frame = frame_index
+
+        if gray is not None:
+            self._prev_gray = gray
+
+    def _flow_shifts(self, gray: np.ndarray) -> dict[int, np.ndarray]:
+        """Median Lucas-Kanade displacement of corner points inside each track box."""
+        prev = self._prev_gray
+        if prev is None or prev.shape != gray.shape:
+            return {}
+        fh, fw = gray.shape[:2]
+        owners: list[int] = []
+        points: list[np.ndarray] = []
+        for track in self._tracks:
+            x, y, w, h = track.box.astype(int)
+            x0, y0 = max(0, x), max(0, y)
+            x1, y1 = min(fw, x + w), min(fh, y + h)
+            if x1 - x0 < 8 or y1 - y0 < 8:
+                continue
+            corners = cv2.goodFeaturesToTrack(prev[y0:y1, x0:x1], maxCorners=20, qualityLevel=0.01, minDistance=3)
+            if corners is None:
+                continue
+            corners = corners.reshape(-1, 2) + np.array([x0, y0], dtype=np.float32)
+            points.append(corners)
+            owners.extend([track.track_id] * len(corners))
+        if not points:
+            return {}
+
+        p0 = np.concatenate(points).astype(np.float32).reshape(-1, 1, 2)
+        p1, status, _ = cv2.calcOpticalFlowPyrLK(prev, gray, p0, None, winSize=(15, 15), maxLevel=2)
+        if p1 is None:
+            return {}
+        disp = (p1 - p0).reshape(-1, 2)
+        ok = status.reshape(-1) == 1
+        owner_arr = np.array(owners)
+
+        shifts: dict[int, np.ndarray] = {}
+        for track_id in set(owners):
+            sel = ok & (owner_arr == track_id)
+            if np.count_nonzero(sel) >= 3:
+                shifts[track_id] = np.median(disp[sel], axis=0).astype(np.float64)
+        return shifts
+
+
+def create_tracker(cfg: AnalyzeConfig) -> IouTracker | None:
+    """Return a tracker for one stream when `cfg.tracking_enabled`, else None."""
+    if not cfg.tracking_enabled:
+        return None
+    return IouTracker(
+        iou_threshold=cfg.tracking_iou_threshold,
+        max_misses=cfg.tracking_max_misses,
+        use_optical_flow=cfg.tracking_optical_flow,
+    )
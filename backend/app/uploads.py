@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import AsyncIterator
+
+
+# Received data is written in blocks of about this size, each in a worker thread
+_WRITE_BLOCK = 1024 * 1024
+
+
+class UploadConflict(Exception):
+    """A chunk did not start at the upload's current offset."""
+
+    def __init__(self, offset: int) -> None:
+        super().__init__(f"Upload is at offset {offset}")
+        self.offset = offset
+
+
+class ChunkChecksumError(Exception):
+    pass
+
+
+@dataclass
+class UploadRecord:
+    upload_id: str
+    filename: str
+    size: int | None  # Declared total size; None when unknown up front
+    created_at: float
+    offset: int = 0  # Bytes received so far (the part file's length)
+
+
+class UploadStore:
+    """Resumable uploads under `uploads_dir`: `<id>.part` (data) and `<id>.json` (metadata).
+
+    Chunks are appended to the part file in order; the part file's length
+    is the resume offset, so it survives restarts. A chunk whose checksum
+    does not match is truncated away again.
+    """
+
+    def __init__(self, uploads_dir: Path) -> None:
+        self._dir = uploads_dir
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._busy: set[str] = set()
+        # upload_id -> (offset, running sha256 of the part file up to that offset)
+        self._hashers: dict[str, tuple[int, "hashlib._Hash"]] = {}
+
+    def create(self, filename: str, size: int | None = None) -> UploadRecord:
+        rec = UploadRecord(upload_id=f"upl_{uuid.uuid4().hex}", filename=filename, size=size, created_at=time.time())
+        self._part_path(rec.upload_id).touch()
+        self._meta_path(rec.upload_id).write_text(
+            json.dumps({k: v for k, v in asdict(rec).items() if k != "offset"}), encoding="utf-8"
+        )
+        self._hashers[rec.upload_id] = (0, hashlib.sha256())
+        return rec
+
+    def get(self, upload_id: str) -> UploadRecord | None:
+        if not _valid_id(upload_id):
+            return None
+        try:
+            data = json.loads(self._meta_path(upload_id).read_text(encoding="utf-8"))
+            offset = self._part_path(upload_id).stat().st_size
+        except (OSError, ValueError):
+            return None
+        return UploadRecord(**data, offset=offset)
+
+    async def append(
+        self,
+        upload_id: str,
+        start: int,
+        chunks: AsyncIterator[bytes],
+        length: int,
+        sha256: str | None = None,
+    ) -> int:
+        """Append one chunk of `length` bytes that begins at `start`; returns the new offset.
+
+        A chunk that was already received completely (a retry whose response
+        got lost) is acknowledged without writing, after checking `sha256`
+        against the stored bytes when given. Raises KeyError for an
+        unknown upload, UploadConflict when `start` is not the current
+        offset (or another chunk is being written), ValueError when the body
+        is not `length` bytes or overruns the declared size, and
+        ChunkChecksumError when `sha256` (hex) does not match.
+        """
+        self._claim(upload_id)
+        try:
+            # Checked only while holding the upload, so a concurrent retry sees the final offset
+            rec = self.get(upload_id)
+            if rec is None:
+                raise KeyError(upload_id)
+            if start + length <= rec.offset:
+                if sha256 is not None:
+                    stored = await asyncio.to_thread(_file_sha256, self._part_path(upload_id), start, length)
+                    if stored != sha256.strip().lower():
+                        raise ChunkChecksumError("Chunk checksum does not match the bytes already received")
+                return rec.offset
+            if start != rec.offset:
+                raise UploadConflict(rec.offset)
+            if rec.size is not None and start + length > rec.size:
+                raise ValueError("Chunk runs past the declared upload size")
+            return await self._write(upload_id, start, chunks, length, sha256)
+        finally:
+            self._unclaim(upload_id)
+
+    def _claim(self, upload_id: str) -> None:
+        """Mark an upload as being written; UploadConflict if it already is."""
+        with self._lock:
+            if upload_id in self._busy:
+                rec = self.get(upload_id)
+                raise UploadConflict(rec.offset if rec is not None else 0)
+            self._busy.add(upload_id)
+
+    def _unclaim(self, upload_id: str) -> None:
+        with self._lock:
+            self._busy.discard(upload_id)
+
+    async def _write(self, upload_id: str, start: int, chunks: AsyncIterator[bytes], length: int, sha256: str | None) -> int:
+        chunk_hash = hashlib.sha256()
+        known = self._hashers.get(upload_id)
+        file_hash = known[1].copy() if known is not None and known[0] == start else None
+        received = 0
+        ok = False
+        buffer = bytearray()
+        # File I/O happens in worker threads so a slow disk doesn't stall the event loop
+        fh = await asyncio.to_thread(open, self._part_path(upload_id), "r+b")
+        try:
+            await asyncio.to_thread(fh.seek, start)
+            async for data in chunks:
+                received += len(data)
+                if received > length:
+                    raise ValueError("Chunk is longer than its Content-Range")
+                chunk_hash.update(data)
+                if file_hash is not None:
+                    file_hash.update(data)
+                buffer += data
+                if len(buffer) >= _WRITE_BLOCK:
+                    await asyncio.to_thread(fh.write, bytes(buffer))
+                    buffer.clear()
+            if received != length:
+                raise ValueError("Chunk is shorter than its Content-Range")
+            if sha256 is not None and chunk_hash.hexdigest() != sha256.strip().lower():
+                raise ChunkChecksumError("Chunk checksum mismatch")
+            if buffer:
+                await asyncio.to_thread(fh.write, bytes(buffer))
+            ok = True
+        finally:
+            # Also covers a client that disconnected mid-chunk: resume from `start`
+            await asyncio.to_thread(_close_part, fh, None if ok else start)
+        if file_hash is not None:
+            self._hashers[upload_id] = (start + length, file_hash)
+        else:
+            self._hashers.pop(upload_id, None)
+        return start + length
+
+    def finish(self, upload_id: str, dest: Path) -> str:
+        """Move the complete upload to `dest` (a rename, no copy); returns its sha256 hex digest."""
+        self._claim(upload_id)
+        try:
+            rec = self.get(upload_id)
+            if rec is None:
+                raise KeyError(upload_id)
+            if rec.size is not None and rec.offset != rec.size:
+                raise ValueError(f"Upload incomplete: {rec.offset} of {rec.size} bytes")
+            known = self._hashers.pop(upload_id, None)
+            if known is not None and known[0] == rec.offset:
+                digest = known[1].hexdigest()
+            else:
+                # Hash state lost (restart or rolled-back chunk): read the file once
+                digest = _file_sha256(self._part_path(upload_id))
+            os.replace(self._part_path(upload_id), dest)
+            self._meta_path(upload_id).unlink(missing_ok=True)
+            return digest
+        finally:
+            self._unclaim(upload_id)
+
+    def delete(self, upload_id: str) -> bool:
+        if self.get(upload_id) is None:
+            return False
+        self._hashers.pop(upload_id, None)
+        self._part_path(upload_id).unlink(missing_ok=True)
+        self._meta_path(upload_id).unlink(missing_ok=True)
+        return True
+
+    def expire(self, max_age_s: float) -> int:
+        """Delete uploads created more than `max_age_s` ago; returns how many."""
+        now = time.time()
+        removed = 0
+        for meta in self._dir.glob("upl_*.json"):
+            with self._lock:
+                if meta.stem in self._busy:
+                    continue
+            rec = self.get(meta.stem)
+            if rec is None or now - rec.created_at > max_age_s:
+                self._hashers.pop(meta.stem, None)
+                (self._dir / f"{meta.stem}.part").unlink(missing_ok=True)
+                meta.unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+    def _part_path(self, upload_id: str) -> Path:
+        return self._dir / f"{upload_id}.part"
+
+    def _meta_path(self, upload_id: str) -> Path:
+        return self._dir / f"{upload_id}.json"
+
+
+def _valid_id(upload_id: str) -> bool:
+    return upload_id.startswith("upl_") and upload_id[4:].isalnum()
+
+
+def _close_part(fh, truncate_to: int | None) -> None:
+    try:
+        if truncate_to is not None:
+            fh.truncate(truncate_to)
+    finally:
+        fh.close()
+
+
+def _file_sha256(path: Path, start: int = 0, length: int | None = None) -> str:
+    """sha256 hex digest of `length` bytes of the file from `start` (to the end when None)."""
+    h = hashlib.sha256()
+    remaining = length
+    with open(path, "rb") as fh:
+        fh.seek(start)
+        while remaining is None or remaining > 0:
+            block = fh.read(1024 * 1024 if remaining is None else min(1024 * 1024, remaining))
+            if not block:
+                break
+            h.update(block)
+            if remaining is not None:
+                remaining -= len(block)
+    return h.hexdigest()
@@ -1,19 +1,42 @@
 from __future__ import annotations
 
 import os
+import queue
+import threading
+import time
 from dataclasses import dataclass, field
+from pathlib import Path
 from typing import List, Dict, Any
 from typing import Callable, Optional
 
 import cv2
 import numpy as np
 
-# Try to import YOLO, fallback to basic detection if not available
-try:
-    from ultralytics import YOLO
-    YOLO_AVAILABLE = True
-except ImportError:
-    YOLO_AVAILABLE = False
+from . import pipeline
+from .detectors import (
+    BACKSUB_HISTORY,
+    Detector,
+    UltralyticsDetector,
+    create_detector,
+    detect_basic,
+    get_yolo_model,
+)
+from .detections import (
+    RISK_DANGER,
+    RISK_INFO,
+    RISK_LEVELS,
+    RISK_REASONS,
+    RISK_WARNING,
+    DetectionBatch,
+    lane_roi_mask,
+    risk_codes,
+)
+from .detection_store import DetectionStoreWriter
+from .gating import MotionGate, create_motion_gate
+from .metrics import StageTimings
+from .preview import PreviewSegmentWriter
+from .snapshots import SnapshotWriter
+from .tracking import create_tracker
 
 
 @dataclass
@@ -30,6 +53,33 @@ class AnalyzeConfig:
     lane_roi_bottom_y_ratio: float = 0.98
     lane_roi_top_width_ratio: float = 0.25
     lane_roi_bottom_width_ratio: float = 0.90
+    # Run detection only on the lane ROI's bounding rectangle (requires lane_roi_enabled)
+    roi_crop_enabled: bool = False
+    roi_crop_margin_ratio: float = 0.05  # Padding around the ROI rectangle, as a fraction of frame size
+    inference_batch_size: int = 1  # Frames per YOLO forward pass in offline jobs
+    pipeline_queue_size: int = 4  # Batches buffered between decode/infer/render stages
+    detector_backend: str = "auto"  # auto|yolo|onnx|openvino|basic (see detectors.py)
+    model_path: str | None = None  # Weights / exported graph; backend default when None
+    # Tracking fills the frames between detections (sampled_every_n_frames > 1)
+    tracking_enabled: bool = False
+    tracking_optical_flow: bool = False  # Refine predicted boxes with sparse LK optical flow
+    tracking_iou_threshold: float = 0.3
+    tracking_max_misses: int = 2  # Detection rounds a track survives without a match
+    # Motion gate: skip detection (reuse previous boxes) while the scene is static
+    motion_gate_enabled: bool = False
+    motion_gate_threshold: float = 0.002  # Changed-pixel fraction that counts as motion
+    motion_gate_max_skip: int = 30  # Force a detection after this many frames without one
+    # Offline jobs: split one video into frame ranges handled by separate worker processes
+    segment_workers: int = 1  # 1 = serial
+    segment_warmup_frames: int | None = None  # Frames decoded before each segment; None derives it
+    # Event snapshots are encoded off the render thread (see snapshots.py)
+    snapshot_max_width: int | None = None  # Downscale wider snapshots; None keeps the frame size
+    snapshot_jpeg_quality: int = 95
+    snapshot_min_interval_ms: int = 0  # Per track (per class when untracked); 0 = every risky frame
+    snapshot_queue_size: int = 32  # Pending snapshots before new ones are dropped
+    snapshot_workers: int = 2
+    # Also write the output as playable segments of this length while the job runs; 0 = off
+    preview_segment_seconds: float = 0.0
     # Classes considered as obstacles (COCO dataset class IDs)
     # 0: person, 1: bicycle, 2: car, 3: motorcycle, 5: bus, 7: truck, 
     # 9: traffic light, 11: stop sign, 16: dog, 17: cat
@@ -51,16 +101,9 @@ class AnalyzeConfig:
     ])
 
 
-# Global model instance (loaded once)
-_yolo_model = None
-
-
 def _get_yolo_model():
     """Load YOLO model (singleton pattern for efficiency)"""
-    global _yolo_model
-    if _yolo_model is None and YOLO_AVAILABLE:
-        _yolo_model = YOLO("yolov8n.pt")  # Nano model - fast and lightweight
-    return _yolo_model
+    return get_yolo_model()
 
 
 def _resize_keep_aspect(frame: np.ndarray, width: int) -> np.ndarray:
@@ -109,86 +152,56 @@ def _lane_roi_polygon(frame_w: int, frame_h: int, cfg: AnalyzeConfig) -> np.ndar
     return poly
 
 
-def _is_bbox_in_lane_roi(x: int, y: int, w: int, h: int, frame_w: int, frame_h: int, cfg: AnalyzeConfig) -> bool:
+def _roi_crop_rect(frame_w: int, frame_h: int, cfg: AnalyzeConfig) -> tuple[int, int, int, int] | None:
+    """Padded bounding rectangle (x0, y0, x1, y1) of the lane ROI, or None for the full frame."""
+    if not cfg.roi_crop_enabled:
+        return None
     poly = _lane_roi_polygon(frame_w, frame_h, cfg)
     if poly is None:
-        return True
+        return None
+
+    margin = max(0.0, float(cfg.roi_crop_margin_ratio))
+    pad_x = margin * frame_w
+    pad_y = margin * frame_h
+    x0 = max(0, int(np.floor(poly[:, 0].min() - pad_x)))
+    y0 = max(0, int(np.floor(poly[:, 1].min() - pad_y)))
+    x1 = min(frame_w, int(np.ceil(poly[:, 0].max() + pad_x)))
+    y1 = min(frame_h, int(np.ceil(poly[:, 1].max() + pad_y)))
+    if x1 - x0 < 2 or y1 - y0 < 2:
+        return None
+    if (x0, y0, x1, y1) == (0, 0, frame_w, frame_h):
+        return None
+    return x0, y0, x1, y1
+
 
-    px = float(x) + float(w) / 2.0
-    py = float(y) + float(h)
-    res = cv2.pointPolygonTest(poly, (px, py), False)
-    return res >= 0
+def _filter_lane_roi(dets: DetectionBatch, frame_w: int, frame_h: int, cfg: AnalyzeConfig) -> DetectionBatch:
+    """Keep detections whose bottom-center is inside the lane ROI (no-op when disabled)."""
+    poly = _lane_roi_polygon(frame_w, frame_h, cfg)
+    if poly is None or len(dets) == 0:
+        return dets
+    return dets.select(lane_roi_mask(dets, poly))
 
 
 def _detect_obstacles_yolo(frame: np.ndarray, cfg: AnalyzeConfig) -> List[Dict[str, Any]]:
     """Detect obstacles using YOLOv8"""
-    model = _get_yolo_model()
-    if model is None:
+    if _get_yolo_model() is None:
         return []
-    
-    # Run inference
-    results = model(frame, verbose=False, conf=cfg.confidence_threshold)
-    
-    detections = []
-    for result in results:
-        boxes = result.boxes
-        for box in boxes:
-            cls_id = int(box.cls[0])
-            
-            # Only include specified obstacle classes
-            if cls_id not in cfg.obstacle_classes:
-                continue
-            
-            x1, y1, x2, y2 = map(int, box.xyxy[0].tolist())
-            conf = float(box.conf[0])
-            class_name = model.names[cls_id]
-            
-            detections.append({
-                "x": x1,
-                "y": y1,
-                "w": x2 - x1,
-                "h": y2 - y1,
-                "class_id": cls_id,
-                "class_name": class_name,
-                "confidence": conf,
-                "area": (x2 - x1) * (y2 - y1)
-            })
-    
-    return detections
+    return UltralyticsDetector().detect(frame, cfg).to_dicts()
+
+
+def _detect_obstacles_yolo_batch(frames: List[np.ndarray], cfg: AnalyzeConfig) -> List[List[Dict[str, Any]]]:
+    """Detect obstacles on several frames with a single YOLOv8 forward pass.
+
+    Returns one detection list per input frame, in input order.
+    """
+    if _get_yolo_model() is None:
+        return [[] for _ in frames]
+    return [d.to_dicts() for d in UltralyticsDetector().detect_batch(frames, cfg)]
 
 
 def _detect_obstacles_basic(frame: np.ndarray, cfg: AnalyzeConfig, backsub) -> List[Dict[str, Any]]:
     """Fallback detection using background subtraction (less accurate)"""
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    gray = cv2.GaussianBlur(gray, (5, 5), 0)
-
-    fgmask = backsub.apply(gray)
-    fgmask = cv2.medianBlur(fgmask, 5)
-    _, fgmask = cv2.threshold(fgmask, 200, 255, cv2.THRESH_BINARY)
-
-    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5))
-    fgmask = cv2.morphologyEx(fgmask, cv2.MORPH_CLOSE, kernel, iterations=2)
-
-    contours, _ = cv2.findContours(fgmask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    
-    detections = []
-    for c in contours:
-        area = int(cv2.contourArea(c))
-        if area < cfg.min_contour_area:
-            continue
-        x, y, w, h = cv2.boundingRect(c)
-        detections.append({
-            "x": int(x),
-            "y": int(y),
-            "w": int(w),
-            "h": int(h),
-            "class_id": -1,
-            "class_name": "obstacle",
-            "confidence": 0.5,
-            "area": area
-        })
-    
-    return detections
+    return detect_basic(frame, cfg, backsub).to_dicts()
 
 
 # Color mapping for different obstacle types
@@ -212,17 +225,261 @@ def _get_obstacle_color(class_name: str) -> tuple:
     return OBSTACLE_COLORS.get(class_name, OBSTACLE_COLORS["default"])
 
 
-def _risk_level_for_bbox(x: int, y: int, w: int, h: int, frame_h: int, cfg: AnalyzeConfig) -> tuple[str, str | None]:
-    bottom = y + h
-    if frame_h <= 0:
-        return "info", None
+def _should_detect(frame_index: int, cfg: AnalyzeConfig) -> bool:
+    if cfg.sampled_every_n_frames > 1:
+        return frame_index % cfg.sampled_every_n_frames == 0
+    return True
+
+
+def _gate_allows(gate: MotionGate | None, frame_index: int, frame: np.ndarray) -> bool:
+    return gate is None or gate.should_run(frame_index, frame)
+
 
-    bottom_ratio = bottom / frame_h
-    if bottom_ratio >= cfg.roi_danger_y_ratio:
-        return "danger", "near_bottom"
-    if bottom_ratio >= cfg.roi_warning_y_ratio:
-        return "warning", "enter_roi"
-    return "info", None
+def _video_fourcc(path: str) -> str:
+    """MPEG-4 for results; lossless FFV1 for .mkv intermediates that get re-encoded later."""
+    return "FFV1" if path.lower().endswith(".mkv") else "mp4v"
+
+
+def _seek(cap: cv2.VideoCapture, frame_index: int) -> None:
+    """Position `cap` so the next read returns `frame_index`."""
+    if frame_index <= 0:
+        return
+    cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+    if int(cap.get(cv2.CAP_PROP_POS_FRAMES)) == frame_index:
+        return
+    # Container does not support exact seeking: rewind and skip frame by frame
+    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+    for _ in range(frame_index):
+        if not cap.grab():
+            break
+
+
+def _iter_frame_batches(
+    cap: cv2.VideoCapture,
+    cfg: AnalyzeConfig,
+    sampled_only: bool = False,
+    start_frame: int = 0,
+    end_frame: int | None = None,
+    timings: StageTimings | None = None,
+):
+    """Yield lists of (frame_index, resized_frame) of up to `cfg.inference_batch_size` frames.
+
+    `cap` must already be positioned at `start_frame`; reading stops before `end_frame`.
+    """
+    batch_size = max(1, int(cfg.inference_batch_size))
+    batch: list[tuple[int, np.ndarray]] = []
+    frame_index = start_frame - 1
+    while end_frame is None or frame_index + 1 < end_frame:
+        t0 = time.perf_counter()
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frame_index += 1
+        if sampled_only and not _should_detect(frame_index, cfg):
+            continue
+        t1 = time.perf_counter()
+        frame = _resize_keep_aspect(frame, cfg.resize_width)
+        if timings is not None:
+            timings.observe("decode", t1 - t0)
+            timings.observe("resize", time.perf_counter() - t1)
+        batch.append((frame_index, frame))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _detect_batch(frames: List[np.ndarray], cfg: AnalyzeConfig, detector: Detector) -> List[DetectionBatch]:
+    if not frames:
+        return []
+    fh, fw = frames[0].shape[:2]
+    rect = _roi_crop_rect(fw, fh, cfg)
+    if rect is None:
+        return detector.detect_batch(frames, cfg)
+
+    # Detect on the ROI crop only, then map boxes back to full-frame coordinates
+    x0, y0, x1, y1 = rect
+    crops = [f[y0:y1, x0:x1] for f in frames]
+    return [d.translate(x0, y0) for d in detector.detect_batch(crops, cfg)]
+
+
+class _AnnotatedWriter:
+    """Render + encode stage of `annotate_video`: draws boxes, emits events/snapshots, writes frames."""
+
+    def __init__(
+        self,
+        output_path: str,
+        fps: float,
+        frame_count: int | None,
+        cfg: AnalyzeConfig,
+        progress_cb: Optional[Callable[[int, int | None, str | None], None]],
+        events_out: Optional[list[dict[str, Any]]],
+        snapshots_dir: str | None,
+        first_frame: int = 0,
+        detections_out: DetectionStoreWriter | None = None,
+        preview_dir: str | None = None,
+        timings: StageTimings | None = None,
+    ) -> None:
+        self.output_path = output_path
+        self.fps = fps
+        self.frame_count = frame_count
+        self.cfg = cfg
+        self.progress_cb = progress_cb
+        self.events_out = events_out
+        self.snapshots_dir = snapshots_dir
+        self.detections_out = detections_out
+        self.first_frame = first_frame  # Earlier frames only warm up the tracker
+        self.timings = timings or StageTimings("annotate")
+        self.writer: cv2.VideoWriter | None = None
+        self.frame_index = -1
+        self.last_detections = DetectionBatch.empty()
+        self.last_snapshot_frame = -1
+        self.last_snapshot_ms: dict[Any, int] = {}  # Track ID / class name -> timestamp
+        self.snapshots = (
+            SnapshotWriter(
+                snapshots_dir,
+                max_width=cfg.snapshot_max_width,
+                jpeg_quality=cfg.snapshot_jpeg_quality,
+                queue_size=cfg.snapshot_queue_size,
+                workers=cfg.snapshot_workers,
+                timings=self.timings,
+            )
+            if snapshots_dir is not None and events_out is not None
+            else None
+        )
+        self.preview = (
+            PreviewSegmentWriter(Path(preview_dir), fps, cfg.preview_segment_seconds)
+            if preview_dir is not None and cfg.preview_segment_seconds > 0
+            else None
+        )
+        self.tracker = create_tracker(cfg)
+
+    def consume(self, batch: list[tuple[int, np.ndarray]], batch_detections: dict[int, DetectionBatch]) -> None:
+        cfg = self.cfg
+        fps = self.fps
+        timings = self.timings
+        for i, (frame_index, frame) in enumerate(batch):
+            t0 = time.perf_counter()
+            if i in batch_detections:
+                self.last_detections = batch_detections[i]
+                if self.tracker is not None:
+                    self.last_detections = self.tracker.update(self.last_detections, frame_index, frame)
+            elif self.tracker is not None:
+                self.last_detections = self.tracker.predict(frame_index, frame)
+            if self.tracker is not None:
+                timings.observe("tracking", time.perf_counter() - t0)
+
+            if frame_index < self.first_frame:
+                continue
+            self.frame_index = frame_index
+            if self.progress_cb is not None:
+                self.progress_cb(frame_index + 1, self.frame_count, "Processing")
+
+            if self.writer is None:
+                h, w = frame.shape[:2]
+                fourcc = cv2.VideoWriter_fourcc(*_video_fourcc(self.output_path))
+                self.writer = cv2.VideoWriter(self.output_path, fourcc, float(fps), (w, h))
+                if not self.writer.isOpened():
+                    raise RuntimeError("Cannot open video writer")
+
+            # Draw detections + emit events
+            t0 = time.perf_counter()
+            fh = frame.shape[0]
+            fw = frame.shape[1]
+
+            if cfg.lane_roi_enabled:
+                self.last_detections = _filter_lane_roi(self.last_detections, fw, fh, cfg)
+
+            dets = self.last_detections
+            risks = risk_codes(dets, fh, cfg)
+            if self.detections_out is not None:
+                ts_ms = int((frame_index / fps) * 1000) if fps and fps > 0 else 0
+                self.detections_out.add(frame_index, ts_ms, dets, risks)
+            names = dets.class_names()
+            boxes = dets.boxes.tolist()
+            for j in range(len(boxes)):
+                x, y, w, h = boxes[j]
+                class_name = names[j]
+                risk = int(risks[j])
+
+                border_color = _get_obstacle_color(class_name)
+                if risk == RISK_WARNING:
+                    border_color = (0, 255, 255)
+                elif risk == RISK_DANGER:
+                    border_color = (0, 0, 255)
+
+                cv2.rectangle(frame, (x, y), (x + w, y + h), border_color, 2)
+
+                if self.events_out is not None and risk != RISK_INFO:
+                    ts_ms = int((frame_index / fps) * 1000) if fps and fps > 0 else 0
+                    track_id = int(dets.track_id[j]) if dets.track_id is not None else None
+                    snapshot_name = None
+                    if self.snapshots is not None and frame_index != self.last_snapshot_frame:
+                        snapshot_name = self._snapshot(frame, frame_index, ts_ms, class_name if track_id is None else track_id)
+
+                    event = {
+                        "timestamp_ms": ts_ms,
+                        "frame_index": frame_index,
+                        "class_name": class_name,
+                        "confidence": float(dets.confidence[j]),
+                        "bbox": {"x": x, "y": y, "w": w, "h": h},
+                        "risk_level": RISK_LEVELS[risk],
+                        "reason": RISK_REASONS[risk],
+                        "snapshot": snapshot_name,
+                    }
+                    if track_id is not None:
+                        event["track_id"] = track_id
+                    self.events_out.append(event)
+
+            t1 = time.perf_counter()
+            self.writer.write(frame)
+            t2 = time.perf_counter()
+            timings.observe("draw", t1 - t0)
+            timings.observe("encode", t2 - t1)
+            if self.preview is not None:
+                self.preview.write(frame, frame_index)
+                timings.observe("preview_encode", time.perf_counter() - t2)
+            timings.count("frames")
+            timings.count("detections", len(dets))
+
+    def _snapshot(self, frame: np.ndarray, frame_index: int, ts_ms: int, key: Any) -> str | None:
+        """Queue a snapshot of `frame` unless `key` had one within the minimum interval."""
+        interval = int(self.cfg.snapshot_min_interval_ms)
+        last = self.last_snapshot_ms.get(key)
+        if interval > 0 and last is not None and ts_ms - last < interval:
+            return None
+        name = f"{frame_index:06d}.jpg"
+        if not self.snapshots.submit(name, frame):
+            return None
+        self.last_snapshot_frame = frame_index
+        self.last_snapshot_ms[key] = ts_ms
+        return name
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.release()
+        if self.snapshots is not None:
+            self.snapshots.close()
+        if self.preview is not None:
+            self.preview.close()
+
+
+def _warmup_frames(detector: Detector, gate: MotionGate | None, cfg: AnalyzeConfig) -> int:
+    """Frames to replay before a segment so its stateful models match a run from frame 0.
+
+    Background models see only sampled frames, so their history is scaled by
+    `sampled_every_n_frames`; the tracker needs a few detection rounds.
+    """
+    step = max(1, int(cfg.sampled_every_n_frames))
+    frames = 0
+    if detector.stateful:
+        frames = max(frames, BACKSUB_HISTORY * step)
+    if gate is not None:
+        frames = max(frames, gate.history * step)
+    if cfg.tracking_enabled:
+        frames = max(frames, (int(cfg.tracking_max_misses) + 2) * step)
+    return frames
 
 
 def annotate_video(
@@ -232,8 +489,26 @@ def annotate_video(
     progress_cb: Optional[Callable[[int, int | None, str | None], None]] = None,
     events_out: Optional[list[dict[str, Any]]] = None,
     snapshots_dir: str | None = None,
+    detections_out: DetectionStoreWriter | None = None,
+    preview_dir: str | None = None,
+    start_frame: int = 0,
+    end_frame: int | None = None,
+    warmup_frames: int | None = 0,
 ) -> dict[str, Any]:
-    """Process video, annotate detections, and optionally emit events + snapshots."""
+    """Process video, annotate detections, and optionally emit events + snapshots.
+
+    Runs as a three-stage pipeline: a decode thread, inference on the calling
+    thread and a render+encode thread, linked by bounded FIFO queues.
+    `detections_out` receives every drawn detection, not just the events.
+    With `preview_dir` and `cfg.preview_segment_seconds` set, the output is
+    also written there as short segments playable while the job runs.
+
+    `start_frame`/`end_frame` restrict the output to one frame range (frame
+    indices and timestamps stay global). Up to `warmup_frames` frames before
+    the range are decoded, but not written, to prime the basic detector's
+    background model, the tracker and the motion gate (None: enough for the
+    stateful parts in use, see `_warmup_frames`).
+    """
     if not os.path.exists(input_path):
         raise FileNotFoundError(input_path)
 
@@ -247,117 +522,96 @@ def annotate_video(
 
     frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0) or None
 
-    # For fallback mode
-    backsub = cv2.createBackgroundSubtractorMOG2(history=500, varThreshold=16, detectShadows=True)
-    
-    use_yolo = YOLO_AVAILABLE and _get_yolo_model() is not None
-    
-    writer: cv2.VideoWriter | None = None
-    frame_index = -1
-    last_detections: List[Dict[str, Any]] = []
-    wrote_snapshot_frames: set[int] = set()
+    detector = create_detector(cfg)
+    gate = create_motion_gate(cfg)
+    timings = StageTimings("annotate")
+
+    start_frame = max(0, int(start_frame))
+    if warmup_frames is None:
+        warmup_frames = _warmup_frames(detector, gate, cfg)
+    elif not (detector.stateful or gate is not None or cfg.tracking_enabled):
+        warmup_frames = 0
+    decode_from = max(0, start_frame - int(warmup_frames)) if start_frame > 0 else 0
+    _seek(cap, decode_from)
+
+    sink = _AnnotatedWriter(
+        output_path,
+        fps,
+        frame_count,
+        cfg,
+        progress_cb,
+        events_out,
+        snapshots_dir,
+        first_frame=start_frame,
+        detections_out=detections_out,
+        preview_dir=preview_dir,
+        timings=timings,
+    )
+
+    qsize = max(1, int(cfg.pipeline_queue_size))
+    decode_q: queue.Queue = queue.Queue(maxsize=qsize)
+    render_q: queue.Queue = queue.Queue(maxsize=qsize)
+    stop = threading.Event()
+
+    def render() -> None:
+        for batch, batch_detections in pipeline.drain(render_q, stop):
+            sink.consume(batch, batch_detections)
+
+    stages = [
+        pipeline.StageThread(
+            "annotate_decode",
+            lambda: pipeline.feed(_iter_frame_batches(cap, cfg, False, decode_from, end_frame, timings), decode_q, stop),
+            stop,
+        ),
+        pipeline.StageThread("annotate_render", render, stop),
+    ]
+    for t in stages:
+        t.start()
 
     try:
-        while True:
-            ok, frame = cap.read()
-            if not ok:
+        for batch in pipeline.drain(decode_q, stop):
+            t0 = time.perf_counter()
+            detect_at = [
+                i for i, (fi, f) in enumerate(batch) if _should_detect(fi, cfg) and _gate_allows(gate, fi, f)
+            ]
+            t1 = time.perf_counter()
+            batch_detections = dict(
+                zip(detect_at, _detect_batch([batch[i][1] for i in detect_at], cfg, detector))
+            )
+            if gate is not None:
+                timings.observe("motion_gate", t1 - t0)
+            if detect_at:
+                timings.observe("inference", time.perf_counter() - t1)
+            if not pipeline.put(render_q, (batch, batch_detections), stop):
                 break
-            frame_index += 1
-
-            if progress_cb is not None:
-                progress_cb(frame_index + 1, frame_count, "Processing")
-
-            frame = _resize_keep_aspect(frame, cfg.resize_width)
-
-            if writer is None:
-                h, w = frame.shape[:2]
-                fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-                writer = cv2.VideoWriter(output_path, fourcc, float(fps), (w, h))
-                if not writer.isOpened():
-                    raise RuntimeError("Cannot open video writer")
-
-            # Run detection based on sampling rate
-            run_detection = True
-            if cfg.sampled_every_n_frames > 1:
-                run_detection = frame_index % cfg.sampled_every_n_frames == 0
-
-            if run_detection:
-                if use_yolo:
-                    last_detections = _detect_obstacles_yolo(frame, cfg)
-                else:
-                    last_detections = _detect_obstacles_basic(frame, cfg, backsub)
-
-            # Draw detections + emit events
-            fh = frame.shape[0]
-            fw = frame.shape[1]
-
-            if cfg.lane_roi_enabled:
-                last_detections = [
-                    d
-                    for d in last_detections
-                    if _is_bbox_in_lane_roi(
-                        int(d["x"]),
-                        int(d["y"]),
-                        int(d["w"]),
-                        int(d["h"]),
-                        int(fw),
-                        int(fh),
-                        cfg,
-                    )
-                ]
-
-            for det in last_detections:
-                x, y, w, h = det["x"], det["y"], det["w"], det["h"]
-                class_name = det["class_name"]
-                conf = det["confidence"]
-
-                risk_level, reason = _risk_level_for_bbox(x, y, w, h, fh, cfg)
-
-                base_color = _get_obstacle_color(class_name)
-                border_color = base_color
-                if risk_level == "warning":
-                    border_color = (0, 255, 255)
-                elif risk_level == "danger":
-                    border_color = (0, 0, 255)
-
-                cv2.rectangle(frame, (x, y), (x + w, y + h), border_color, 2)
-
-                if events_out is not None and risk_level in {"warning", "danger"}:
-                    ts_ms = int((frame_index / fps) * 1000) if fps and fps > 0 else 0
-                    snapshot_name = None
-                    if snapshots_dir is not None and frame_index not in wrote_snapshot_frames:
-                        snapshot_name = f"{frame_index:06d}.jpg"
-                        snapshot_path = os.path.join(snapshots_dir, snapshot_name)
-                        cv2.imwrite(snapshot_path, frame)
-                        wrote_snapshot_frames.add(frame_index)
-
-                    events_out.append(
-                        {
-                            "timestamp_ms": ts_ms,
-                            "frame_index": frame_index,
-                            "class_name": class_name,
-                            "confidence": conf,
-                            "bbox": {"x": x, "y": y, "w": w, "h": h},
-                            "risk_level": risk_level,
-                            "reason": reason,
-                            "snapshot": snapshot_name,
-                        }
-                    )
-
-            writer.write(frame)
+        pipeline.put(render_q, pipeline.END, stop)
+    except BaseException:
+        stop.set()
+        raise
     finally:
+        for t in stages:
+            t.join()
         cap.release()
-        if writer is not None:
-            writer.release()
+        sink.close()
+
+    pipeline.join_stages(stages)
 
     if progress_cb is not None:
-        progress_cb(frame_count or (frame_index + 1), frame_count, "Done")
+        progress_cb(frame_count or (sink.frame_index + 1), frame_count, "Done")
 
-    return {
+    stats = {
         "fps": float(fps) if fps and fps > 0 else None,
         "frame_count": frame_count,
-        "detection_mode": "yolo" if use_yolo else "basic",
+        "detection_mode": detector.name,
     }
+    if gate is not None:
+        stats["motion_gate"] = gate.stats.to_dict()
+    if sink.tracker is not None:
+        stats["track_count"] = sink.tracker.track_count
+    if sink.snapshots is not None:
+        stats["snapshots"] = sink.snapshots.stats.to_dict()
+    stats["timings"] = timings.to_dict()
+    return stats
 
 
 def analyze_video(video_path: str, cfg: AnalyzeConfig) -> dict:
@@ -372,61 +626,92 @@ def analyze_video(video_path: str, cfg: AnalyzeConfig) -> dict:
     fps = cap.get(cv2.CAP_PROP_FPS)
     frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0) or None
 
-    backsub = cv2.createBackgroundSubtractorMOG2(history=500, varThreshold=16, detectShadows=True)
-    use_yolo = YOLO_AVAILABLE and _get_yolo_model() is not None
+    detector = create_detector(cfg)
+    timings = StageTimings("analyze")
 
     frames_out: list[dict] = []
-    frame_index = -1
-
-    while True:
-        ok, frame = cap.read()
-        if not ok:
-            break
-        frame_index += 1
-
-        if cfg.sampled_every_n_frames > 1 and (frame_index % cfg.sampled_every_n_frames != 0):
-            continue
-
-        frame = _resize_keep_aspect(frame, cfg.resize_width)
-        
-        if use_yolo:
-            detections = _detect_obstacles_yolo(frame, cfg)
-        else:
-            detections = _detect_obstacles_basic(frame, cfg, backsub)
-
-        if cfg.lane_roi_enabled:
-            fh = int(frame.shape[0])
-            fw = int(frame.shape[1])
-            detections = [
-                d
-                for d in detections
-                if _is_bbox_in_lane_roi(
-                    int(d["x"]),
-                    int(d["y"]),
-                    int(d["w"]),
-                    int(d["h"]),
-                    int(fw),
-                    int(fh),
-                    cfg,
-                )
-            ]
 
-        timestamp_ms = 0
-        if fps and fps > 0:
-            timestamp_ms = int((frame_index / fps) * 1000)
+    # Decode on a separate thread so it overlaps with inference
+    decode_q: queue.Queue = queue.Queue(maxsize=max(1, int(cfg.pipeline_queue_size)))
+    stop = threading.Event()
+    decoder = pipeline.StageThread(
+        "analyze_decode",
+        lambda: pipeline.feed(_iter_frame_batches(cap, cfg, sampled_only=True, timings=timings), decode_q, stop),
+        stop,
+    )
+    decoder.start()
 
-        frames_out.append({
-            "frame_index": frame_index,
-            "timestamp_ms": timestamp_ms,
-            "boxes": detections,
-        })
+    try:
+        gate_stats = _analyze_batches(pipeline.drain(decode_q, stop), cfg, detector, fps, frames_out, timings)
+    except BaseException:
+        stop.set()
+        raise
+    finally:
+        decoder.join()
+        cap.release()
 
-    cap.release()
+    pipeline.join_stages([decoder])
 
-    return {
+    result = {
         "fps": float(fps) if fps and fps > 0 else None,
         "frame_count": frame_count,
         "sampled_every_n_frames": cfg.sampled_every_n_frames,
-        "detection_mode": "yolo" if use_yolo else "basic",
+        "detection_mode": detector.name,
         "frames": frames_out,
     }
+    if gate_stats is not None:
+        result["motion_gate"] = gate_stats
+    result["timings"] = timings.to_dict()
+    return result
+
+
+def _analyze_batches(
+    batches,
+    cfg: AnalyzeConfig,
+    detector: Detector,
+    fps: float,
+    frames_out: list[dict],
+    timings: StageTimings | None = None,
+) -> dict[str, Any] | None:
+    """Detect on sampled frames and append their results; returns motion-gate stats if gated."""
+    # Only sampled frames are decoded here, so the tracker just assigns track IDs
+    tracker = create_tracker(cfg)
+    gate = create_motion_gate(cfg)
+    timings = timings or StageTimings("analyze")
+    last_detections = DetectionBatch.empty()
+    for batch in batches:
+        t0 = time.perf_counter()
+        run_at = [i for i, (fi, f) in enumerate(batch) if _gate_allows(gate, fi, f)]
+        t1 = time.perf_counter()
+        batch_detections = dict(zip(run_at, _detect_batch([batch[i][1] for i in run_at], cfg, detector)))
+        if gate is not None:
+            timings.observe("motion_gate", t1 - t0)
+        if run_at:
+            timings.observe("inference", time.perf_counter() - t1)
+
+        for i, (frame_index, frame) in enumerate(batch):
+            if i not in batch_detections:
+                # Gated out as static: reuse the previous frame's detections
+                detections = last_detections
+            else:
+                detections = batch_detections[i]
+                if tracker is not None:
+                    with timings.time("tracking"):
+                        detections = tracker.update(detections, frame_index, frame)
+            if cfg.lane_roi_enabled:
+                detections = _filter_lane_roi(detections, int(frame.shape[1]), int(frame.shape[0]), cfg)
+
+            timestamp_ms = 0
+            if fps and fps > 0:
+                timestamp_ms = int((frame_index / fps) * 1000)
+
+            last_detections = detections
+            timings.count("frames")
+            timings.count("detections", len(detections))
+            frames_out.append({
+                "frame_index": frame_index,
+                "timestamp_ms": timestamp_ms,
+                "boxes": detections.to_dicts(),
+            })
+
+    return gate.stats.to_dict() if gate is not None else None
@@ -0,0 +1,4 @@
+"""Offline benchmarks of the vision pipeline on deterministic synthetic videos.
+
+Run `python -m backend.bench --help` from the repository root.
+"""
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+from ..app.vision import AnalyzeConfig
+from .compare import compare_reports, format_rows
+from .runner import BENCHES, SUITES, plan_cases, run_suite
+
+
+def _add_tolerances(p: argparse.ArgumentParser) -> None:
+    p.add_argument("--fps-tolerance", type=float, default=0.10, help="Allowed fps drop (fraction, default 0.10)")
+    p.add_argument("--latency-tolerance", type=float, default=0.15, help="Allowed p95 latency rise (default 0.15)")
+    p.add_argument("--rss-tolerance", type=float, default=0.20, help="Allowed peak RSS rise (default 0.20)")
+
+
+def _compare(baseline: dict, current: dict, args: argparse.Namespace) -> int:
+    rows = compare_reports(baseline, current, args.fps_tolerance, args.latency_tolerance, args.rss_tolerance)
+    print(format_rows(rows))
+    regressions = [r for r in rows if r["regression"]]
+    print(f"\n{len(regressions)} regression(s) in {len(rows)} comparisons")
+    return 1 if regressions else 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m backend.bench", description="Benchmark the vision pipeline on synthetic videos.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="Run the benchmark suite and write a JSON report")
+    run.add_argument("--suite", choices=sorted(SUITES), default="quick")
+    run.add_argument("--only", default=",".join(BENCHES), help=f"Comma-separated subset of {','.join(BENCHES)}")
+    run.add_argument("--backend", default="basic", help="Detector backend for the analyze/annotate benches")
+    run.add_argument("--model-path", default=None, help="Model for the onnx/openvino/yolo backends")
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--repeat", type=int, default=1, help="Runs per case; the fastest is reported")
+    run.add_argument("--no-isolate", action="store_true", help="Run cases in this process (peak RSS is then cumulative)")
+    run.add_argument("--work-dir", default=None, help="Where synthetic videos are cached (default: temp dir)")
+    run.add_argument("--output", "-o", default=None, help="Report path (default: stdout)")
+    run.add_argument("--baseline", default=None, help="Also compare against this report; exit 1 on regressions")
+    _add_tolerances(run)
+
+    cmp = sub.add_parser("compare", help="Compare two reports; exit 1 on regressions")
+    cmp.add_argument("baseline")
+    cmp.add_argument("current")
+    _add_tolerances(cmp)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        current = json.loads(Path(args.current).read_text(encoding="utf-8"))
+        return _compare(baseline, current, args)
+
+    benches = tuple(b.strip() for b in args.only.split(",") if b.strip())
+    unknown = set(benches) - set(BENCHES)
+    if unknown:
+        parser.error(f"unknown bench(es): {', '.join(sorted(unknown))}")
+    cfg = AnalyzeConfig(detector_backend=args.backend, model_path=args.model_path)
+    work_dir = Path(args.work_dir) if args.work_dir else Path(tempfile.gettempdir()) / "obstacle_bench"
+
+    cases = plan_cases(args.suite, benches, args.backend, seed=args.seed)
+    report = run_suite(
+        cases,
+        work_dir,
+        cfg,
+        repeat=args.repeat,
+        isolate=not args.no_isolate,
+        log=lambda line: print(line, file=sys.stderr),
+    )
+    report["suite"] = args.suite
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+    else:
+        print(text)
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        return _compare(baseline, report, args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
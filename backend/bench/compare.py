@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+from typing import Any
+
+
+def _lower_is_better(name: str) -> bool:
+    return name != "fps"
+
+
+def compare_reports(
+    baseline: dict[str, Any],
+    current: dict[str, Any],
+    fps_tolerance: float = 0.10,
+    latency_tolerance: float = 0.15,
+    rss_tolerance: float = 0.20,
+) -> list[dict[str, Any]]:
+    """One row per metric of every case present in both reports.
+
+    A row is a regression when the metric got worse by more than its
+    tolerance (a fraction of the baseline value): lower fps, or higher p95
+    latency / peak RSS. Skipped cases are ignored.
+    """
+    base_cases = {c["name"]: c for c in baseline.get("cases", []) if "skipped" not in c}
+    rows = []
+    for case in current.get("cases", []):
+        base = base_cases.get(case["name"])
+        if base is None or "skipped" in case:
+            continue
+        metrics = {
+            "fps": (base.get("fps"), case.get("fps"), fps_tolerance),
+            "p95_ms": ((base.get("latency_ms") or {}).get("p95"), (case.get("latency_ms") or {}).get("p95"), latency_tolerance),
+            "peak_rss_mb": (base.get("peak_rss_mb"), case.get("peak_rss_mb"), rss_tolerance),
+        }
+        for metric, (old, new, tolerance) in metrics.items():
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = change > tolerance if _lower_is_better(metric) else change < -tolerance
+            rows.append(
+                {
+                    "case": case["name"],
+                    "metric": metric,
+                    "baseline": old,
+                    "current": new,
+                    "change": round(change, 4),
+                    "regression": worse,
+                }
+            )
+    return rows
+
+
+def format_rows(rows: list[dict[str, Any]]) -> str:
+    lines = [f"{'case':<40} {'metric':<12} {'baseline':>10} {'current':>10} {'change':>8}"]
+    for r in rows:
+        flag = "  REGRESSION" if r["regression"] else ""
+        lines.append(
+            f"{r['case']:<40} {r['metric']:<12} {r['baseline']:>10.4g} {r['current']:>10.4g} {r['change'] * 100:>+7.1f}%{flag}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+
+import cv2
+import numpy as np
+
+
+@dataclass(frozen=True)
+class VideoSpec:
+    width: int
+    height: int
+    frames: int
+    objects: int  # Moving rectangles per frame
+    fps: float = 25.0
+    seed: int = 0
+
+    @property
+    def name(self) -> str:
+        return f"{self.width}x{self.height}_f{self.frames}_o{self.objects}"
+
+
+def _background(spec: VideoSpec, rng: np.random.RandomState) -> np.ndarray:
+    """Static road-like backdrop: vertical gradient plus fixed texture, so background models settle."""
+    ramp = np.linspace(60, 160, spec.height, dtype=np.float32)[:, None, None]
+    bg = np.repeat(np.repeat(ramp, spec.width, axis=1), 3, axis=2)
+    bg += rng.normal(0.0, 6.0, size=bg.shape).astype(np.float32)
+    return np.clip(bg, 0, 255).astype(np.uint8)
+
+
+def render_frames(spec: VideoSpec) -> Iterator[np.ndarray]:
+    """Yield the frames of `spec`; the same spec always gives the same pixels."""
+    rng = np.random.RandomState(spec.seed)
+    bg = _background(spec, rng)
+    short = min(spec.width, spec.height)
+    sizes = rng.randint(max(4, short // 12), max(5, short // 5), size=(spec.objects, 2))
+    pos = rng.rand(spec.objects, 2) * (np.array([spec.width, spec.height]) - sizes)
+    vel = (rng.rand(spec.objects, 2) - 0.5) * short / 25.0
+    colors = rng.randint(0, 256, size=(spec.objects, 3))
+
+    for _ in range(spec.frames):
+        frame = bg.copy()
+        for (x, y), (w, h), c in zip(pos.astype(int), sizes, colors):
+            cv2.rectangle(frame, (int(x), int(y)), (int(x + w), int(y + h)), tuple(int(v) for v in c), -1)
+        yield frame
+        pos += vel
+        # Bounce off the frame edges
+        limit = np.array([spec.width, spec.height]) - sizes
+        over = (pos < 0) | (pos > limit)
+        vel[over] *= -1
+        pos = np.clip(pos, 0, limit)
+
+
+def write_video(spec: VideoSpec, directory: Path) -> Path:
+    """Encode `spec` to `<directory>/<name>_s<seed>.mp4`, reusing the file when it already exists."""
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{spec.name}_s{spec.seed}.mp4"
+    if path.exists():
+        return path
+    tmp = path.with_suffix(".tmp.mp4")
+    writer = cv2.VideoWriter(str(tmp), cv2.VideoWriter_fourcc(*"mp4v"), spec.fps, (spec.width, spec.height))
+    if not writer.isOpened():
+        raise RuntimeError("Cannot open video writer")
+    try:
+        for frame in render_frames(spec):
+            writer.write(frame)
+    finally:
+        writer.release()
+    tmp.replace(path)
+    return path
@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# Tests import the app as `backend.app`, like uvicorn does when run from the repository root
+_ROOT = Path(__file__).resolve().parents[2]
+if str(_ROOT) not in sys.path:
+    sys.path.insert(0, str(_ROOT))
@@ -0,0 +1,73 @@
+import numpy as np
+
+from backend.app.detection_store import DetectionStore, DetectionStoreWriter
+from backend.app.detections import DetectionBatch
+
+_NAMES = {0: "person", 2: "car"}
+
+
+def _batch(class_ids, track_ids=None):
+    n = len(class_ids)
+    boxes = np.array([[10 * i, 20, 30, 40] for i in range(n)], dtype=np.int32).reshape(-1, 4)
+    return DetectionBatch(
+        boxes=boxes,
+        confidence=np.full(n, 0.5, dtype=np.float32),
+        class_id=np.asarray(class_ids, dtype=np.int32),
+        area=np.full(n, 1200, dtype=np.int64),
+        names=_NAMES,
+        track_id=None if track_ids is None else np.asarray(track_ids, dtype=np.int64),
+    )
+
+
+def _store(tmp_path, frames=10):
+    # Frame f has f % 3 detections: person, car, person
+    with DetectionStoreWriter(tmp_path / "det") as w:
+        for f in range(frames):
+            n = f % 3
+            w.add(f, f * 40, _batch([0, 2][:n], [f, 100 + f][:n]), np.zeros(n, dtype=np.int8))
+    return DetectionStore(tmp_path / "det")
+
+
+def test_frame_and_time_ranges(tmp_path):
+    store = _store(tmp_path)
+
+    by_frame = store.query(from_frame=3, to_frame=8)
+    by_ms = store.query(from_ms=3 * 40, to_ms=8 * 40)
+
+    assert len(store) == 9
+    assert by_frame["frame"].tolist() == [4, 5, 5, 7]
+    assert by_ms["frame"].tolist() == by_frame["frame"].tolist()
+    assert store.names == _NAMES
+
+
+def test_class_track_and_limit_filters(tmp_path):
+    store = _store(tmp_path)
+
+    cars = store.query(class_ids=[2])
+    track = store.query(track_id=105)
+    first = store.query(class_ids=[0], limit=2)
+
+    assert cars["frame"].tolist() == [2, 5, 8]
+    assert track["frame"].tolist() == [5] and track["class_id"].tolist() == [2]
+    assert first["frame"].tolist() == [1, 2]
+
+
+def test_extend_store_shifts_track_ids(tmp_path):
+    with DetectionStoreWriter(tmp_path / "seg") as w:
+        w.add(0, 0, _batch([0, 2], [1, 2]), np.zeros(2, dtype=np.int8))
+        w.add(1, 40, _batch([0]), np.zeros(1, dtype=np.int8))
+    with DetectionStoreWriter(tmp_path / "merged") as w:
+        w.extend_store(DetectionStore(tmp_path / "seg"), track_offset=10)
+
+    merged = DetectionStore(tmp_path / "merged")
+
+    # Untracked rows keep -1
+    assert merged.column("track_id").tolist() == [11, 12, -1]
+
+
+def test_empty_store(tmp_path):
+    DetectionStoreWriter(tmp_path / "det").close()
+
+    store = DetectionStore(tmp_path / "det")
+
+    assert len(store) == 0 and len(store.query(from_frame=5)["frame"]) == 0
@@ -0,0 +1,53 @@
+from backend.app.event_log import INDEX_STRIDE, EventLogWriter, query_event_log
+
+
+def _write(tmp_path, n):
+    log, index = tmp_path / "events.ndjson", tmp_path / "events.index.json"
+    events = [
+        {"frame_index": i, "timestamp_ms": i * 40, "risk_level": "danger" if i % 3 == 0 else "warning"}
+        for i in range(n)
+    ]
+    with EventLogWriter(log, index) as w:
+        w.extend(events)
+    return log, index, events
+
+
+def _pages(log, index, **kw):
+    pages, cursor = [], None
+    while True:
+        page = query_event_log(log, index, cursor=cursor, **kw)
+        pages.append(page["events"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+def test_cursor_pages_cover_the_range_once(tmp_path):
+    n = 3 * INDEX_STRIDE + 10
+    log, index, events = _write(tmp_path, n)
+    # Starts after the first index entry, so the index seek is exercised too
+    lo, hi = (INDEX_STRIDE + 5) * 40, (2 * INDEX_STRIDE + 100) * 40
+
+    pages = _pages(log, index, from_ms=lo, to_ms=hi, limit=100)
+
+    assert all(len(p) == 100 for p in pages[:-1]) and 0 < len(pages[-1]) <= 100
+    assert [e for p in pages for e in p] == [e for e in events if lo <= e["timestamp_ms"] < hi]
+
+
+def test_risk_filter_and_totals(tmp_path):
+    log, index, events = _write(tmp_path, 700)
+
+    pages = _pages(log, index, risk_levels={"danger"}, limit=50)
+    first = query_event_log(log, index, limit=1)
+
+    assert [e for p in pages for e in p] == [e for e in events if e["risk_level"] == "danger"]
+    assert first["total"] == 700
+    assert first["counts"]["danger"] == 234 and first["counts"]["warning"] == 466
+
+
+def test_exact_last_page_has_no_cursor(tmp_path):
+    log, index, _ = _write(tmp_path, 200)
+
+    page = query_event_log(log, index, limit=200)
+
+    assert len(page["events"]) == 200 and page["next_cursor"] is None
@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+from backend.app.realtime import RealtimeState
+from backend.app.realtime_codec import DETECTION, HEADER, decode_binary, encode_binary, encode_schema
+
+
+def _det(class_id, x, track_id=None, risk_level="warning", confidence=0.8):
+    d = {
+        "class_name": "obstacle" if class_id == -1 else "person",
+        "class_id": class_id,
+        "confidence": confidence,
+        "bbox": {"x": x, "y": 20, "w": 30, "h": 40},
+        "risk_level": risk_level,
+        "reason": "near_bottom",
+    }
+    if track_id is not None:
+        d["track_id"] = track_id
+    return d
+
+
+def _state(frame_id, detections, **kw):
+    return RealtimeState(
+        frame_id=frame_id, frame_width=640, frame_height=360, detections=detections, detection_mode="basic", **kw
+    )
+
+
+def _key(d):
+    return (d["track_id"] if d["track_id"] is not None else -1, d["bbox"]["x"])
+
+
+def test_basic_detector_class_round_trips():
+    st = _state(7, [_det(-1, 10), _det(-1, 50, risk_level="danger")], fps=12.5, gate_decision="motion")
+    schema = json.loads(encode_schema("basic", {-1: "obstacle"}))
+
+    out = decode_binary(encode_binary(st))
+
+    assert [d["class_id"] for d in out["detections"]] == [-1, -1]
+    assert all(schema["class_names"][str(d["class_id"])] == "obstacle" for d in out["detections"])
+    assert [schema["risk_levels"][d["risk"]] for d in out["detections"]] == ["warning", "danger"]
+    assert out["frame_id"] == 7 and out["fps"] == 12.5 and out["latency_ms"] is None
+    assert out["gate_decision"] == "motion"
+    assert not out["delta"]
+
+
+def test_tracked_delta_matches_keyframe():
+    prev = _state(1, [_det(0, 10, track_id=1), _det(0, 50, track_id=2), _det(-1, 90)])
+    # Track 1 unchanged, 2 gone, 3 new, plus a fresh untracked box
+    cur = _state(2, [_det(0, 10, track_id=1), _det(2, 70, track_id=3), _det(-1, 95)])
+
+    before = decode_binary(encode_binary(prev))["detections"]
+    delta = encode_binary(cur, prev)
+    out = decode_binary(delta, before)
+    keyframe = decode_binary(encode_binary(cur))
+
+    assert out["delta"]
+    assert sorted(out["detections"], key=_key) == sorted(keyframe["detections"], key=_key)
+    # The unchanged track is implied, not resent; the removed one is listed
+    _, _, _, _, _, _, _, _, _, count, removed = HEADER.unpack_from(delta, 0)
+    assert (count, removed) == (2, 1)
+    assert len(delta) == HEADER.size + 4 + 2 * DETECTION.size
+
+
+def test_delta_requires_previous_frame():
+    prev = _state(1, [_det(0, 10, track_id=1)])
+    cur = _state(2, [_det(0, 12, track_id=1)])
+    with pytest.raises(ValueError):
+        decode_binary(encode_binary(cur, prev))
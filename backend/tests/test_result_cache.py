@@ -0,0 +1,45 @@
+from backend.app.result_cache import ResultCache
+
+
+def test_claim_counts_references(tmp_path):
+    cache = ResultCache(tmp_path / "cache.sqlite3")
+    assert cache.claim("k") is None
+
+    # The job that produced the result holds the first reference
+    cache.acquire("res_1")
+    cache.insert("k", "res_1")
+
+    assert cache.claim("k") == "res_1"
+    assert cache.refcount("res_1") == 2
+    assert cache.release("res_1") is False
+    assert cache.claim("k") == "res_1"
+    assert cache.refcount("res_1") == 2
+
+
+def test_last_release_drops_the_entry(tmp_path):
+    cache = ResultCache(tmp_path / "cache.sqlite3")
+    cache.acquire("res_1")
+    cache.insert("k", "res_1")
+    cache.insert("k2", "res_1")
+
+    assert cache.release("res_1") is True
+    assert cache.refcount("res_1") == 0
+    assert cache.claim("k") is None and cache.claim("k2") is None
+
+
+def test_result_without_row_is_singly_referenced(tmp_path):
+    cache = ResultCache(tmp_path / "cache.sqlite3")
+
+    assert cache.release("res_legacy") is True
+
+
+def test_references_survive_reopening(tmp_path):
+    cache = ResultCache(tmp_path / "cache.sqlite3")
+    cache.acquire("res_1")
+    cache.insert("k", "res_1")
+    cache.acquire("res_1")
+
+    reopened = ResultCache(tmp_path / "cache.sqlite3")
+
+    assert reopened.refcount("res_1") == 2
+    assert reopened.claim("k") == "res_1"
@@ -0,0 +1,40 @@
+import os
+
+import numpy as np
+
+from backend.app.detection_store import DetectionStore, DetectionStoreWriter
+from backend.app.segments import annotate_video_segmented, plan_segments
+from backend.app.vision import AnalyzeConfig, annotate_video
+from backend.bench.synthetic import VideoSpec, write_video
+
+
+def test_plan_segments():
+    assert plan_segments(None, 4) == [(0, None)]
+    assert plan_segments(1000, 1) == [(0, None)]
+    # Capped so that no segment is shorter than the minimum
+    assert plan_segments(600, 4, min_frames=250) == [(0, 300), (300, None)]
+    assert plan_segments(1000, 4, min_frames=250) == [(0, 250), (250, 500), (500, 750), (750, None)]
+
+
+def _run(fn, video, out_dir, cfg):
+    events = []
+    with DetectionStoreWriter(out_dir / "detections") as detections:
+        stats = fn(str(video), str(out_dir / "out.mp4"), cfg, events_out=events, detections_out=detections)
+    return stats, events, DetectionStore(out_dir / "detections")
+
+
+def test_segmented_matches_serial(tmp_path, monkeypatch):
+    video = write_video(VideoSpec(160, 120, 520, 2), tmp_path)
+    # Enough "cores" for two segments on any machine
+    monkeypatch.setattr(os, "cpu_count", lambda: 2)
+
+    serial = _run(annotate_video, video, tmp_path / "serial", AnalyzeConfig(detector_backend="basic"))
+    segmented = _run(
+        annotate_video_segmented, video, tmp_path / "segmented", AnalyzeConfig(detector_backend="basic", segment_workers=2)
+    )
+
+    assert segmented[0]["segments"] == 2
+    assert segmented[1] == serial[1]
+    assert len(segmented[2]) == len(serial[2])
+    for name in ("frame", "ts_ms", "class_id", "x", "y", "w", "h", "risk"):
+        assert np.array_equal(segmented[2].column(name), serial[2].column(name)), name
@@ -0,0 +1,85 @@
+import asyncio
+import hashlib
+
+import pytest
+
+from backend.app.uploads import ChunkChecksumError, UploadConflict, UploadStore
+
+_DATA = bytes(range(256)) * 40
+
+
+async def _body(data, parts=3):
+    step = max(1, len(data) // parts)
+    for i in range(0, len(data), step):
+        yield data[i : i + step]
+
+
+def _put(store, upload_id, start, end, checksum=True, data=_DATA):
+    chunk = data[start:end]
+    sha = hashlib.sha256(chunk).hexdigest() if checksum else None
+    return asyncio.run(store.append(upload_id, start, _body(chunk), len(chunk), sha))
+
+
+def test_resume_after_restart(tmp_path):
+    store = UploadStore(tmp_path)
+    rec = store.create("clip.mp4", size=len(_DATA))
+    assert _put(store, rec.upload_id, 0, 4000) == 4000
+
+    # A new store (backend restart) resumes from the part file's length
+    store = UploadStore(tmp_path)
+    assert store.get(rec.upload_id).offset == 4000
+    assert _put(store, rec.upload_id, 4000, len(_DATA)) == len(_DATA)
+
+    dest = tmp_path / "input.mp4"
+    assert store.finish(rec.upload_id, dest) == hashlib.sha256(_DATA).hexdigest()
+    assert dest.read_bytes() == _DATA
+    assert store.get(rec.upload_id) is None
+
+
+def test_checksum_mismatch_discards_the_chunk(tmp_path):
+    store = UploadStore(tmp_path)
+    rec = store.create("clip.mp4")
+    _put(store, rec.upload_id, 0, 1000)
+
+    with pytest.raises(ChunkChecksumError):
+        asyncio.run(store.append(rec.upload_id, 1000, _body(_DATA[1000:2000]), 1000, "00" * 32))
+
+    assert store.get(rec.upload_id).offset == 1000
+    assert _put(store, rec.upload_id, 1000, 2000) == 2000
+
+
+def test_out_of_order_chunk_conflicts(tmp_path):
+    store = UploadStore(tmp_path)
+    rec = store.create("clip.mp4")
+    _put(store, rec.upload_id, 0, 1000)
+
+    with pytest.raises(UploadConflict) as exc:
+        _put(store, rec.upload_id, 1500, 2000)
+
+    assert exc.value.offset == 1000
+
+
+def test_retry_of_received_chunk_is_checked_against_stored_bytes(tmp_path):
+    store = UploadStore(tmp_path)
+    rec = store.create("clip.mp4")
+    _put(store, rec.upload_id, 0, 2000)
+
+    # A lost response: the same chunk again is acknowledged at the current offset
+    assert _put(store, rec.upload_id, 0, 1000) == 2000
+    assert _put(store, rec.upload_id, 0, 1000, checksum=False, data=b"x" * 1000) == 2000
+    with pytest.raises(ChunkChecksumError):
+        _put(store, rec.upload_id, 0, 1000, data=b"x" * 1000)
+    assert store.get(rec.upload_id).offset == 2000
+
+
+def test_short_body_and_declared_size(tmp_path):
+    store = UploadStore(tmp_path)
+    rec = store.create("clip.mp4", size=1000)
+
+    with pytest.raises(ValueError):
+        asyncio.run(store.append(rec.upload_id, 0, _body(_DATA[:500]), 600))
+    with pytest.raises(ValueError):
+        _put(store, rec.upload_id, 0, 1200)
+    assert store.get(rec.upload_id).offset == 0
+    with pytest.raises(ValueError):
+        store.finish(rec.upload_id, tmp_path / "input.mp4")
@@ -9,6 +9,8 @@ export default function JobPage() {
 
   const [job, setJob] = useState(null);
   const [error, setError] = useState(null);
+  const [segments, setSegments] = useState([]);
+  const [segIdx, setSegIdx] = useState(0);
 
   const progressPct = useMemo(() => {
     if (!job) return 0;
@@ -19,30 +21,93 @@ export default function JobPage() {
     if (!jobId) return;
 
     let cancelled = false;
+    let ws;
+    let pollId;
+
+    const handle = (data) => {
+      setJob(data);
+      if (data.status === 'done' && data.result_id) {
+        router.replace(`/results/${data.result_id}`);
+      }
+    };
+
     const tick = async () => {
       try {
         const res = await fetch(`${API_BASE}/api/jobs/${jobId}`);
         const data = await res.json();
         if (!res.ok) throw new Error(data?.detail || 'Failed to fetch job');
         if (cancelled) return;
-        setJob(data);
-
-        if (data.status === 'done' && data.result_id) {
-          router.replace(`/results/${data.result_id}`);
-        }
+        handle(data);
       } catch (e) {
         if (!cancelled) setError(e.message || String(e));
       }
     };
 
-    tick();
-    const id = setInterval(tick, 800);
+    // Fallback when the WebSocket cannot be used
+    const startPolling = () => {
+      if (cancelled || pollId) return;
+      tick();
+      pollId = setInterval(tick, 800);
+    };
+
+    let finished = false;
+    try {
+      ws = new WebSocket(`${API_BASE.replace('http', 'ws')}/ws/jobs/${encodeURIComponent(jobId)}`);
+      ws.onmessage = (ev) => {
+        if (cancelled) return;
+        try {
+          const data = JSON.parse(ev.data);
+          if (data.final) finished = true;
+          handle(data);
+        } catch {
+          // ignore
+        }
+      };
+      ws.onclose = () => {
+        if (!cancelled && !finished) startPolling();
+      };
+    } catch {
+      startPolling();
+    }
+
     return () => {
       cancelled = true;
-      clearInterval(id);
+      if (pollId) clearInterval(pollId);
+      try {
+        ws?.close();
+      } catch {
+        // ignore
+      }
     };
   }, [jobId, router]);
 
+  const resultId = job?.result_id;
+  const running = job?.status === 'running';
+
+  // Preview segments (only when the job was submitted with preview_segment_seconds)
+  useEffect(() => {
+    if (!resultId || !running) return;
+    let cancelled = false;
+    const load = async () => {
+      try {
+        const res = await fetch(`${API_BASE}/api/results/${resultId}/segments`);
+        if (!res.ok) return;
+        const data = await res.json();
+        if (!cancelled) setSegments(data.segments || []);
+      } catch {
+        // ignore
+      }
+    };
+    load();
+    const id = setInterval(load, 3000);
+    return () => {
+      cancelled = true;
+      clearInterval(id);
+    };
+  }, [resultId, running]);
+
+  const segment = segments[Math.min(segIdx, segments.length - 1)];
+
   return (
     <div className="container">
       <h1>Processing Job</h1>
@@ -58,7 +123,10 @@ export default function JobPage() {
         {job && (
           <>
             <div style={{ marginTop: 10 }}>
-              <div style={{ fontWeight: 700, marginBottom: 6 }}>Status: {job.status}</div>
+              <div style={{ fontWeight: 700, marginBottom: 6 }}>
+                Status: {job.status}
+                {job.status === 'queued' && job.queue_position ? ` (position ${job.queue_position} in queue)` : ''}
+              </div>
               <div style={{ opacity: 0.8 }}>{job.message || ''}</div>
             </div>
 
@@ -72,6 +140,23 @@ export default function JobPage() {
               </div>
             </div>
 
+            {segment && (
+              <div style={{ marginTop: 12 }}>
+                <div style={{ fontWeight: 700, marginBottom: 6 }}>
+                  Preview ({segIdx + 1}/{segments.length} segments ready)
+                </div>
+                <video
+                  key={segment.name}
+                  src={`${API_BASE}/api/results/${resultId}/segments/${segment.name}`}
+                  controls
+                  autoPlay
+                  muted
+                  onEnded={() => setSegIdx((i) => (i + 1 < segments.length ? i + 1 : i))}
+                  style={{ width: '100%', borderRadius: 12 }}
+                />
+              </div>
+            )}
+
             {job.status === 'error' && job.error && (
               <div style={{ marginTop: 12 }}>
                 <div style={{ fontWeight: 700, marginBottom: 6 }}>Error</div>
@@ -18,6 +18,8 @@ export default function ResultPage() {
 
   const [meta, setMeta] = useState(null);
   const [events, setEvents] = useState([]);
+  const [counts, setCounts] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
   const [error, setError] = useState(null);
 
   const videoUrl = useMemo(() => {
@@ -45,6 +47,8 @@ export default function ResultPage() {
         if (cancelled) return;
         setMeta(mData);
         setEvents(eData?.events || []);
+        setCounts(eData?.counts || null);
+        setNextCursor(eData?.next_cursor ?? null);
       } catch (e) {
         if (!cancelled) setError(e.message || String(e));
       }
@@ -56,14 +60,29 @@ export default function ResultPage() {
     };
   }, [resultId]);
 
+  const loadMore = async () => {
+    if (nextCursor === null) return;
+    try {
+      const res = await fetch(`${API_BASE}/api/results/${resultId}/events?cursor=${nextCursor}`);
+      const data = await res.json();
+      if (!res.ok) throw new Error(data?.detail || 'Failed to load events');
+      setEvents((prev) => prev.concat(data?.events || []));
+      setNextCursor(data?.next_cursor ?? null);
+    } catch (e) {
+      setError(e.message || String(e));
+    }
+  };
+
   const summary = useMemo(() => {
-    const counts = { warning: 0, danger: 0 };
+    // Totals over all events; the list itself is paged
+    if (counts) return { warning: counts.warning || 0, danger: counts.danger || 0 };
+    const tally = { warning: 0, danger: 0 };
     for (const ev of events) {
-      if (ev.risk_level === 'warning') counts.warning += 1;
-      if (ev.risk_level === 'danger') counts.danger += 1;
+      if (ev.risk_level === 'warning') tally.warning += 1;
+      if (ev.risk_level === 'danger') tally.danger += 1;
     }
-    return counts;
-  }, [events]);
+    return tally;
+  }, [counts, events]);
 
   const onSeek = (timestampMs) => {
     const el = videoRef.current;
@@ -183,6 +202,11 @@ export default function ResultPage() {
             </table>
           </div>
         )}
+        {nextCursor !== null && (
+          <div style={{ marginTop: 10 }}>
+            <button className="button" type="button" onClick={loadMore}>Load more events</button>
+          </div>
+        )}
       </div>
 
       <div className="card" style={{ marginTop: 12 }}>